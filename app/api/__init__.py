@@ -1,26 +1,30 @@
-from fastapi import APIRouter
+from importlib import import_module
 
-from .user import router as user_router
-from .products import router as product_router
-from .cart import router as cart_router
-from .wishlist import router as wishlist_router
-from .order import router as order_router
-from .review import router as review_router
-from .shipping import router as shipping_router
-from .guest_cart import router as guest_cart_router
-from .guest_wishlist_routes import router as guest_wishlist_router
-from .category import router as category_router
+from fastapi import FastAPI
 
-api_router = APIRouter()
+# (module, prefix, tags). Routers are imported by include_routers(), so importing
+# one route module (or app.api itself) doesn't load every other one.
+ROUTERS = [
+    (".user", "/users", ["Users"]),
+    (".products", "/products", ["Products"]),
+    (".cart", "/carts", ["Carts"]),
+    (".wishlist", "/wishlists", ["Wishlists"]),
+    (".order", "/orders", ["Orders"]),
+    (".review", "/reviews", ["Reviews"]),
+    (".shipping", "/shippingAddresses", ["Addresses"]),
+    (".guest_cart", "/guest", ["Guest Cart"]),
+    (".guest_wishlist_routes", "/guest", ["Guest Wishlist"]),
+    (".category", "/category", ["Categories"]),
+    (".health", "", []),
+]
 
-# Include all routers
-api_router.include_router(user_router, prefix="/users", tags=["Users"])
-api_router.include_router(product_router, prefix="/products", tags=["Products"])
-api_router.include_router(cart_router, prefix="/carts", tags=["Carts"])
-api_router.include_router(wishlist_router, prefix="/wishlists", tags=["Wishlists"])
-api_router.include_router(order_router, prefix="/orders", tags=["Orders"])
-api_router.include_router(review_router, prefix="/reviews", tags=["Reviews"])
-api_router.include_router(shipping_router, prefix="/shippingAddresses", tags=["Addresses"])
-api_router.include_router(guest_cart_router, prefix="/guest", tags=["Guest Cart"])
-api_router.include_router(guest_wishlist_router, prefix="/guest", tags=["Guest Wishlist"])
-api_router.include_router(category_router, prefix="/category", tags=["Categories"])
\ No newline at end of file
+
+def include_routers(app: FastAPI):
+    """
+    Include every router straight into the app. FastAPI rebuilds each route
+    (and its response model fields) per include_router, so going through an
+    intermediate APIRouter would build every route one extra time at startup.
+    """
+    for module, prefix, tags in ROUTERS:
+        router = import_module(module, __name__).router
+        app.include_router(router, prefix=prefix, tags=tags)
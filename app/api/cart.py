@@ -1,50 +1,75 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 from typing import List
 
+from app.core.config import settings
 from app.db.session import get_db
+from app.db.writes import delete_or_404
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
-from app.schemas.cartSchema import CartCreate, CartRead, CartItemCreate, CartItemRead
+from app.repositories.product_repository import SUMMARY, product_repository
+from app.schemas.cartSchema import CartCreate, CartMerge, CartRead, CartItemCreate, CartItemRead
+from app.services import cart_buffer
+from app.services.guest_cart import merge_guest_cart_into_user
+from app.services.pricing import PriceBook, get_price_book
 
 router = APIRouter(prefix="/carts", tags=["Carts"])
 
+# A cart's items with their products, as CartRead serializes them
+_CART_ITEMS = selectinload(Cart.items).selectinload(CartItem.product).selectinload(Product.category)
+
+
+def _priced_cart(cart: Cart, prices: PriceBook) -> CartRead:
+  """Serialize a cart (items and products loaded) with server-side line prices and totals."""
+  quote = prices.quote((item.product, item.container, item.quantity) for item in cart.items)
+  data = CartRead.model_validate(cart, from_attributes=True)
+  items = [item.model_copy(update=line) for item, line in zip(data.items, quote["lines"])]
+  return data.model_copy(update={
+    "items": items,
+    "subtotal": quote["subtotal"],
+    "discount": quote["discount"],
+    "total": quote["total"],
+  })
+
+
 # CREATE OR GET CART
 @router.post("/", response_model=CartRead)
-async def add_to_cart(cart_in: CartCreate, db: AsyncSession = Depends(get_db)):
+async def add_to_cart(
+  cart_in: CartCreate,
+  db: AsyncSession = Depends(get_db),
+  prices: PriceBook = Depends(get_price_book),
+):
     result = await db.execute(
         select(Cart)
         .where(Cart.user_id == cart_in.user_id)
         .order_by(Cart.id.desc())
-        .options(selectinload(Cart.items))
+        .options(_CART_ITEMS)
     )
     cart = result.scalars().first()
+    if cart and settings.CART_COALESCE_ENABLED:
+        # Buffered +/- clicks first, so the additions below apply on top of them
+        await cart_buffer.flush_cart(db, cart.id, cart.items)
 
     if not cart:
-        cart = Cart(user_id=cart_in.user_id)
+        cart = Cart(user_id=cart_in.user_id, items=[])
         db.add(cart)
-        await db.flush()
-        await db.refresh(cart, attribute_names=["items"])  # ✅ preload items
 
+    # One lookup for the products not already in the cart
+    products = {str(item.product_id): item.product for item in cart.items}
+    missing = [item_in.product_id for item_in in cart_in.items if str(item_in.product_id) not in products]
+    if missing:
+        products.update(await product_repository.get_products_by_ids(db, missing))
+
+    lines = {(str(item.product_id), item.container): item for item in cart.items}
     for item_in in cart_in.items:
-        result = await db.execute(select(Product).where(Product.id == item_in.product_id))
-        product = result.scalar_one_or_none()
+        product = products.get(str(item_in.product_id))
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item_in.product_id} not found")
 
-        # Async-safe check for existing item
-        result = await db.execute(
-            select(CartItem)
-            .where(
-                CartItem.cart_id == cart.id,
-                CartItem.product_id == item_in.product_id,
-                CartItem.container == item_in.container,
-            )
-        )
-        existing_item = result.scalar_one_or_none()
-
+        existing_item = lines.get((str(item_in.product_id), item_in.container))
         if existing_item:
             existing_item.quantity += item_in.quantity
         else:
@@ -52,56 +77,58 @@ async def add_to_cart(cart_in: CartCreate, db: AsyncSession = Depends(get_db)):
                 product_id=item_in.product_id,
                 quantity=item_in.quantity,
                 container=item_in.container,
+                product=product,
             )
             cart.items.append(cart_item)
+            lines[(str(item_in.product_id), item_in.container)] = cart_item
 
     await db.commit()
-
-    result = await db.execute(
-        select(Cart)
-        .where(Cart.id == cart.id)
-        .options(
-            selectinload(Cart.items)
-            .selectinload(CartItem.product)
-            .selectinload(Product.category),
-        )
-    )
-
-    return result.scalar_one()
-
-
+    return _priced_cart(cart, prices)
 
 
 # GET USER CART
 @router.get("/user/{user_id}", response_model=CartRead)
-async def get_cart(user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_cart(user_id: str, db: AsyncSession = Depends(get_db), prices: PriceBook = Depends(get_price_book)):
   result = await db.execute(
     select(Cart)
     .where(Cart.user_id == user_id)
     .order_by(Cart.id.desc())
-    .options(
-      selectinload(Cart.items)
-      .selectinload(CartItem.product)
-      .selectinload(Product.category),
-    )
-    )
+    .options(_CART_ITEMS)
+  )
   cart = result.scalars().first()
   if not cart:
     raise HTTPException(status_code=404, detail="Cart not found")
-  return cart
+  if settings.CART_COALESCE_ENABLED:
+    await cart_buffer.flush_cart(db, cart.id, cart.items)
+  return _priced_cart(cart, prices)
+
+
+# MERGE GUEST CART INTO USER CART (on login)
+@router.post("/merge/{session_id}", response_model=CartRead)
+async def merge_guest_cart(
+  session_id: str,
+  merge_in: CartMerge,
+  db: AsyncSession = Depends(get_db),
+  prices: PriceBook = Depends(get_price_book),
+):
+  if settings.CART_COALESCE_ENABLED:
+    await cart_buffer.flush_user_cart(db, merge_in.user_id)
+  await merge_guest_cart_into_user(db, session_id, merge_in.user_id)
+  return await get_cart(merge_in.user_id, db, prices)
 
 
 # ADD ITEM TO CART
 @router.post("/{cart_id}/items", response_model=CartItemRead)
 async def add_cart_item(cart_id: str, item_in: CartItemCreate, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(Cart).where(Cart.id == cart_id))
+  if settings.CART_COALESCE_ENABLED:
+    await cart_buffer.flush_cart(db, cart_id)
+  result = await db.execute(select(Cart).where(Cart.id == cart_id).options(selectinload(Cart.items)))
   cart = result.scalar_one_or_none()
   if not cart:
     raise HTTPException(status_code=404, detail="Cart not found")
-  
-  # Fetch product
-  result = await db.execute(select(Product).where(Product.id == item_in.product_id))
-  product = result.scalar_one_or_none()
+
+  # Fetch product (with its category, for the response)
+  product = await product_repository.get_product_by_id(db, item_in.product_id, SUMMARY)
   if not product:
     raise HTTPException(status_code=404, detail="Product not found")
 
@@ -112,36 +139,37 @@ async def add_cart_item(cart_id: str, item_in: CartItemCreate, db: AsyncSession
       and existing_item.container == item_in.container
     ):
       existing_item.quantity += item_in.quantity
-      db.add(existing_item)
+      existing_item.product = product
       await db.commit()
-      await db.refresh(existing_item)
       return existing_item
 
 
   # Add new item
   cart_item = CartItem(
     product_id=item_in.product_id,
-    quantity=item_in.quantity,     
+    quantity=item_in.quantity,
     container=item_in.container,
     product=product
   )
   cart.items.append(cart_item)
-  db.add(cart)
   await db.commit()
-  await db.refresh(cart_item)
   return cart_item
 
 
 # UPDATE CART ITEM
 @router.put("/items/{item_id}", response_model=CartItemRead)
 async def update_cart_item(item_id: str, item_in: CartItemCreate, db: AsyncSession = Depends(get_db)):
+    # Coalesced: absorbed in Redis and written back in batches (app/services/cart_buffer.py)
+    if settings.CART_COALESCE_ENABLED:
+        item = await cart_buffer.buffer_update(db, item_id, item_in.quantity, item_in.container)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Cart item not found")
+        return item
+
     result = await db.execute(
         select(CartItem)
         .where(CartItem.id == item_id)
-        .options(
-            selectinload(CartItem.product)
-            .selectinload(Product.category),
-        )
+        .options(joinedload(CartItem.product).joinedload(Product.category))
     )
     cart_item = result.scalar_one_or_none()
     if not cart_item:
@@ -149,37 +177,18 @@ async def update_cart_item(item_id: str, item_in: CartItemCreate, db: AsyncSessi
 
     cart_item.quantity = item_in.quantity
     cart_item.container = item_in.container
-
-    db.add(cart_item)
     await db.commit()
-    await db.refresh(cart_item)
-
-    # Re-fetch with relationships eagerly loaded (important!)
-    result = await db.execute(
-        select(CartItem)
-        .where(CartItem.id == item_id)
-        .options(
-            selectinload(CartItem.product)
-            .selectinload(Product.category),
-            selectinload(CartItem.product)
-        )
-    )
-    return result.scalar_one()
+    return cart_item
 
 # DELETE CART ITEM
 @router.delete("/{cart_id}/items/{item_id}")
 async def delete_cart_item(cart_id: str, item_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(CartItem)
-        .where(CartItem.id == item_id, CartItem.cart_id == cart_id)
+    await delete_or_404(
+        db, CartItem, CartItem.id == item_id, CartItem.cart_id == cart_id,
+        detail="Cart item not found in this cart",
     )
-    cart_item = result.scalar_one_or_none()
-
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found in this cart")
-
-    await db.delete(cart_item)
-    await db.commit()
+    if settings.CART_COALESCE_ENABLED:
+        await cart_buffer.discard(cart_id, [item_id])
 
     return {"detail": "Cart item deleted successfully"}
 
@@ -187,12 +196,15 @@ async def delete_cart_item(cart_id: str, item_id: str, db: AsyncSession = Depend
 # CLEAR CART
 @router.delete("/{cart_id}/items")
 async def clear_cart(cart_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(Cart).where(Cart.id == cart_id).options(selectinload(Cart.items)))
-  cart = result.scalar_one_or_none()
-  if not cart:
-    raise HTTPException(status_code=404, detail="Cart not found")
-  
-  for item in cart.items:
-    await db.delete(item)
+  result = await db.execute(delete(CartItem).where(CartItem.cart_id == cart_id).returning(CartItem.id))
+  deleted = result.scalars().all()
+  # Nothing deleted: either the cart is already empty or it doesn't exist
+  if not deleted:
+    cart = await db.scalar(select(Cart.id).where(Cart.id == cart_id))
+    if not cart:
+      raise HTTPException(status_code=404, detail="Cart not found")
+
   await db.commit()
+  if settings.CART_COALESCE_ENABLED:
+    await cart_buffer.discard(cart_id, deleted, whole_cart=True)
   return {"detail": "Cart cleared successfully"}
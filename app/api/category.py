@@ -3,75 +3,67 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from typing import List
+from typing import List, Optional
 
+from app.core.fields import fields_response, load_options, parse_fields
+from app.core.streaming import stream_json_array
 from app.db.session import get_db
 from app.models.product import Category
 from app.models.product import Product
+from app.repositories.category_repository import PRODUCT_SUMMARIES, category_repository
 from app.schemas.categorySchema import CategoryCreate, CategoryUpdate, CategoryRead
-from app.schemas.categorySchema import ProductSummary
-from sqlalchemy.orm import selectinload
+from app.services import autocomplete, cache
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
+
+def _fields_options(names):
+    if names is None:
+        return None
+    return load_options(Category, names, {"products": PRODUCT_SUMMARIES})
+
+
 # CREATE CATEGORY
 @router.post("/", response_model=CategoryRead)
 async def create_category(category_in: CategoryCreate, db: AsyncSession = Depends(get_db)):
-    category = Category(**category_in.dict())
+    # A new category has no products yet; nothing to load after the INSERT
+    category = Category(**category_in.dict(), products=[])
     db.add(category)
     await db.commit()
-    await db.refresh(category)
-
-    # Load products relationship to avoid serialization error
-    result = await db.execute(
-        select(Category)
-        .where(Category.id == category.id)
-        .options(selectinload(Category.products))
-    )
-    category = result.scalar_one()
+    await cache.invalidate(*cache.CATALOG_KEYS)
+    await autocomplete.index_category(category.id, category.name)
     return category
 
 
 # LIST CATEGORIES WITH LIGHTWEIGHT PRODUCTS
+# ?fields=id,name,image lists categories without loading their products
+# ?stream=true streams the array in chunks straight from the DB cursor
+# The full listing is served from the Redis cache (preloaded at startup)
 @router.get("/", response_model=List[CategoryRead])
-async def list_categories(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Category)
-        .options(
-            selectinload(Category.products)
-        )
-    )
-
-    categories = result.scalars().all()
-
-    # Convert products -> ProductSummary
-    # for c in categories:
-    #     for p in c.products:
-    #         # p.images is safely loaded now
-    #         p.main_image = (
-    #             next((img.url for img in p.images if img.is_main), None)
-    #             or (p.images[0].url if p.images else None)
-    #         )
+async def list_categories(fields: Optional[str] = None, stream: bool = False, db: AsyncSession = Depends(get_db)):
+    names = parse_fields(fields, CategoryRead)
+    if stream:
+        stmt = category_repository.select_with_products(_fields_options(names))
+        return stream_json_array(db, stmt, CategoryRead, names)
+    if names is None:
+        return await cache.cached_response(db, cache.CATEGORIES)
 
-    return categories
+    categories = await category_repository.list_with_products(db, _fields_options(names))
+    return fields_response(categories, CategoryRead, names)
 
 
 # GET SINGLE CATEGORY WITH LIGHTWEIGHT PRODUCTS
 @router.get("/{category_id}", response_model=CategoryRead)
-async def get_category(category_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Category)
-        .where(Category.id == category_id)
-        .options(
-            selectinload(Category.products)
-        )
-    )
-
-    category = result.scalar_one_or_none()
+async def get_category(category_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    names = parse_fields(fields, CategoryRead)
+    category = await category_repository.get_with_products(db, category_id, _fields_options(names))
 
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
+    if names is not None:
+        return fields_response(category, CategoryRead, names)
+
     # Now p.images is fully loaded, so no lazy loading occurs
     # for p in category.products:
     #     p.main_image = (
@@ -86,18 +78,23 @@ async def get_category(category_id: str, db: AsyncSession = Depends(get_db)):
 # UPDATE CATEGORY
 @router.put("/{category_id}", response_model=CategoryRead)
 async def update_category(category_id: str, category_in: CategoryUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Category).where(Category.id == category_id))
-    category = result.scalar_one_or_none()
+    # Loaded with its product summaries, which the response includes
+    category = await category_repository.get_with_products(db, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     update_data = category_in.dict(exclude_unset=True)
+    renamed = "name" in update_data and update_data["name"] != category.name
     for field, value in update_data.items():
         setattr(category, field, value)
 
-    db.add(category)
     await db.commit()
-    await db.refresh(category)
+    if renamed:
+        # category_sales reports under the category's name
+        await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+        await autocomplete.index_category(category.id, category.name)
+    else:
+        await cache.invalidate(*cache.CATALOG_KEYS)
     return category
 
 
@@ -111,5 +108,7 @@ async def delete_category(category_id: str, db: AsyncSession = Depends(get_db)):
 
     await db.delete(category)
     await db.commit()
+    await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+    await autocomplete.remove_category(category_id)
 
     return {"detail": "Category deleted successfully"}
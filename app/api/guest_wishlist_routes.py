@@ -6,6 +6,7 @@ from app.services.guest_wishlist_service import (
     add_item_to_wishlist,
     remove_item_from_wishlist,
     clear_wishlist,
+    merge_guest_wishlist_into_user,
 )
 
 router = APIRouter(prefix="/guest-wishlist", tags=["Guest Wishlist"])
@@ -17,12 +18,12 @@ async def read_guest_wishlist(session_id: str, db: AsyncSession = Depends(get_db
 
 
 @router.post("/{session_id}/add/{product_id}")
-async def add_to_guest_wishlist(session_id: str, product_id: int, db: AsyncSession = Depends(get_db)):
+async def add_to_guest_wishlist(session_id: str, product_id: str, db: AsyncSession = Depends(get_db)):
     return await add_item_to_wishlist(db, session_id, product_id)
 
 
 @router.delete("/{session_id}/items/{product_id}")
-async def remove_from_guest_wishlist(session_id: str, product_id: int, db: AsyncSession = Depends(get_db)):
+async def remove_from_guest_wishlist(session_id: str, product_id: str, db: AsyncSession = Depends(get_db)):
     return await remove_item_from_wishlist(db, session_id, product_id)
 
 
@@ -33,6 +34,5 @@ async def clear_guest_wishlist_route(session_id: str):
 
 
 @router.post("/merge/{session_id}/{user_id}")
-async def merge_guest_wishlist(session_id: str, user_id: int, db: AsyncSession = Depends(get_db)):
-    from app.services.guest_wishlist_service import merge_guest_wishlist_into_user
+async def merge_guest_wishlist(session_id: str, user_id: str, db: AsyncSession = Depends(get_db)):
     return await merge_guest_wishlist_into_user(db, session_id, user_id)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.warmup import state
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+# LIVENESS: the process is up and serving
+@router.get("/live")
+async def live():
+  return {"status": "ok"}
+
+
+# READINESS: 503 until the lifespan warm-up has primed the pools and caches
+@router.get("/ready")
+async def ready():
+  return JSONResponse(state.as_dict(), status_code=200 if state.ready else 503)
@@ -1,32 +1,58 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import date
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Numeric, cast, delete, func, update
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from app.schemas.orderSchema import OrderRead, OrderUpdate
-from typing import List
+from typing import List, Literal, Optional
 
+from app.core.fields import fields_response, load_options, parse_fields
+from app.core.streaming import stream_json_array
 from app.db.session import get_db
 from app.models.order import Order, OrderItem
 from app.models.product import Product
 from app.models.user import User
 from app.schemas.orderSchema import OrderCreate, OrderRead, OrderItemCreate, OrderItemRead
+from app.repositories.product_repository import product_repository
+from app.core.config import settings
+from app.services import autocomplete, cache, cart_buffer, customer_stats, order_timeseries, recommendations
+from app.services.pricing import PriceBook, get_price_book, line_total, shipping_fee
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
 # CREATE ORDER
 @router.post("/", response_model=OrderRead)
-async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(get_db)):
+async def create_order(
+  order_in: OrderCreate,
+  db: AsyncSession = Depends(get_db),
+  prices: PriceBook = Depends(get_price_book),
+):
   # Check user exists
   result = await db.execute(select(User).where(User.id == order_in.user_id))
   user = result.scalar_one_or_none()
   if not user:
     raise HTTPException(status_code=404, detail=f"User {order_in.user_id} not found")
+  # Checkout: write back any buffered cart quantity changes first
+  if settings.CART_COALESCE_ENABLED and user.supabase_id:
+    await cart_buffer.flush_user_cart(db, user.supabase_id)
+
+  # One query for every product in the order
+  products = await product_repository.get_products_by_ids(db, {item_in.product_id for item_in in order_in.items})
+  for item_in in order_in.items:
+    if str(item_in.product_id) not in products:
+      raise HTTPException(status_code=404, detail=f"Product {item_in.product_id} not found")
+
+  # Prices and total come from the catalog, never from the client
+  lines = [(products[str(item_in.product_id)], item_in) for item_in in order_in.items]
+  quote = prices.quote((product, item_in.container, item_in.quantity) for product, item_in in lines)
 
   order = Order(
     user_id=order_in.user_id,
     status=order_in.status,
-    total_amount=order_in.total_amount,
+    total_amount=round(quote["total"] + shipping_fee(order_in.shipping_method), 2),
     shipping_method=order_in.shipping_method,
     city=order_in.city,
     area=order_in.area,
@@ -39,237 +65,235 @@ async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(get_db)
     additionalNote=order_in.additionalNote
   )
 
-  # Add order items
-  for item_in in order_in.items:
-    result = await db.execute(select(Product).where(Product.id == item_in.product_id))
-    product = result.scalar_one_or_none()
-    if not product:
-      raise HTTPException(status_code=404, detail=f"Product {item_in.product_id} not found")
-
+  # Add order items; price is the per-100g rate charged for the line
+  for (product, item_in), pricing in zip(lines, quote["lines"]):
     order_item = OrderItem(
       product_id=item_in.product_id,
       container=item_in.container,
-      name= item_in.name,
-      image = item_in.image,
+      name=item_in.name or product.name,
+      image=item_in.image or product.main_image,
       quantity=item_in.quantity,
-      price=item_in.price,
+      price=pricing["unit_price"],
       product=product
     )
     order.items.append(order_item)
 
+  # INSERTs return created_at; the items are already on the order
   db.add(order)
+  if customer_stats.counts(order.status):
+    await customer_stats.add_order(db, order.user_id, order.total_amount)
   await db.commit()
-  await db.refresh(order)
-
-  # Reload order with items
-  result = await db.execute(
-    select(Order).where(Order.id == order.id).options(selectinload(Order.items).selectinload(OrderItem.product))
-  )
-  order = result.scalar_one()
+  await cache.invalidate(*cache.DASHBOARD_KEYS)
+  if customer_stats.counts(order.status):
+    await order_timeseries.record(order.created_at, 1, order.total_amount or 0)
+  await recommendations.record_order(item.product_id for item in order.items)
+  await autocomplete.record_order(item.product_id for item in order.items)
   return order
 
 
+def _order_options(names):
+  # OrderItemRead carries the item snapshot (name, image, price), not the product,
+  # so products are never loaded for reads
+  if names is None:
+    return [selectinload(Order.items)]
+  return load_options(Order, names)
+
+
 # GET ALL ORDERS
+# ?fields=id,status,total_amount,created_at skips loading items entirely
+# ?stream=true streams the array in chunks straight from the DB cursor
 @router.get("/", response_model=List[OrderRead])
-async def list_orders(db: AsyncSession = Depends(get_db)):
-  result = await db.execute(
-    select(Order).options(selectinload(Order.items).selectinload(OrderItem.product))
-  )
+async def list_orders(fields: Optional[str] = None, stream: bool = False, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, OrderRead)
+  stmt = select(Order).options(*_order_options(names))
+  if stream:
+    return stream_json_array(db, stmt, OrderRead, names)
+
+  result = await db.execute(stmt)
   orders = result.scalars().all()
+  if names is not None:
+    return fields_response(orders, OrderRead, names)
   return orders
 
 
 # GET SINGLE ORDER
 @router.get("/{order_id}", response_model=OrderRead)
-async def get_order(order_id: str, db: AsyncSession = Depends(get_db)):
+async def get_order(order_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, OrderRead)
   result = await db.execute(
     select(Order)
     .where(Order.id == order_id)
-    .options(selectinload(Order.items).selectinload(OrderItem.product))
+    .options(*_order_options(names))
   )
   order = result.scalar_one_or_none()
   if not order:
     raise HTTPException(status_code=404, detail="Order not found")
+  if names is not None:
+    return fields_response(order, OrderRead, names)
   return order
 
 
 # GET ORDERS BY USER ID
 @router.get("/user/{user_id}", response_model=List[OrderRead])
-async def get_orders_by_user(user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_orders_by_user(user_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, OrderRead)
   result = await db.execute(
     select(Order)
     .where(Order.user_id == user_id)
-    .options(selectinload(Order.items).selectinload(OrderItem.product))
+    .options(*_order_options(names))
     .order_by(Order.created_at.desc())
   )
   orders = result.scalars().all()
+  if names is not None:
+    return fields_response(orders, OrderRead, names)
   return orders
 
 
 # UPDATE ORDER STATUS AND PAYMENT
 @router.put("/{order_id}", response_model=OrderRead)
 async def update_order(order_id: str, order_in: OrderUpdate, db: AsyncSession = Depends(get_db)):
+  # Items are part of the response: load them with the order
   result = await db.execute(
-    select(Order).where(Order.id == order_id)
+    select(Order).where(Order.id == order_id).options(*_order_options(None))
   )
   order = result.scalar_one_or_none()
   if not order:
     raise HTTPException(status_code=404, detail="Order not found")
 
+  counted = customer_stats.counts(order.status)
   update_data = order_in.dict(exclude_unset=True)
   for field, value in update_data.items():
     setattr(order, field, value)
 
-  db.add(order)
+  # Cancelling (or restoring) an order moves it out of (or back into) the customer's stats
+  if counted and not customer_stats.counts(order.status):
+    await customer_stats.remove_order(db, order.user_id, order.id, order.total_amount)
+  elif not counted and customer_stats.counts(order.status):
+    await customer_stats.add_order(db, order.user_id, order.total_amount, order.created_at)
   await db.commit()
-  await db.refresh(order)
-
-  # Reload with items
-  result = await db.execute(
-    select(Order).where(Order.id == order.id).options(selectinload(Order.items).selectinload(OrderItem.product))
-  )
-  return result.scalar_one()
+  await cache.invalidate(*cache.DASHBOARD_KEYS)
+  if counted != customer_stats.counts(order.status):
+    sign = -1 if counted else 1
+    await order_timeseries.record(order.created_at, sign, sign * (order.total_amount or 0))
+  return order
 
 
-# UPDATE ORDER ITEM (e.g., quantity, size, color)
+# UPDATE ORDER ITEM (quantity / container; repriced server-side)
 @router.put("/items/{item_id}", response_model=OrderItemRead)
-async def update_order_item(item_id: str, item_in: OrderItemCreate, db: AsyncSession = Depends(get_db)):
+async def update_order_item(
+  item_id: str,
+  item_in: OrderItemCreate,
+  db: AsyncSession = Depends(get_db),
+  prices: PriceBook = Depends(get_price_book),
+):
   result = await db.execute(
-    select(OrderItem).where(OrderItem.id == item_id).options(selectinload(OrderItem.product))
+    select(OrderItem).where(OrderItem.id == item_id)
+    .options(joinedload(OrderItem.product), joinedload(OrderItem.order))
   )
   order_item = result.scalar_one_or_none()
   if not order_item:
     raise HTTPException(status_code=404, detail="Order item not found")
 
+  # The price comes from the catalog, never from the client (a line whose
+  # product is gone keeps the rate it was sold at)
+  old_total = line_total(order_item.price, order_item.container, order_item.quantity)
   order_item.quantity = item_in.quantity
   order_item.container = item_in.container
-  order_item.price = item_in.price
-
-  db.add(order_item)
+  if order_item.product is not None:
+    order_item.price = prices.rate(order_item.product, item_in.container)[0]
+  delta = round(line_total(order_item.price, order_item.container, order_item.quantity) - old_total, 2)
+
+  # The order total, and what it counts for in the customer's stats, move with the line
+  order = order_item.order
+  counted = order is not None and customer_stats.counts(order.status)
+  if order is not None and delta:
+    order.total_amount = round((order.total_amount or 0) + delta, 2)
+    if counted:
+      await customer_stats.change_spend(db, order.user_id, delta)
   await db.commit()
-  await db.refresh(order_item)
+  await cache.invalidate(*cache.DASHBOARD_KEYS)
+  if counted:
+    await order_timeseries.record(order.created_at, 0, delta)
   return order_item
 
 
-# DELETE ORDER ITEM
+# DELETE ORDER ITEM (the order total drops by the line's)
 @router.delete("/items/{item_id}")
 async def delete_order_item(item_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(OrderItem).where(OrderItem.id == item_id))
-  order_item = result.scalar_one_or_none()
-  if not order_item:
+  result = await db.execute(
+    delete(OrderItem).where(OrderItem.id == item_id)
+    .returning(OrderItem.order_id, OrderItem.price, OrderItem.container, OrderItem.quantity)
+  )
+  deleted = result.one_or_none()
+  if deleted is None:
+    await db.rollback()
     raise HTTPException(status_code=404, detail="Order item not found")
 
-  await db.delete(order_item)
+  delta = -line_total(deleted.price, deleted.container, deleted.quantity)
+  order = None
+  if deleted.order_id is not None and delta:
+    result = await db.execute(
+      update(Order).where(Order.id == deleted.order_id)
+      .values(total_amount=func.round(cast(Order.total_amount + delta, Numeric), 2))
+      .returning(Order.user_id, Order.status, Order.created_at)
+    )
+    order = result.one_or_none()
+  counted = order is not None and customer_stats.counts(order.status)
+  if counted:
+    await customer_stats.change_spend(db, order.user_id, delta)
   await db.commit()
+  await cache.invalidate(*cache.DASHBOARD_KEYS)
+  if counted:
+    await order_timeseries.record(order.created_at, 0, delta)
   return {"detail": "Order item deleted successfully"}
 
 
 # DELETE ORDER
 @router.delete("/{order_id}")
 async def delete_order(order_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(Order).where(Order.id == order_id).options(selectinload(Order.items)))
-  order = result.scalar_one_or_none()
-  if not order:
+  # Items first (FK), then the order; no rows are loaded into the session.
+  # RETURNING hands back what the customer's stats and the time series need
+  await db.execute(delete(OrderItem).where(OrderItem.order_id == order_id))
+  result = await db.execute(
+    delete(Order).where(Order.id == order_id).returning(Order.user_id, Order.total_amount, Order.status, Order.created_at)
+  )
+  deleted = result.one_or_none()
+  if deleted is None:
+    await db.rollback()
     raise HTTPException(status_code=404, detail="Order not found")
-
-  await db.delete(order)
+  if customer_stats.counts(deleted.status):
+    await customer_stats.remove_order(db, deleted.user_id, order_id, deleted.total_amount)
   await db.commit()
+  await cache.invalidate(*cache.DASHBOARD_KEYS)
+  if customer_stats.counts(deleted.status):
+    await order_timeseries.record(deleted.created_at, -1, -(deleted.total_amount or 0))
   return {"detail": "Order deleted successfully"}
 
 
-from app.models.order import Order, OrderItem
-from app.models.product import Product
 
+# DASHBOARD: TOP PRODUCTS BY REVENUE (cached, preloaded at startup)
 @router.get("/items/topProducts")
 async def get_top_products_data(db: AsyncSession = Depends(get_db)):
-  # Fetch orders and items, joined with products
-  result = await db.execute(
-      select(Order)
-      .options(joinedload(Order.items).joinedload(OrderItem.product))
-  )
-  orders = result.unique().scalars().all()
-
-  product_stats = {}
-
-  for order in orders:
-      for item in order.items:
-          product = item.product
-          if not product:
-              continue
-
-          name = product.name
-          price = product.price
-          quantity = item.quantity
-          revenue = quantity * price
-
-          if name not in product_stats:
-              product_stats[name] = {
-                  "name": name,
-                  "price": price,
-                  "sales": 0,
-                  "revenue": 0,
-              }
-
-          product_stats[name]["sales"] += quantity
-          product_stats[name]["revenue"] += revenue
-
-  # Sort by total sales or revenue
-  top_products = sorted(
-      product_stats.values(),
-      key=lambda x: x["revenue"],  # or x["sales"]
-      reverse=True,
-  )[:5]
+  return await cache.cached_response(db, cache.TOP_PRODUCTS)
 
-  return top_products
-
-
-
-CATEGORY_COLORS = [
-    "#99582A", "#B5764A", "#D19B6A", "#E8C18C", "#FFE6A7"
-]
 
+# DASHBOARD: SALES PER CATEGORY (cached, preloaded at startup)
 @router.get("/items/categorySales")
 async def get_category_sales(db: AsyncSession = Depends(get_db)):
-    # Fetch orders and items with product and category info
-    result = await db.execute(
-        select(Order)
-        .options(
-            joinedload(Order.items)
-            .joinedload(OrderItem.product)
-            .joinedload(Product.category)
-        )
-    )
-    orders = result.unique().scalars().all() 
-
-    category_stats = {}
-
-    for order in orders:
-        for item in order.items:
-            product = item.product
-            if not product or not product.category:
-                continue
-
-            category_name = product.category.name
-            quantity = item.quantity
-            revenue = quantity * item.price
-
-            if category_name not in category_stats:
-                category_stats[category_name] = {
-                    "name": category_name,
-                    "value": 0,  # will store total sales count
-                    "revenue": 0.0,
-                }
-
-            category_stats[category_name]["value"] += quantity
-            category_stats[category_name]["revenue"] += revenue
-
-    # Convert dict to list and assign colors dynamically
-    category_list = []
-    for i, cat in enumerate(category_stats.values()):
-        cat["color"] = CATEGORY_COLORS[i % len(CATEGORY_COLORS)]
-        category_list.append(cat)
-
-    # Sort by most sold
-    category_list.sort(key=lambda x: x["value"], reverse=True)
-
-    return category_list
\ No newline at end of file
+  return await cache.cached_response(db, cache.CATEGORY_SALES)
+
+
+# DASHBOARD: ORDERS AND REVENUE PER DAY / WEEK / MONTH (cached per range, open bucket kept live)
+@router.get("/stats/timeseries")
+async def get_order_timeseries(
+  bucket: Literal["day", "week", "month"] = "day",
+  start: Optional[date] = Query(None, alias="from"),
+  end: Optional[date] = Query(None, alias="to"),
+  db: AsyncSession = Depends(get_db),
+):
+  try:
+    first, last = order_timeseries.resolve_range(bucket, start, end)
+  except ValueError as exc:
+    raise HTTPException(status_code=400, detail=str(exc))
+  body = await order_timeseries.series(db, bucket, first, last)
+  return Response(content=body, media_type="application/json")
@@ -1,12 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+import json
+from collections import defaultdict
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request
+from fastapi.responses import Response
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
 
+from app.core.config import settings
+from app.core.fields import fields_response, load_options, parse_fields
+from app.core.streaming import stream_json_array
 from app.db.session import get_db
-from app.models.product import Product, ProductImage
-from app.schemas.productSchema import ProductCreate, ProductRead, ProductImageCreate, ProductUpdate
+from app.db.writes import delete_or_404
+from app.models.product import Category, Product, ProductImage
+from app.models.review import Review
+from app.repositories.product_repository import DETAIL, SUMMARY, product_repository
+from app.schemas.productSchema import (
+  AutocompleteSuggestion, ProductBulkPatchResult, ProductCreate, ProductDetail, ProductRead, ProductImageCreate,
+  ProductImageUpload, ProductImportResult, ProductPatch, ProductUpdate, RelatedProduct,
+)
+from app.services import autocomplete, cache, images, product_import, recommendations, similarity
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -14,8 +27,16 @@ router = APIRouter(prefix="/products", tags=["Products"])
 @router.post("/", response_model=ProductRead)
 async def create_product(
   product_in: ProductCreate,
+  background_tasks: BackgroundTasks,
   db: AsyncSession = Depends(get_db),
 ):
+  # The response embeds the category: load it now rather than re-selecting after commit
+  category = None
+  if product_in.category_id is not None:
+    category = await db.get(Category, product_in.category_id)
+    if not category:
+      raise HTTPException(status_code=404, detail="Category not found")
+
   # Create product object
   product = Product(
     name=product_in.name,
@@ -35,6 +56,7 @@ async def create_product(
     status=product_in.status,
     main_image=product_in.main_image,
     category_id=product_in.category_id,
+    category=category,
   )
 
   # Add images if any
@@ -48,68 +70,168 @@ async def create_product(
 
   db.add(product)
   await db.commit()
-  await db.refresh(product)
-
-  # Load category relationship to avoid serialization error
-  result = await db.execute(
-      select(Product)
-      .where(Product.id == product.id)
-      .options(selectinload(Product.category))
-  )
-  product = result.scalar_one()
+  await cache.invalidate(*cache.CATALOG_KEYS)
+  await autocomplete.index_product(product.id, product.name, product.category_id)
+  background_tasks.add_task(similarity.refresh_product, product.id)
   return product
 
 
+# BULK IMPORT PRODUCTS
+# The request body is the file (CSV or JSON Lines), streamed and upserted in one
+# transaction; rows that fail validation are reported, not fatal
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+  request: Request,
+  background_tasks: BackgroundTasks,
+  fmt: Optional[str] = Query(None, alias="format", description="csv or jsonl; defaults from Content-Type"),
+  db: AsyncSession = Depends(get_db),
+):
+  fmt = product_import.format_for(fmt, request.headers.get("content-type"))
+  if fmt is None:
+    raise HTTPException(status_code=415, detail="Send a CSV or JSON Lines body (?format=csv or ?format=jsonl)")
+
+  result = await product_import.import_products(db, request.stream(), fmt)
+  if result["inserted"] or result["updated"]:
+    await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+    background_tasks.add_task(similarity.rebuild_in_background)
+    background_tasks.add_task(autocomplete.rebuild_in_background)
+  return result
+
+
 # GET ALL PRODUCTS
+# ?fields=id,name,price,main_image,category returns (and SELECTs) only those fields;
+# main_image_variants is selectable too (it loads main_image)
+# ?stream=true streams the array in chunks straight from the DB cursor
 @router.get("/", response_model=List[ProductRead])
-async def list_products(db: AsyncSession = Depends(get_db)):
-  result = await db.execute(
-    select(Product)
-    .options(
-      # selectinload(Product.images),
-      selectinload(Product.category)
-    )
-  )
-  products = result.scalars().all()
+async def list_products(fields: Optional[str] = None, stream: bool = False, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, ProductRead)
+  options = load_options(Product, names, schema=ProductRead) if names is not None else None
+  if stream:
+    return stream_json_array(db, product_repository.select_products(SUMMARY, options), ProductRead, names)
+
+  products = await product_repository.list_products(db, SUMMARY, options)
+  if names is not None:
+    return fields_response(products, ProductRead, names)
   return products
 
 
+# GET FEATURED PRODUCTS
+# Served from the Redis cache (preloaded at startup, dropped on product/category writes)
+@router.get("/featured", response_model=List[ProductRead])
+async def list_featured_products(db: AsyncSession = Depends(get_db)):
+  return await cache.cached_response(db, cache.FEATURED_PRODUCTS)
+
+
+# AUTOCOMPLETE
+# Product and category names by prefix, most ordered first; answered from the
+# Redis prefix index alone (app/services/autocomplete.py)
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete_products(q: str = "", limit: int = Query(8, ge=1, le=20)):
+  return Response(content=await autocomplete.suggest(q, limit), media_type="application/json")
+
+
 # GET SINGLE PRODUCT
-@router.get("/{product_id}", response_model=ProductRead)
-async def get_product(product_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(
-    select(Product)
-    .where(Product.id == product_id)
-    .options(
-      # selectinload(Product.images),
-      selectinload(Product.category)
-    )
-  )
-  product = result.scalar_one_or_none()
+# Detail profile: category, images_rel and live review aggregates (2 statements)
+@router.get("/{product_id}", response_model=ProductDetail)
+async def get_product(product_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, ProductRead)
+  options = load_options(Product, names, schema=ProductRead) if names is not None else None
+  product = await product_repository.get_product_by_id(db, product_id, DETAIL, options)
 
   if not product:
     raise HTTPException(status_code=404, detail="Product not found")
 
+  if names is not None:
+    return fields_response(product, ProductRead, names)
   return product
 
+# FREQUENTLY BOUGHT TOGETHER
+# Precomputed from order co-occurrence: one Redis GET. ?expand=true adds the
+# product summaries (one extra query)
+@router.get("/{product_id}/related", response_model=List[RelatedProduct])
+async def get_related_products(product_id: str, expand: bool = False, db: AsyncSession = Depends(get_db)):
+  body = await recommendations.related_body(product_id)
+  if not expand:
+    return Response(content=body, media_type="application/json")
+
+  related = json.loads(body)
+  products = await product_repository.get_products_by_ids(db, [item["id"] for item in related])
+  return [dict(item, product=products[item["id"]]) for item in related if item["id"] in products]
+
+
+# SIMILAR PRODUCTS
+# Precomputed from name, descriptions and category (app/services/similarity.py):
+# one Redis GET, ?expand=true as for /related
+@router.get("/{product_id}/similar", response_model=List[RelatedProduct])
+async def get_similar_products(product_id: str, expand: bool = False, db: AsyncSession = Depends(get_db)):
+  body = await similarity.similar_body(product_id)
+  if not expand:
+    return Response(content=body, media_type="application/json")
+
+  similar = json.loads(body)
+  products = await product_repository.get_products_by_ids(db, [item["id"] for item in similar])
+  return [dict(item, product=products[item["id"]]) for item in similar if item["id"] in products]
+
+
+# UPLOAD PRODUCT IMAGE
+# The request body is the image. It's stored with WebP/JPEG variants at the
+# configured widths (resized in worker processes) and added to the product's
+# images; ?main=true (or a product without one) makes it the main image
+@router.post("/{product_id}/images", response_model=ProductImageUpload)
+async def upload_product_image(
+  product_id: str,
+  request: Request,
+  main: bool = False,
+  db: AsyncSession = Depends(get_db),
+):
+  if not images.available():
+    raise HTTPException(status_code=503, detail="Image processing is not installed (pip install '.[images]')")
+  product = await db.get(Product, product_id)
+  if not product:
+    raise HTTPException(status_code=404, detail="Product not found")
+
+  data = bytearray()
+  async for chunk in request.stream():
+    data += chunk
+    if len(data) > settings.IMAGE_MAX_UPLOAD_BYTES:
+      raise HTTPException(status_code=413, detail=f"Images are limited to {settings.IMAGE_MAX_UPLOAD_BYTES} bytes")
+  if not data:
+    raise HTTPException(status_code=400, detail="Send the image as the request body")
+  try:
+    url = await images.store_upload(bytes(data))
+  except images.ImageError as exc:
+    raise HTTPException(status_code=415, detail=str(exc))
+
+  if url not in (product.images or []):
+    product.images = [*(product.images or []), url]
+  if main or not product.main_image:
+    product.main_image = url
+  await db.commit()
+  await cache.invalidate(*cache.CATALOG_KEYS)
+  return {"url": url, "main_image": product.main_image, "variants": images.variant_urls(url)}
+
+
 # UPDATE PRODUCT
 @router.put("/{product_id}", response_model=ProductRead)
 async def update_product(
   product_id: str,
   product_in: ProductUpdate,
+  background_tasks: BackgroundTasks,
   db: AsyncSession = Depends(get_db)
 ):
-  result = await db.execute(
-    select(Product).where(Product.id == product_id)
-  )
-  product = result.scalar_one_or_none()
+  # Summary profile: the category the response embeds comes with the product
+  product = await product_repository.get_product_by_id(db, product_id, SUMMARY)
   if not product:
     raise HTTPException(status_code=404, detail="Product not found")
 
   # Update fields (partial updates)
   update_data = product_in.dict(exclude_unset=True)
+  # The search indexes only need refreshing when what they index changed
+  changed = {field for field, value in update_data.items() if str(getattr(product, field) or "") != str(value or "")}
   for field, value in update_data.items():
     setattr(product, field, value)
+  if "category_id" in update_data and str(product.category_id or "") != str(getattr(product.category, "id", "")):
+    product.category = await db.get(Category, product.category_id) if product.category_id else None
 
   # Update images if provided
   # if product_in.images:
@@ -124,20 +246,66 @@ async def update_product(
   #     )
   #     product.images.append(image)
 
-  db.add(product)
   await db.commit()
-  await db.refresh(product)
+  await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+  if changed & {"name", "category_id"}:
+    await autocomplete.index_product(product.id, product.name, product.category_id)
+  if changed & similarity.INDEXED_FIELDS:
+    background_tasks.add_task(similarity.refresh_product, product.id)
   return product
 
 
+# BULK PATCH PRODUCTS (prices, stock, flags)
+# Entries are grouped by the set of fields they change; each group is one UPDATE
+@router.patch("/bulk", response_model=ProductBulkPatchResult)
+async def bulk_patch_products(patches: List[ProductPatch], db: AsyncSession = Depends(get_db)):
+  # Last entry wins for an id sent more than once
+  latest = {}
+  for patch in patches:
+    latest[patch.id] = patch
+
+  groups = defaultdict(list)
+  for product_id, patch in latest.items():
+    columns = tuple(sorted(patch.model_fields_set - {"id"}))
+    if columns:
+      groups[columns].append((product_id, *[getattr(patch, name) for name in columns]))
+
+  updated = set()
+  for columns, rows in groups.items():
+    updated |= await product_repository.update_columns(db, columns, rows)
+  await db.commit()
+  if updated:
+    await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+
+  results = []
+  for product_id, patch in latest.items():
+    if product_id in updated:
+      status = "updated"
+    elif patch.model_fields_set - {"id"}:
+      status = "not_found"
+    else:
+      status = "unchanged"
+    results.append({"id": product_id, "status": status})
+  return {
+    "updated": len(updated),
+    "not_found": sum(1 for result in results if result["status"] == "not_found"),
+    "results": results,
+  }
+
+
 # DELETE PRODUCT
 @router.delete("/{product_id}")
 async def delete_product(product_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(Product).where(Product.id == product_id))
-  product = result.scalar_one_or_none()
-  if not product:
-    raise HTTPException(status_code=404, detail="Product not found")
-  
-  db.delete(product)
-  await db.commit()
+  # Owned rows (images, reviews) first, then the product; nothing is loaded
+  await db.execute(delete(ProductImage).where(ProductImage.product_id == product_id))
+  await db.execute(delete(Review).where(Review.product_id == product_id))
+  try:
+    await delete_or_404(db, Product, Product.id == product_id, detail="Product not found")
+  except IntegrityError:
+    await db.rollback()
+    raise HTTPException(status_code=409, detail="Product is still in carts, wishlists or orders")
+
+  await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+  await similarity.remove_product(product_id)
+  await autocomplete.remove_product(product_id)
   return {"detail": "Product deleted successfully"}
@@ -1,17 +1,34 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from typing import List
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
 
+from app.core.fields import column_names, fields_response, load_options, parse_fields
 from app.db.session import get_db
+from app.db.writes import delete_or_404
 from app.models.review import Review
 from app.models.product import Product
 from app.models.user import User
-from app.schemas.reviewSchema import ReviewCreate, ReviewRead
+from app.schemas.common import ProductRef
+from app.schemas.reviewSchema import ReviewCreate, ReviewRead, UserSummary
 
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
+# The nested user/product are summaries; load only the columns they serialize.
+# Both are many-to-one, so they're joined into the review SELECT itself.
+REVIEW_RELATIONS = {
+  "user": joinedload(Review.user).load_only(*[getattr(User, n) for n in column_names(User, UserSummary)]),
+  "product": joinedload(Review.product).load_only(*[getattr(Product, n) for n in column_names(Product, ProductRef)]),
+}
+
+
+def _review_options(names):
+  if names is None:
+    return list(REVIEW_RELATIONS.values())
+  return load_options(Review, names, REVIEW_RELATIONS)
+
+
 
 # CREATE REVIEW
 @router.post("/", response_model=ReviewRead)
@@ -37,27 +54,24 @@ async def create_review(review_in: ReviewCreate, db: AsyncSession = Depends(get_
     user=user
   )
 
+  # The INSERT returns created_at; product and user are already attached
   db.add(review)
   await db.commit()
-  await db.refresh(review)
-
-  # Reload review with relationships
-  result = await db.execute(
-    select(Review)
-    .where(Review.id == review.id)
-    .options(selectinload(Review.user), selectinload(Review.product))
-  )
-  return result.scalar_one()
+  return review
 
 
 # GET ALL REVIEWS
+# ?fields=id,rating,comment,user skips the product lookup (and so on)
 @router.get("/", response_model=List[ReviewRead])
-async def list_reviews(db: AsyncSession = Depends(get_db)):
+async def list_reviews(fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, ReviewRead)
   result = await db.execute(
     select(Review)
-    .options(selectinload(Review.user), selectinload(Review.product))
+    .options(*_review_options(names))
   )
   reviews = result.scalars().all()
+  if names is not None:
+    return fields_response(reviews, ReviewRead, names)
   return reviews
 
 
@@ -67,7 +81,7 @@ async def get_review(review_id: str, db: AsyncSession = Depends(get_db)):
   result = await db.execute(
     select(Review)
     .where(Review.id == review_id)
-    .options(selectinload(Review.user), selectinload(Review.product))
+    .options(*_review_options(None))
   )
   review = result.scalar_one_or_none()
   if not review:
@@ -80,7 +94,7 @@ async def get_review(review_id: str, db: AsyncSession = Depends(get_db)):
 async def update_review(review_id: str, review_in: ReviewCreate, db: AsyncSession = Depends(get_db)):
   result = await db.execute(
     select(Review).where(Review.id == review_id)
-    .options(selectinload(Review.user), selectinload(Review.product))
+    .options(*_review_options(None))
   )
   review = result.scalar_one_or_none()
   if not review:
@@ -89,51 +103,42 @@ async def update_review(review_id: str, review_in: ReviewCreate, db: AsyncSessio
   review.rating = review_in.rating
   review.comment = review_in.comment
 
-  db.add(review)
   await db.commit()
-  await db.refresh(review)
-
-  # Reload review with relationships
-  result = await db.execute(
-    select(Review)
-    .where(Review.id == review.id)
-    .options(selectinload(Review.user), selectinload(Review.product))
-  )
-  return result.scalar_one()
+  return review
 
 
 # DELETE REVIEW
 @router.delete("/{review_id}")
 async def delete_review(review_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(Review).where(Review.id == review_id))
-  review = result.scalar_one_or_none()
-  if not review:
-    raise HTTPException(status_code=404, detail="Review not found")
-
-  await db.delete(review)
-  await db.commit()
+  await delete_or_404(db, Review, Review.id == review_id, detail="Review not found")
   return {"detail": "Review deleted successfully"}
 
 
 # GET REVIEWS FOR A PRODUCT
 @router.get("/product/{product_id}", response_model=List[ReviewRead])
-async def get_reviews_for_product(product_id: str, db: AsyncSession = Depends(get_db)):
+async def get_reviews_for_product(product_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, ReviewRead)
   result = await db.execute(
     select(Review)
     .where(Review.product_id == product_id)
-    .options(selectinload(Review.user), selectinload(Review.product))
+    .options(*_review_options(names))
   )
   reviews = result.scalars().all()
+  if names is not None:
+    return fields_response(reviews, ReviewRead, names)
   return reviews
 
 
 # GET REVIEWS FOR A USER
 @router.get("/user/{user_id}", response_model=List[ReviewRead])
-async def get_reviews_for_user(user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_reviews_for_user(user_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+  names = parse_fields(fields, ReviewRead)
   result = await db.execute(
     select(Review)
     .where(Review.user_id == user_id)
-    .options(selectinload(Review.user), selectinload(Review.product))
+    .options(*_review_options(names))
   )
   reviews = result.scalars().all()
+  if names is not None:
+    return fields_response(reviews, ReviewRead, names)
   return reviews
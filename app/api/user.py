@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from sqlalchemy.orm import contains_eager
+from typing import List, Literal, Optional
 
 from app.db.session import get_db
-from app.models.user import User
-from app.schemas.userSchema import UserCreate, UserRead
+from app.models.user import CustomerStats, User
+from app.schemas.userSchema import CustomerStatsRead, UserCreate, UserRead, UserWithStats
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -25,20 +26,56 @@ async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     email=user_in.email,
     phoneNumber=user_in.phoneNumber,
     supabase_id=user_in.supabase_id,
-    role=user_in.role
+    role=user_in.role,
   )
+  # created_at / updated_at come back from the INSERT; the users_customer_stats
+  # trigger adds the customer_stats row
   db.add(user)
   await db.commit()
-  await db.refresh(user)
   return user
 
 
-# GET ALL USERS
-@router.get("/", response_model=List[UserRead])
-async def list_users(db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(User))
-  users = result.scalars().all()
-  return users
+# Sortable customer_stats columns; each has an index ending in user_id
+USER_SORTS = {
+  "order_count": CustomerStats.order_count,
+  "lifetime_spend": CustomerStats.lifetime_spend,
+  "average_order_value": CustomerStats.average_order_value,
+  "last_order_at": CustomerStats.last_order_at,
+}
+
+
+# GET ALL USERS (WITH THEIR LIFETIME STATS)
+# ?sort=lifetime_spend&order=desc&limit=50&offset=100 pages through the
+# customer_stats index; without limit every user is returned
+@router.get("/", response_model=List[UserWithStats])
+async def list_users(
+  sort: Optional[Literal["order_count", "lifetime_spend", "average_order_value", "last_order_at"]] = None,
+  order: Literal["asc", "desc"] = "desc",
+  limit: Optional[int] = Query(None, ge=1, le=200),
+  offset: int = Query(0, ge=0),
+  db: AsyncSession = Depends(get_db),
+):
+  # An inner join, so pages can be read off the customer_stats indexes. It loses
+  # no one: the users_customer_stats trigger inserts the row with the user
+  stmt = select(User).join(User.stats).options(contains_eager(User.stats))
+  if sort is None:
+    # Stable pages: customer_stats primary key order
+    stmt = stmt.order_by(CustomerStats.user_id)
+  else:
+    column = USER_SORTS[sort]
+    # The ORDER BY must match an index's NULLS placement (read forwards or
+    # backwards) to page off it. Only last_order_at is nullable; its index is
+    # DESC NULLS LAST, the others are plain ASC
+    if order == "desc":
+      key = column.desc().nulls_last() if sort == "last_order_at" else column.desc()
+      stmt = stmt.order_by(key, CustomerStats.user_id.desc())
+    else:
+      key = column.asc().nulls_first() if sort == "last_order_at" else column.asc()
+      stmt = stmt.order_by(key, CustomerStats.user_id.asc())
+  if limit is not None:
+    stmt = stmt.limit(limit).offset(offset)
+  result = await db.execute(stmt)
+  return result.scalars().all()
 
 
 # GET SINGLE USER
@@ -51,6 +88,15 @@ async def get_user(user_id: str, db: AsyncSession = Depends(get_db)):
   return user
 
 
+# GET USER LIFETIME STATS (one primary-key read)
+@router.get("/{user_id}/stats", response_model=CustomerStatsRead)
+async def get_user_stats(user_id: str, db: AsyncSession = Depends(get_db)):
+  stats = await db.get(CustomerStats, user_id)
+  if not stats:
+    raise HTTPException(status_code=404, detail="User not found")
+  return stats
+
+
 # GET USER BY SUPABASE ID
 @router.get("/by-supabase/{supabase_id}", response_model=UserRead)
 async def get_user_by_supabase_id(supabase_id: str, db: AsyncSession = Depends(get_db)):
@@ -73,9 +119,7 @@ async def update_user(user_id: str, user_in: UserCreate, db: AsyncSession = Depe
   for field, value in update_data.items():
     setattr(user, field, value)
 
-  db.add(user)
   await db.commit()
-  await db.refresh(user)
   return user
 
 
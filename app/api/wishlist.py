@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from typing import List
@@ -8,6 +9,7 @@ from uuid import UUID
 from app.db.session import get_db
 from app.models.wishlist import Wishlist, WishlistItem
 from app.models.product import Product
+from app.repositories.product_repository import SUMMARY, product_repository
 from app.schemas.wishlistSchema import (
     WishlistCreate,
     WishlistRead,
@@ -17,6 +19,9 @@ from app.schemas.wishlistSchema import (
 
 router = APIRouter(prefix="/wishlists", tags=["Wishlists"])
 
+# A wishlist's items with their products, as WishlistRead serializes them
+_WISHLIST_ITEMS = selectinload(Wishlist.items).selectinload(WishlistItem.product).selectinload(Product.category)
+
 
 # CREATE OR GET WISHLIST
 @router.post("/", response_model=WishlistRead)
@@ -29,55 +34,32 @@ async def create_or_update_wishlist(
         select(Wishlist)
         .where(Wishlist.user_id == wishlist_in.user_id)
         .order_by(Wishlist.id.desc())
-        .options(
-            selectinload(Wishlist.items)
-            .selectinload(WishlistItem.product)
-            .selectinload(Product.category),
-            selectinload(Wishlist.items)
-            .selectinload(WishlistItem.product),
-        )
+        .options(_WISHLIST_ITEMS)
     )
     wishlist = result.scalars().first()
 
     # Create wishlist if it doesn't exist
     if not wishlist:
-        wishlist = Wishlist(user_id=wishlist_in.user_id)
+        wishlist = Wishlist(user_id=wishlist_in.user_id, items=[])
         db.add(wishlist)
-        await db.flush()
-
-        # re-fetch so .items is async-safe
-        result = await db.execute(
-            select(Wishlist)
-            .where(Wishlist.id == wishlist.id)
-            .options(selectinload(Wishlist.items))
-        )
-        wishlist = result.scalar_one()
 
-    # Add provided items
+    # Add provided items, looking up all new products at once
+    saved = {str(wi.product_id) for wi in wishlist.items}
+    products = await product_repository.get_products_by_ids(
+        db, [item_in.product_id for item_in in wishlist_in.items if str(item_in.product_id) not in saved]
+    )
     for item_in in wishlist_in.items:
-        result = await db.execute(select(Product).where(Product.id == item_in.product_id))
-        product = result.scalar_one_or_none()
+        product_id = str(item_in.product_id)
+        if product_id in saved:
+            continue
+        product = products.get(product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item_in.product_id} not found")
-
-        exists = any(wi.product_id == item_in.product_id for wi in wishlist.items)
-        if not exists:
-            wishlist.items.append(WishlistItem(product_id=item_in.product_id, product=product))
+        wishlist.items.append(WishlistItem(product_id=item_in.product_id, product=product))
+        saved.add(product_id)
 
     await db.commit()
-
-    # Return fully loaded response
-    result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.id == wishlist.id)
-        .options(
-            selectinload(Wishlist.items)
-            .selectinload(WishlistItem.product)
-            .selectinload(Product.category),
-        )
-    )
-
-    return result.scalar_one()
+    return wishlist
 
 
 
@@ -87,11 +69,7 @@ async def get_wishlist(user_id: str, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(Wishlist)
         .where(Wishlist.user_id == user_id)
-        .options(
-            selectinload(Wishlist.items)
-            .selectinload(WishlistItem.product)
-            .selectinload(Product.category),
-        )
+        .options(_WISHLIST_ITEMS)
     )
 
     wishlist = result.scalar_one_or_none()
@@ -107,26 +85,25 @@ async def get_wishlist(user_id: str, db: AsyncSession = Depends(get_db)):
 async def add_wishlist_item(
   wishlist_id: str, item_in: WishlistItemCreate, db: AsyncSession = Depends(get_db)
 ):
-  result = await db.execute(select(Wishlist).where(Wishlist.id == wishlist_id))
+  result = await db.execute(select(Wishlist).where(Wishlist.id == wishlist_id).options(selectinload(Wishlist.items)))
   wishlist = result.scalar_one_or_none()
   if not wishlist:
     raise HTTPException(status_code=404, detail="Wishlist not found")
 
-  result = await db.execute(select(Product).where(Product.id == item_in.product_id))
-  product = result.scalar_one_or_none()
+  # Fetch product (with its category, for the response)
+  product = await product_repository.get_product_by_id(db, item_in.product_id, SUMMARY)
   if not product:
     raise HTTPException(status_code=404, detail="Product not found")
 
   # Avoid duplicates
   for existing_item in wishlist.items:
     if existing_item.product_id == item_in.product_id:
+      existing_item.product = product
       return existing_item
 
   wishlist_item = WishlistItem(product_id=item_in.product_id, product=product)
   wishlist.items.append(wishlist_item)
-  db.add(wishlist)
   await db.commit()
-  await db.refresh(wishlist_item)
   return wishlist_item
 
 
@@ -137,60 +114,40 @@ async def remove_wishlist_item(
     item_id: UUID,
     db: AsyncSession = Depends(get_db),
 ):
-    # 1️⃣ Ensure wishlist exists
+    # Load the wishlist as the response needs it, then drop the item from it
     result = await db.execute(
         select(Wishlist)
         .where(Wishlist.id == wishlist_id)
+        .options(_WISHLIST_ITEMS)
     )
     wishlist = result.scalar_one_or_none()
 
     if not wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found")
 
-    # 2️⃣ Ensure item exists in this wishlist
-    result = await db.execute(
-        select(WishlistItem)
-        .where(
-            WishlistItem.id == item_id,
-            WishlistItem.wishlist_id == wishlist_id,
-        )
-    )
-    wishlist_item = result.scalar_one_or_none()
-
+    wishlist_item = next((wi for wi in wishlist.items if wi.id == item_id), None)
     if not wishlist_item:
         raise HTTPException(
             status_code=404,
             detail="Item not found in this wishlist",
         )
 
-    # 3️⃣ Delete item
-    await db.delete(wishlist_item)
+    # delete-orphan turns the removal into a DELETE on commit
+    wishlist.items.remove(wishlist_item)
     await db.commit()
-
-    # 4️⃣ IMPORTANT: re-fetch with FULL eager loading
-    result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.id == wishlist_id)
-        .options(
-            selectinload(Wishlist.items)
-            .selectinload(WishlistItem.product)
-            .selectinload(Product.category)
-        )
-    )
-
-    return result.scalar_one()
+    return wishlist
 
 
 # CLEAR WISHLIST
 @router.delete("/{wishlist_id}/items")
 async def clear_wishlist(wishlist_id: str, db: AsyncSession = Depends(get_db)):
-  result = await db.execute(select(Wishlist).where(Wishlist.id == wishlist_id).options(selectinload(Wishlist.items)))
-  wishlist = result.scalar_one_or_none()
-  if not wishlist:
-    raise HTTPException(status_code=404, detail="Wishlist not found")
+  # Delete all items in one statement
+  result = await db.execute(delete(WishlistItem).where(WishlistItem.wishlist_id == wishlist_id))
+  # Nothing deleted: either the wishlist is already empty or it doesn't exist
+  if result.rowcount == 0:
+    wishlist = await db.scalar(select(Wishlist.id).where(Wishlist.id == wishlist_id))
+    if not wishlist:
+      raise HTTPException(status_code=404, detail="Wishlist not found")
 
-  # Delete all items
-  for item in wishlist.items:
-      await db.delete(item)
   await db.commit()
   return {"detail": "Wishlist cleared successfully"}
@@ -0,0 +1,149 @@
+# app/core/compression.py
+"""
+Response compression middleware.
+
+Negotiates brotli (when the optional `brotli` package is installed) or gzip from
+Accept-Encoding. Bodies smaller than `minimum_size` go out uncompressed, as do
+responses that are already encoded or whose content type doesn't compress
+(images, archives). Streaming responses are compressed chunk by chunk and each
+chunk is flushed, so clients start receiving rows straight away.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        # wbits 16 + MAX_WBITS writes a gzip header/trailer around the deflate stream
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def accepted_encodings(header: str) -> set:
+    """Codings from an Accept-Encoding header, minus any explicitly refused with q=0."""
+    accepted = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip())
+    return accepted
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        brotli_enabled: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled and brotli is not None
+
+    def _encoder(self, accept: str):
+        accepted = accepted_encodings(accept)
+        if self.brotli_enabled and "br" in accepted:
+            return BrotliEncoder(self.brotli_quality)
+        if "gzip" in accepted or "*" in accepted:
+            return GzipEncoder(self.gzip_level)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        if not accept or self._encoder(accept) is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                # Hold the headers back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                else:
+                    encoder = self._encoder(accept)
+                    headers["Content-Encoding"] = encoder.name
+                    headers.add_vary_header("Accept-Encoding")
+                    if more_body:
+                        # Streaming: length unknown until the end
+                        del headers["Content-Length"]
+                        body = encoder.chunk(body)
+                    else:
+                        body = encoder.finish(body)
+                        headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+            elif encoder is not None:
+                body = encoder.chunk(body) if more_body else encoder.finish(body)
+
+            if passthrough or encoder is None:
+                await send(message)
+            else:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from typing import Dict, List, Tuple
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
@@ -8,10 +9,50 @@ load_dotenv()
 class Settings(BaseSettings):
     PROJECT_NAME: str = "SpicesHubAPI"
     DATABASE_URI: str = "sqlite:///database.db"
+    DATABASE_SSL: bool = True
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
     JWT_SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     ALGORITHM: str = "HS256"
     REDIS_URL: str
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0        # seconds to wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_CONNECT_TIMEOUT: float = 5.0
+    GUEST_SESSION_TTL_SECONDS: int = 60 * 60 * 24 * 30   # 0 disables expiry of guest carts/wishlists
+    METRICS_ENABLED: bool = True
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024        # bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4         # used when the optional brotli package is installed
+    CACHE_TTL_SECONDS: int = 300                # 0 keeps cached payloads until a write invalidates them
+    TIMESERIES_MAX_BUCKETS: int = 1000          # longest range GET /orders/stats/timeseries serves
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 5              # at most DATABASE_POOL_SIZE stay open afterwards
+    WARMUP_REDIS_CONNECTIONS: int = 5
+    WARMUP_RETRY_SECONDS: float = 2.0
+    CART_COALESCE_ENABLED: bool = True          # buffer PUT /carts/items/{id} in Redis (app/services/cart_buffer.py)
+    CART_COALESCE_WINDOW_SECONDS: float = 2.0   # max time a buffered quantity waits before reaching Postgres
+    RELATED_PRODUCTS_LIMIT: int = 10            # neighbours kept per product (app/services/recommendations.py)
+    SIMILAR_PRODUCTS_LIMIT: int = 10            # content neighbours kept per product (app/services/similarity.py)
+    RATE_LIMIT_ENABLED: bool = True             # token buckets per IP / guest session (app/core/rate_limit.py)
+    RATE_LIMIT_CLASSES: Dict[str, Tuple[float, float]] = {
+        # route class -> (burst capacity in tokens, tokens refilled per second)
+        "default": (120, 20),
+        "expensive": (60, 1),
+        "guest": (60, 5),
+    }
+    RATE_LIMIT_COSTS: Dict[str, int] = {}       # "GET /orders/orders/" -> tokens, overriding ROUTE_LIMITS
+    RATE_LIMIT_IP_MULTIPLIER: float = 1.0       # raise when many clients share an address (NAT, offices)
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # behind a proxy that sets X-Forwarded-For
+    IMAGE_STORAGE_DIR: str = "media"            # uploaded images and their variants (app/services/images.py)
+    IMAGE_BASE_URL: str = "/media"              # public URL of IMAGE_STORAGE_DIR; a full URL for a CDN / other host
+    IMAGE_VARIANT_WIDTHS: List[int] = [160, 320, 640, 1280]
+    IMAGE_QUALITY: int = 80
+    IMAGE_WORKERS: int = 2                      # resizing processes per API worker
+    IMAGE_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    IMAGE_MAX_PIXELS: int = 40_000_000          # larger images are refused (decompression bombs)
 
     class Config:
         env_file = '.env'
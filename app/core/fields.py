@@ -0,0 +1,110 @@
+# app/core/fields.py
+"""
+Sparse fieldsets for read endpoints: `?fields=id,name,price`.
+
+Requested names are checked against the endpoint's response schema and turned
+into loader options, so only the columns (and relationships) behind those
+fields are SELECTed and hydrated. The rows are then serialized with a partial
+copy of the schema. Without `fields` an endpoint returns its full response
+model as before.
+
+Computed fields can be selected too when the schema names what they're derived
+from in a `computed_sources` class variable (e.g. main_image_variants from
+main_image): those fields are loaded and read but only output if requested.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter, computed_field, create_model
+from pydantic.fields import FieldInfo
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+
+def parse_fields(fields: Optional[str], schema) -> Optional[Tuple[str, ...]]:
+    """
+    Split a `fields` query value into schema field names (None when not given).
+    `id` is always included; unknown names are a 400.
+    """
+    if not fields:
+        return None
+
+    names = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+
+    unknown = [name for name in names if name not in schema.model_fields and name not in schema.model_computed_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    if "id" in schema.model_fields and "id" not in names:
+        names.insert(0, "id")
+    return tuple(names)
+
+
+def computed_sources(schema, names) -> Tuple[str, ...]:
+    """The fields that the computed fields among `names` are derived from."""
+    sources = getattr(schema, "computed_sources", {})
+    return tuple(source for name in names for source in sources.get(name, ()))
+
+
+def column_names(model, schema) -> List[str]:
+    """Names of the model's columns that the schema serializes."""
+    columns = inspect(model).column_attrs
+    return [name for name in schema.model_fields if name in columns]
+
+
+def load_options(model, names, loaders: Dict[str, object] = None, schema=None) -> list:
+    """
+    Loader options that fetch only what `names` needs: `load_only` for the columns
+    (plus the primary key and any foreign keys of requested relationships), and
+    `selectinload` for requested relationships unless `loaders` gives a more
+    specific option for one. Pass the `schema` when `names` may include its
+    computed fields, so the fields they're derived from are loaded as well.
+    """
+    mapper = inspect(model)
+    loaders = loaders or {}
+    columns = {mapper.get_property_by_column(col).key for col in mapper.primary_key}
+    options = []
+
+    if schema is not None:
+        names = tuple(names) + computed_sources(schema, names)
+    for name in names:
+        if name in mapper.column_attrs:
+            columns.add(name)
+        elif name in mapper.relationships:
+            rel = mapper.relationships[name]
+            columns.update(mapper.get_property_by_column(col).key for col in rel.local_columns)
+            options.append(loaders.get(name) or selectinload(getattr(model, name)))
+
+    return [load_only(*[getattr(model, name) for name in sorted(columns)])] + options
+
+
+@lru_cache(maxsize=256)
+def schema_adapter(schema, names: Optional[Tuple[str, ...]] = None, many: bool = True) -> TypeAdapter:
+    """TypeAdapter for the schema (or a partial copy with only `names`), over a list when `many`."""
+    if names is not None:
+        fields = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names if name in schema.model_fields}
+        # Loaded only for a computed field: read, but not output
+        for name in computed_sources(schema, names):
+            if name not in fields:
+                info = schema.model_fields[name]
+                fields[name] = (info.annotation, FieldInfo.merge_field_infos(info, exclude=True))
+        computed = {
+            name: computed_field(info.wrapped_property, return_type=info.return_type, description=info.description)
+            for name, info in schema.model_computed_fields.items() if name in names
+        }
+        # Computed fields come from a base class; create_model only takes fields
+        base = type(f"{schema.__name__}Computed", (BaseModel,), {"__module__": __name__, **computed}) if computed else None
+        schema = create_model(f"{schema.__name__}Fields", __base__=base, **fields)
+    return TypeAdapter(List[schema] if many else schema)
+
+
+def fields_response(content, schema, names: Tuple[str, ...]) -> JSONResponse:
+    """Serialize ORM row(s) with only the selected schema fields."""
+    adapter = schema_adapter(schema, names, isinstance(content, (list, tuple)))
+    data = adapter.validate_python(content, from_attributes=True)
+    return JSONResponse(adapter.dump_python(data, mode="json"))
@@ -0,0 +1,126 @@
+# app/core/metrics.py
+"""
+Prometheus metrics for the API.
+
+PrometheusMiddleware records per-route latency, status codes and in-flight
+requests. Route labels come from the matched FastAPI route template
+(e.g. /products/products/{product_id}) so label cardinality stays bounded.
+DB and Redis time spent while serving a request are accumulated through a
+context variable and recorded per route alongside the total latency. The Redis
+client hooks live in app.core.redis_metrics so redis is only imported when the
+client is created.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served", ["method"])
+DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in database calls per request", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REDIS_TIME = Histogram(
+    "http_request_redis_seconds", "Time spent in Redis calls per request", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestTimings:
+    __slots__ = ("db", "redis")
+
+    def __init__(self):
+        self.db = 0.0
+        self.redis = 0.0
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def _add_db_time(elapsed: float):
+    timings = _timings.get()
+    if timings is not None:
+        timings.db += elapsed
+
+
+def add_redis_time(elapsed: float):
+    timings = _timings.get()
+    if timings is not None:
+        timings.redis += elapsed
+
+
+# --- Database instrumentation ---
+
+def instrument_engine(engine):
+    """Attach cursor timing hooks to an (async) SQLAlchemy engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _add_db_time(time.perf_counter() - conn.info["query_start"].pop())
+
+
+# --- ASGI middleware ---
+
+class PrometheusMiddleware:
+    def __init__(self, app, exclude_paths=("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        timings = RequestTimings()
+        token = _timings.set(timings)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.labels(method).dec()
+            _timings.reset(token)
+
+            # FastAPI stores the matched APIRoute in the scope during routing
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or UNMATCHED_ROUTE
+
+            REQUESTS.labels(method, route_label, str(status_code)).inc()
+            LATENCY.labels(method, route_label).observe(elapsed)
+            DB_TIME.labels(method, route_label).observe(timings.db)
+            REDIS_TIME.labels(method, route_label).observe(timings.redis)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,173 @@
+# app/core/rate_limit.py
+"""
+Token-bucket rate limiting, enforced before routing.
+
+Every request takes `cost` tokens from the buckets of its route class: one per
+client IP and, when the request carries a guest session (the `session_id`
+path parameter or an X-Session-Id header), one per session. A bucket holds up
+to `capacity` tokens and refills at `rate` tokens per second
+(RATE_LIMIT_CLASSES). When any bucket is short, nothing is taken and the
+request gets a 429 with Retry-After, without reaching a route, so it never
+touches Postgres.
+
+Route classes and costs are in ROUTE_LIMITS; expensive routes (full-table
+listings, dashboard aggregates, bulk writes) cost more from a smaller bucket.
+RATE_LIMIT_COSTS overrides a route's cost by "METHOD /path/template".
+
+The check is one Lua script (one round trip), so concurrent requests can't
+both spend the same tokens. If Redis is unavailable requests are let through.
+"""
+import logging
+import math
+from typing import Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Mount
+
+from app.core.config import settings
+from app.db.redis import run_script
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "rl:"
+DEFAULT_CLASS = "default"
+
+# (method, route template) -> (class, cost). Unlisted routes are DEFAULT_CLASS, cost 1
+ROUTE_LIMITS = {
+    ("GET", "/orders/orders/"): ("expensive", 10),
+    ("GET", "/users/users/"): ("expensive", 10),
+    ("GET", "/orders/orders/items/topProducts"): ("expensive", 3),
+    ("GET", "/orders/orders/items/categorySales"): ("expensive", 3),
+    ("GET", "/orders/orders/stats/timeseries"): ("expensive", 3),
+    ("POST", "/products/products/import"): ("expensive", 30),
+    ("PATCH", "/products/products/bulk"): ("expensive", 10),
+    ("POST", "/products/products/{product_id}/images"): ("expensive", 5),
+}
+# Guest cart and wishlist routes; their writes re-read products from Postgres
+GUEST_PREFIX = "/guest/"
+GUEST_CLASS = "guest"
+GUEST_WRITE_COST = 2
+
+EXEMPT_PATHS = {"/health/live", "/health/ready", "/metrics"}
+
+# KEYS: buckets. ARGV: cost, then capacity and refill per second for each bucket.
+# Takes cost tokens from every bucket or from none.
+# Returns {1, 0} when allowed, else {0, milliseconds until it would be}.
+TAKE_LUA = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local levels, wait = {}, 0
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[2 * i])
+  local rate = tonumber(ARGV[2 * i + 1]) / 1000
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or capacity
+  local ts = tonumber(state[2]) or now
+  tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+  local need = math.min(cost, capacity)
+  if tokens < need then
+    wait = math.max(wait, math.ceil((need - tokens) / rate))
+  end
+  levels[i] = {tokens - need, math.ceil(capacity / rate)}
+end
+if wait > 0 then return {0, wait} end
+for i, key in ipairs(KEYS) do
+  redis.call('HSET', key, 'tokens', levels[i][1], 'ts', now)
+  redis.call('PEXPIRE', key, levels[i][2])
+end
+return {1, 0}
+"""
+
+
+def route_limit(scope) -> Optional[Tuple[str, int, dict]]:
+    """(class, cost, path params) for the route a request will hit; None if it isn't limited."""
+    if scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+        return None
+    for route in scope["app"].router.routes:
+        match, child = route.matches(scope)
+        if match == Match.FULL:
+            break
+    else:
+        # 404 / 405: answered by the router without touching the database
+        return None
+    if isinstance(route, Mount):
+        # Static files (uploaded images)
+        return None
+
+    method, template = scope["method"], route.path
+    if (method, template) in ROUTE_LIMITS:
+        route_class, cost = ROUTE_LIMITS[(method, template)]
+    elif template.startswith(GUEST_PREFIX):
+        route_class, cost = GUEST_CLASS, 1 if method == "GET" else GUEST_WRITE_COST
+    else:
+        route_class, cost = DEFAULT_CLASS, 1
+    cost = settings.RATE_LIMIT_COSTS.get(f"{method} {template}", cost)
+    return route_class, cost, child.get("path_params", {})
+
+
+def client_ip(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def session_id(scope, path_params: dict) -> Optional[str]:
+    if path_params.get("session_id"):
+        return str(path_params["session_id"])
+    for name, value in scope["headers"]:
+        if name == b"x-session-id":
+            return value.decode("latin-1")
+    return None
+
+
+async def take(scope) -> int:
+    """0 when the request may proceed, else the milliseconds until it could."""
+    limit = route_limit(scope)
+    if limit is None:
+        return 0
+    route_class, cost, path_params = limit
+    capacity, rate = settings.RATE_LIMIT_CLASSES.get(route_class) or settings.RATE_LIMIT_CLASSES[DEFAULT_CLASS]
+    if cost <= 0:
+        return 0
+
+    multiplier = settings.RATE_LIMIT_IP_MULTIPLIER
+    keys = [f"{PREFIX}{route_class}:ip:{client_ip(scope)}"]
+    args = [cost, capacity * multiplier, rate * multiplier]
+    session = session_id(scope, path_params)
+    if session:
+        keys.append(f"{PREFIX}{route_class}:session:{session}")
+        args += [capacity, rate]
+
+    allowed, wait = await run_script(TAKE_LUA, keys=keys, args=args)
+    return 0 if allowed else max(int(wait), 1)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            wait = await take(scope)
+        except Exception as exc:
+            # Fail open: an unavailable limiter shouldn't take the API down with it
+            logger.warning("Rate limiter unavailable, letting the request through: %s", exc)
+            wait = 0
+
+        if wait:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait / 1000))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
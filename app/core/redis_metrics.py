@@ -0,0 +1,37 @@
+# app/core/redis_metrics.py
+"""
+Redis client instrumentation for app.core.metrics.
+
+Kept apart from the metrics module so that importing the app (or any script
+that only needs the database) doesn't import redis; app.db.redis imports this
+when it creates the client.
+"""
+import time
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.core.metrics import add_redis_time
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            add_redis_time(time.perf_counter() - start)
+
+
+class InstrumentedRedis(Redis):
+    """Redis client that reports time spent per command to the request metrics."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            add_redis_time(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
@@ -0,0 +1,40 @@
+# app/core/streaming.py
+"""
+Streaming JSON arrays for large list endpoints.
+
+Rows are fetched from a server-side cursor in chunks (`yield_per`), serialized a
+chunk at a time with the endpoint's response schema and flushed to the client,
+so neither the full result set nor the full JSON body is held in memory.
+"""
+from typing import Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.fields import schema_adapter
+
+STREAM_CHUNK_SIZE = 500
+
+
+async def _json_array(db: AsyncSession, stmt, adapter, chunk_size: int):
+    yield b"["
+    first = True
+    result = await db.stream_scalars(stmt.execution_options(yield_per=chunk_size))
+    async for rows in result.partitions():
+        # dump_json gives b"[a,b,...]"; splice the chunks into one array
+        body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+        yield (b"" if first else b",") + body[1:-1]
+        first = False
+    yield b"]"
+
+
+def stream_json_array(
+    db: AsyncSession,
+    stmt,
+    schema,
+    names: Optional[Tuple[str, ...]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> StreamingResponse:
+    """Stream the rows of `stmt` as a JSON array of `schema` (limited to `names` if given)."""
+    adapter = schema_adapter(schema, names)
+    return StreamingResponse(_json_array(db, stmt, adapter, chunk_size), media_type="application/json")
@@ -3,7 +3,7 @@ from sqlalchemy.orm import declarative_base
 Base = declarative_base()
 
 
-from app.models.user import User
+from app.models.user import User, CustomerStats
 from app.models.product import Product, ProductImage, Category
 from app.models.order import Order, OrderItem
 from app.models.cart import Cart, CartItem
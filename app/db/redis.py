@@ -0,0 +1,92 @@
+from typing import TYPE_CHECKING, Optional
+
+from app.core.config import settings
+
+# redis is imported when the client is created (init_redis), not with this
+# module, which every service imports
+if TYPE_CHECKING:
+  from redis.asyncio import BlockingConnectionPool
+  from app.core.redis_metrics import InstrumentedRedis
+
+# Option name redis-py checks to skip decode_responses for one command
+# (redis.client.NEVER_DECODE)
+NEVER_DECODE = "NEVER_DECODE"
+
+redis_pool: "Optional[BlockingConnectionPool]" = None
+redis_client: "Optional[InstrumentedRedis]" = None
+
+# Lua scripts registered against the shared client, keyed by source
+_scripts = {}
+
+
+def init_redis() -> "InstrumentedRedis":
+  """
+  Create the shared Redis connection pool and client.
+  Called from the app lifespan; scripts and workers get it lazily via get_redis().
+  """
+  global redis_pool, redis_client
+  if redis_client is None:
+    from redis.asyncio import BlockingConnectionPool
+    from app.core.redis_metrics import InstrumentedRedis
+
+    redis_pool = BlockingConnectionPool.from_url(
+      settings.REDIS_URL,
+      max_connections=settings.REDIS_MAX_CONNECTIONS,
+      timeout=settings.REDIS_POOL_TIMEOUT,
+      socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+      socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+      health_check_interval=30,
+      encoding="utf-8",
+      decode_responses=True,
+    )
+    redis_client = InstrumentedRedis(connection_pool=redis_pool)
+  return redis_client
+
+
+async def close_redis():
+  global redis_pool, redis_client
+  if redis_client is not None:
+    await redis_client.aclose()
+  if redis_pool is not None:
+    await redis_pool.aclose()
+  redis_client = None
+  redis_pool = None
+  _scripts.clear()
+
+
+async def get_redis() -> "InstrumentedRedis":
+  return redis_client or init_redis()
+
+
+async def get_bytes(key: str) -> Optional[bytes]:
+  """GET without response decoding, for binary values."""
+  r = await get_redis()
+  return await r.execute_command("GET", key, **{NEVER_DECODE: True})
+
+
+async def take_bytes(key: str) -> Optional[bytes]:
+  """GETDEL without response decoding: read a binary value and delete it atomically."""
+  r = await get_redis()
+  return await r.execute_command("GETDEL", key, **{NEVER_DECODE: True})
+
+
+async def run_script(source: str, keys: list, args: list, decode: bool = True):
+  """
+  Run a Lua script with EVALSHA (loading it on first use): one round trip.
+  Pass decode=False when the script returns binary values.
+  """
+  from redis.exceptions import NoScriptError
+
+  r = await get_redis()
+  script = _scripts.get(source)
+  if script is None:
+    script = _scripts[source] = r.register_script(source)
+  if decode:
+    return await script(keys=keys, args=args)
+
+  options = {NEVER_DECODE: True}
+  try:
+    return await r.execute_command("EVALSHA", script.sha, len(keys), *keys, *args, **options)
+  except NoScriptError:
+    script.sha = await r.script_load(script.script)
+    return await r.execute_command("EVALSHA", script.sha, len(keys), *keys, *args, **options)
@@ -1,17 +1,22 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 
 engine = create_async_engine(
     settings.DATABASE_URI,
     echo=False,
     future=True,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
     pool_recycle=1800, 
     pool_pre_ping=True,
-    connect_args={"ssl": "require"}       # keep connections alive
+    connect_args={"ssl": "require"} if settings.DATABASE_SSL else {}       # keep connections alive
 )
 
+instrument_engine(engine)
+
 async_session = sessionmaker(
   bind=engine, 
   class_=AsyncSession, 
@@ -0,0 +1,31 @@
+# app/db/writes.py
+"""
+Write-path conventions for routes.
+
+Sessions don't expire instances on commit, and models with server-generated
+columns (users, reviews, orders) set `eager_defaults`, so INSERT/UPDATE ...
+RETURNING hands those columns back during the flush. After `commit()` an
+instance already holds everything its response needs, so write routes:
+
+- never `refresh()` or re-select after committing;
+- load what the response serializes *before* the write (with the repository
+  load profiles), or attach related objects they already hold
+  (`review.product = product`), so serialization never lazy-loads;
+- delete by primary key with a single DELETE instead of select-then-delete
+  (`delete_or_404`).
+
+`python -m benchmarks.write_counts` checks the statement count of every write
+endpoint against a fixed budget.
+"""
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def delete_or_404(db: AsyncSession, model, *criteria, detail: str):
+    """DELETE FROM model WHERE criteria and commit; 404 with `detail` when no row matched."""
+    result = await db.execute(delete(model).where(*criteria))
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail=detail)
+    await db.commit()
@@ -1,11 +1,58 @@
 # main.py
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import api_router
+from app.api import include_routers
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.metrics import PrometheusMiddleware, metrics_endpoint
+from app.core.rate_limit import RateLimitMiddleware
+from app.db.redis import init_redis, close_redis
+from app.db.session import engine
+from app.services import cart_buffer, images, similarity, warmup
 import asyncio
 
-app = FastAPI(title="E-commerce API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Redis pool shared by every service, created before serving traffic
+    init_redis()
+    # Prime DB/Redis connections and preload hot caches in the background;
+    # /health/ready reports 503 until it finishes
+    task = None
+    if settings.WARMUP_ENABLED:
+        task = asyncio.create_task(warmup.warm_up())
+    else:
+        warmup.state.ready = True
+    # Write buffered cart quantity updates back to Postgres in batches
+    flusher = None
+    if settings.CART_COALESCE_ENABLED:
+        flusher = asyncio.create_task(cart_buffer.run_flusher())
+    yield
+    for background in (task, flusher):
+        if background is not None and not background.done():
+            background.cancel()
+            try:
+                await background
+            except asyncio.CancelledError:
+                pass
+    if settings.CART_COALESCE_ENABLED:
+        await cart_buffer.flush_all()
+    images.shutdown()
+    similarity.shutdown()
+    await close_redis()
+    await engine.dispose()
+
+
+app = FastAPI(title="E-commerce API", version="1.0.0", lifespan=lifespan)
+
+# Token buckets per client, checked before routing: 429s never reach the
+# database. Added first so it runs inside CORS (429s keep the CORS headers)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 
 # CORS configuration (adjust origins as needed)
 origins = [
@@ -23,8 +70,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip / brotli for responses over the size threshold (streamed responses chunk by chunk)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Per-route latency / status metrics, scraped from /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Include all routers
-app.include_router(api_router)
+include_routers(app)
+
+# Uploaded images and their variants, unless IMAGE_BASE_URL points at another host
+if not urlparse(settings.IMAGE_BASE_URL).netloc:
+    app.mount(
+        urlparse(settings.IMAGE_BASE_URL).path.rstrip("/"),
+        images.MediaFiles(directory=settings.IMAGE_STORAGE_DIR, check_dir=False),
+        name="media",
+    )
 
 
 # Optional: simple root endpoint
@@ -1,4 +1,4 @@
-from .user import User
+from .user import User, CustomerStats
 from .product import Product, ProductImage, Category
 from .order import Order, OrderItem
 from .cart import Cart, CartItem
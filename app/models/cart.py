@@ -14,9 +14,7 @@ class Cart(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
     user_id = Column(String(255), ForeignKey("users.supabase_id"), unique=True, nullable=False)
 
@@ -31,11 +29,9 @@ class CartItem(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
-    cart_id = Column(UUID(as_uuid=True), ForeignKey("carts.id"), nullable=False)
+    cart_id = Column(UUID(as_uuid=True), ForeignKey("carts.id"), nullable=False, index=True)
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"))
     container = Column(String, nullable=True) 
     quantity = Column(Integer)
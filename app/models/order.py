@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, ForeignKey, TIMESTAMP, ARRAY, UUID, Text
+    Column, Integer, String, Float, Boolean, ForeignKey, TIMESTAMP, ARRAY, UUID, Text, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -8,14 +8,20 @@ import uuid
 
 class Order(Base):
     __tablename__ = "orders"
+    # Fetch server defaults (created_at) with RETURNING during flush
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # A user's order history, newest first, straight off the index
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+        # Date-range scans for GET /orders/stats/timeseries
+        Index("ix_orders_created_at", "created_at"),
+    )
 
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     status = Column(String)
@@ -44,12 +50,10 @@ class OrderItem(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
-    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"))
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"))
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), index=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), index=True)
     name = Column(String)
     image = Column(String, nullable=True)
     container = Column(String, nullable=True)
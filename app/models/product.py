@@ -1,7 +1,7 @@
 from sqlalchemy import (
     Column, Integer, String, Float, Text, Boolean, ForeignKey, TIMESTAMP, ARRAY, UUID
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import query_expression, relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 import uuid
@@ -13,9 +13,7 @@ class Product(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
   name = Column(String)
   price = Column(Float)
@@ -34,12 +32,16 @@ class Product(Base):
   main_image = Column(String, nullable=True)
   images = Column(ARRAY(String))
   cost_per_item = Column(Float) #cost per 100g
-  category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"))
+  category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), index=True)
 
   category = relationship("Category", back_populates="products")
   images_rel = relationship("ProductImage", back_populates="product", cascade="all, delete")
   reviews = relationship("Review", back_populates="product", cascade="all, delete-orphan")
 
+  # Live review aggregates, only populated by the repository's detail profile
+  review_average = query_expression()
+  review_total = query_expression()
+
 
 class ProductImage(Base):
   __tablename__ = "product_images"
@@ -48,9 +50,7 @@ class ProductImage(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
   url = Column(String)
   alt_text = Column(String, nullable=True)
@@ -68,9 +68,7 @@ class Category(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
     name = Column(String)
     status = Column(String, default='draft')
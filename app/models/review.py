@@ -9,17 +9,17 @@ import uuid
 
 class Review(Base):
     __tablename__ = "reviews"
+    # created_at is returned by the INSERT, so no refresh() after commit
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     rating = Column(Float)
     comment = Column(String)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -10,9 +10,7 @@ class ShippingAddress(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
   country = Column(String, nullable=False)
   city = Column(String, nullable=False)
@@ -1,9 +1,9 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, ForeignKey, TIMESTAMP, ARRAY, DateTime, Enum
+    DDL, Column, Integer, String, Float, Boolean, ForeignKey, TIMESTAMP, ARRAY, DateTime, Enum, Computed, Index, event
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.db.base_class import Base
 import uuid
 import enum
@@ -15,14 +15,14 @@ class UserRole(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    # created_at / updated_at come back via RETURNING on INSERT and UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
     supabase_id = Column(String(255), unique=True, index=True)
     firstName = Column(String(255))
@@ -43,4 +43,48 @@ class User(Base):
     carts = relationship("Cart", back_populates="user", cascade="all, delete-orphan")
     wishlists = relationship("Wishlist", back_populates="user", cascade="all, delete-orphan")
     reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan")
-    shipping_addresses = relationship("ShippingAddress", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    shipping_addresses = relationship("ShippingAddress", back_populates="user", cascade="all, delete-orphan")
+    # ON DELETE CASCADE removes the row; passive_deletes skips loading it first
+    stats = relationship(
+        "CustomerStats", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True
+    )
+
+
+class CustomerStats(Base):
+    """
+    Lifetime order metrics per user, one row per user, created by the
+    users_customer_stats trigger when the user is inserted. Maintained by the order routes in the same transaction as the order write
+    (app/services/customer_stats.py). Cancelled orders don't count.
+    """
+    __tablename__ = "customer_stats"
+    # Sort keys of the users list; user_id breaks ties so pages are stable
+    __table_args__ = (
+        Index("ix_customer_stats_order_count", "order_count", "user_id"),
+        Index("ix_customer_stats_lifetime_spend", "lifetime_spend", "user_id"),
+        Index("ix_customer_stats_average_order_value", "average_order_value", "user_id"),
+        # Newest first with never-ordered customers last (read backwards for oldest first)
+        Index("ix_customer_stats_last_order_at", text("last_order_at DESC NULLS LAST"), text("user_id DESC")),
+    )
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0, server_default="0")
+    lifetime_spend = Column(Float, nullable=False, default=0, server_default="0")
+    average_order_value = Column(Float, Computed("COALESCE(lifetime_spend / NULLIF(order_count, 0), 0)"))
+    last_order_at = Column(DateTime(timezone=True), nullable=True)
+
+    user = relationship("User", back_populates="stats")
+
+
+# Same DDL as migration 6e3b8d1f4a27, for databases built with create_all
+event.listen(CustomerStats.__table__, "after_create", DDL("""
+    CREATE OR REPLACE FUNCTION customer_stats_for_new_user() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO customer_stats (user_id) VALUES (NEW.id) ON CONFLICT (user_id) DO NOTHING;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""))
+event.listen(CustomerStats.__table__, "after_create", DDL("""
+    CREATE TRIGGER users_customer_stats AFTER INSERT ON users
+    FOR EACH ROW EXECUTE FUNCTION customer_stats_for_new_user()
+"""))
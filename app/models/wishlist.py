@@ -15,9 +15,7 @@ class Wishlist(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
     user_id = Column(String(255), ForeignKey("users.supabase_id"), unique=True, nullable=False)
 
@@ -32,9 +30,7 @@ class WishlistItem(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
-        nullable=False,
-        index=True
+        nullable=False
     )
     wishlist_id = Column(UUID(as_uuid=True), ForeignKey("wishlists.id"), unique=True, nullable=False)
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), unique=True)
@@ -1,24 +1,38 @@
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from app.models.product import Category
+from app.core.fields import column_names
+from app.models.product import Category, Product
+from app.schemas.common import ProductSummary
+
+# Categories serialize their products as summaries: one selectin for all
+# categories' products, loading only the summary columns
+PRODUCT_SUMMARIES = selectinload(Category.products).load_only(
+    *[getattr(Product, name) for name in column_names(Product, ProductSummary)]
+)
+
 
 class CategoryRepository:
+    def options(self, options=None) -> list:
+        """Loader options: categories with product summaries, unless explicit `options` are given."""
+        if options is not None:
+            return list(options)
+        return [PRODUCT_SUMMARIES]
+
+    def select_with_products(self, options=None):
+        return select(Category).options(*self.options(options))
 
     async def get_all(self, db: AsyncSession):
         result = await db.execute(select(Category))
         return result.scalars().all()
 
-    async def get_with_products(self, db: AsyncSession, category_id: int):
+    async def list_with_products(self, db: AsyncSession, options=None):
+        result = await db.execute(self.select_with_products(options))
+        return result.scalars().all()
+
+    async def get_with_products(self, db: AsyncSession, category_id, options=None):
         result = await db.execute(
-            select(Category)
-            .where(Category.id == category_id)
-            .options(
-                selectinload(Category.products)
-                .selectinload("images"),   # If you have image relationship
-                selectinload(Category.products)
-                .selectinload("category")
-            )
+            self.select_with_products(options).where(Category.id == category_id)
         )
         return result.scalar_one_or_none()
 
@@ -1,19 +1,112 @@
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+import uuid
+from typing import Iterable, Sequence
+from sqlalchemy import ARRAY, UUID, any_, bindparam, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import joinedload, selectinload, with_expression
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.product import Product
+from app.models.review import Review
+
+# Load profiles
+#   summary: product + category in one joined SELECT (1 statement)
+#   detail:  summary + review aggregates as correlated subqueries in the same
+#            SELECT, + images_rel through one selectin (2 statements)
+SUMMARY = "summary"
+DETAIL = "detail"
+
+_review_average = (
+    select(func.avg(Review.rating)).where(Review.product_id == Product.id).scalar_subquery()
+)
+_review_total = (
+    select(func.count(Review.id)).where(Review.product_id == Product.id).scalar_subquery()
+)
+
+PROFILES = {
+    SUMMARY: (
+        joinedload(Product.category),
+    ),
+    DETAIL: (
+        joinedload(Product.category),
+        selectinload(Product.images_rel),
+        with_expression(Product.review_average, _review_average),
+        with_expression(Product.review_total, _review_total),
+    ),
+}
+
 
 class ProductRepository:
-    async def get_product_by_id(self, db: AsyncSession, product_id: int):
+    def options(self, profile: str = SUMMARY, options=None) -> list:
+        """Loader options for a profile; explicit `options` (e.g. from ?fields=) take precedence."""
+        if options is not None:
+            return list(options)
+        return list(PROFILES[profile])
+
+    def select_products(self, profile: str = SUMMARY, options=None):
+        """SELECT for a product listing, for callers that execute or stream it themselves."""
+        return select(Product).options(*self.options(profile, options))
+
+    async def list_products(self, db: AsyncSession, profile: str = SUMMARY, options=None):
+        result = await db.execute(self.select_products(profile, options))
+        return result.scalars().all()
+
+    async def get_product_by_id(self, db: AsyncSession, product_id, profile: str = DETAIL, options=None):
         stmt = (
             select(Product)
             .where(Product.id == product_id)
-            .options(
-                selectinload(Product.category),
-                selectinload(Product.images),
-            )
+            .options(*self.options(profile, options))
         )
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_products_by_ids(self, db: AsyncSession, product_ids, profile: str = SUMMARY) -> dict:
+        """Load many products (summary profile) in one query, keyed by str(id). Invalid ids are skipped."""
+        ids = set()
+        for pid in product_ids:
+            try:
+                ids.add(uuid.UUID(str(pid)))
+            except ValueError:
+                continue
+        if not ids:
+            return {}
+
+        stmt = (
+            select(Product)
+            .where(Product.id.in_(ids))
+            .options(*self.options(profile))
+        )
+        result = await db.execute(stmt)
+        return {str(p.id): p for p in result.scalars().all()}
+
+    async def get_existing_ids(self, db: AsyncSession, product_ids) -> set:
+        """Return the subset of product_ids that exist, with one `id = ANY(:ids)` query."""
+        ids = list(product_ids)
+        if not ids:
+            return set()
+        stmt = select(Product.id).where(
+            Product.id == any_(bindparam("ids", ids, type_=ARRAY(UUID(as_uuid=True))))
+        )
+        result = await db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def update_columns(self, db: AsyncSession, columns: Sequence[str], rows: Iterable[tuple]) -> set:
+        """
+        Set `columns` on many products in one UPDATE ... FROM unnest(...) (one
+        array parameter per column, however many rows). `rows` are (id, *values)
+        tuples. Returns the ids that matched; the caller commits.
+        """
+        rows = list(rows)
+        dialect = postgresql.dialect()
+        arrays = [f"CAST(:c{i} AS {Product.__table__.c[name].type.compile(dialect=dialect)}[])" for i, name in enumerate(columns)]
+        sets = ", ".join(f'"{name}" = v."{name}"' for name in columns)
+        params = {"ids": [row[0] for row in rows]}
+        params.update({f"c{i}": [row[i + 1] for row in rows] for i in range(len(columns))})
+        stmt = text(f"""
+            UPDATE products AS p SET {sets}
+            FROM unnest(CAST(:ids AS uuid[]), {", ".join(arrays)}) AS v(id, {", ".join(f'"{name}"' for name in columns)})
+            WHERE p.id = v.id
+            RETURNING p.id
+        """)
+        result = await db.execute(stmt, params)
+        return set(result.scalars().all())
+
 product_repository = ProductRepository()
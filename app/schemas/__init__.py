@@ -1,7 +1,27 @@
-from .cartSchema import CartBase, CartCreate, CartRead, CartItemBase, CartItemCreate, CartItemRead, ProductSummary, GuestCartItemRead, GuestCartRead
-from .orderSchema import OrderBase, OrderCreate, OrderRead, OrderItemBase, OrderItemCreate, OrderItemRead
-from .productSchema import ProductBase, ProductCreate, ProductRead, ProductImageBase, ProductImageCreate, ProductUpdate
-from .reviewSchema import ReviewBase, ReviewCreate, ReviewRead, UserSummary, ProductSummary
-from .userSchema import UserBase, UserCreate, UserRead
-from .wishlistSchema import ProductSummary, WishlistBase, WishlistCreate, WishlistRead, WishlistItemBase, WishlistItemCreate, WishlistItemRead
-from .shipping import UserNested, ShippingBase, ShippingCreate, ShippingUpdate
\ No newline at end of file
+"""
+Schema re-exports. Resolved on first attribute access, so importing one schema
+module doesn't import (and build the validators of) every other one.
+"""
+from importlib import import_module
+
+_MODULES = {
+    ".common": ["CategorySummary", "ProductRef", "ImageVariant", "ProductSummary", "ProductCard"],
+    ".cartSchema": ["CartBase", "CartCreate", "CartRead", "CartItemBase", "CartItemCreate", "CartItemRead", "CartProduct", "GuestCartItemRead", "GuestCartRead"],
+    ".orderSchema": ["OrderBase", "OrderCreate", "OrderRead", "OrderItemBase", "OrderItemCreate", "OrderItemRead"],
+    ".productSchema": ["ProductBase", "ProductCreate", "ProductRead", "ProductImageBase", "ProductImageCreate", "ProductUpdate", "ProductPatch", "ProductBulkPatchResult", "ProductImportResult", "RelatedProduct", "ProductImageUpload", "AutocompleteSuggestion"],
+    ".reviewSchema": ["ReviewBase", "ReviewCreate", "ReviewRead", "UserSummary"],
+    ".userSchema": ["UserBase", "UserCreate", "UserRead", "CustomerStatsRead", "UserWithStats"],
+    ".wishlistSchema": ["WishlistBase", "WishlistCreate", "WishlistRead", "WishlistItemBase", "WishlistItemCreate", "WishlistItemRead"],
+    ".shipping": ["UserNested", "ShippingBase", "ShippingCreate", "ShippingUpdate"],
+}
+_EXPORTS = {name: module for module, names in _MODULES.items() for name in names}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(import_module(module, __name__), name)
+    return value
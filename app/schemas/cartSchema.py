@@ -2,34 +2,16 @@ from pydantic import BaseModel, UUID4
 from typing import List
 from typing import Optional
 
+from app.schemas.common import ProductCard
 
-# CART ITEM SCHEMAS
-
-from typing import Optional
-from pydantic import BaseModel
-
-class CategoryRead(BaseModel):
-    id: UUID4
-    image: Optional[str] = None
-    name: str
-
-    model_config = {"from_attributes": True}
-
-
-class ProductSummary(BaseModel):
-    id: UUID4
-    name: str
-    price: float
-    main_image: Optional[str] = None
-    category: Optional[CategoryRead] = None
-    rating: Optional[float] = 0.0
-    reviewCount: Optional[int] = 0
-    isSale: bool = False
-    isNew: bool = False
 
+class CartProduct(ProductCard):
+    # Not a product column (the line's container is on the item); kept for
+    # clients that read product.container
     container: Optional[str] = None
 
-    model_config = {"from_attributes": True}
+
+# CART ITEM SCHEMAS
 
 class CartItemBase(BaseModel):
   product_id: UUID4
@@ -43,7 +25,13 @@ class CartItemCreate(CartItemBase):
 
 class CartItemRead(CartItemBase):
   id: UUID4
-  product: ProductSummary
+  product: CartProduct
+
+  # Server-side pricing (see app/services/pricing.py), filled on cart reads
+  unit_price: Optional[float] = None
+  container_fee: Optional[float] = None
+  discount: Optional[float] = None
+  line_total: Optional[float] = None
 
   model_config = {"from_attributes": True}
 
@@ -58,9 +46,16 @@ class CartCreate(CartBase):
   items: Optional[List[CartItemCreate]] = []
 
 
+class CartMerge(CartBase):
+  pass
+
+
 class CartRead(CartBase):
   id: UUID4
   items: List[CartItemRead] = []
+  subtotal: float = 0.0
+  discount: float = 0.0
+  total: float = 0.0
 
   class Config:
     orm_mode = True
@@ -80,11 +75,18 @@ class GuestCartItemRead(BaseModel):
     isNew: Optional[bool] = None
     container: Optional[str] = None
     quantity: int
+    unit_price: Optional[float] = None
+    container_fee: Optional[float] = None
+    discount: Optional[float] = None
+    line_total: Optional[float] = None
 
 
 class GuestCartRead(BaseModel):
     session_id: str
     items: List[GuestCartItemRead]
+    subtotal: float = 0.0
+    discount: float = 0.0
+    total: float = 0.0
 
 
 class GuestUpdateQuantity(BaseModel):
@@ -1,18 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel, UUID4
 
-class ProductSummary(BaseModel):
-    id: UUID4
-    name: str
-    price: float
-    main_image: Optional[str]
-    isSale: bool = False
-    isNew: bool = False
-    rating: Optional[float] = 0.0
-    reviewCount: Optional[int] = 0
-
-    model_config = {"from_attributes": True}
-
+from app.schemas.common import ProductSummary
 
 
 class CategoryBase(BaseModel):
@@ -0,0 +1,59 @@
+from typing import ClassVar, Dict, List, Optional, Tuple
+from pydantic import BaseModel, UUID4, computed_field
+
+from app.services.images import variant_urls
+
+
+# SHARED NESTED SCHEMAS
+# Lightweight shapes embedded in other resources' responses. Defined once here
+# so each is built (and appears in the OpenAPI spec) a single time.
+
+class CategorySummary(BaseModel):
+    id: UUID4
+    name: str
+    image: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class ProductRef(BaseModel):
+    """Product id and name, e.g. on reviews."""
+    id: UUID4
+    name: str
+
+    model_config = {"from_attributes": True}
+
+
+class ImageVariant(BaseModel):
+    """One width of an uploaded image, for srcset / <picture>."""
+    width: int
+    webp: str
+    jpeg: str
+
+
+class MainImageVariants(BaseModel):
+    """Adds main_image_variants to a product schema with a main_image field."""
+    # The fields each computed field is derived from, so ?fields= can select
+    # it (app/core/fields.py)
+    computed_sources: ClassVar[Dict[str, Tuple[str, ...]]] = {"main_image_variants": ("main_image",)}
+
+    @computed_field
+    @property
+    def main_image_variants(self) -> Optional[List[ImageVariant]]:
+        """Resized copies of main_image when it was uploaded through the API (derived from its URL)."""
+        return variant_urls(self.main_image)
+
+
+class ProductSummary(ProductRef, MainImageVariants):
+    """Product card fields, e.g. for a category's products."""
+    price: float
+    main_image: Optional[str] = None
+    isSale: bool = False
+    isNew: bool = False
+    rating: Optional[float] = 0.0
+    reviewCount: Optional[int] = 0
+
+
+class ProductCard(ProductSummary):
+    """Product summary with its category, for cart and wishlist items."""
+    category: Optional[CategorySummary] = None
@@ -20,7 +20,8 @@ class OrderItemBase(BaseModel):
 
 
 class OrderItemCreate(OrderItemBase):
-    pass
+    # Priced server-side; any client value is ignored
+    price: Optional[float] = None
 
 
 class OrderItemRead(OrderItemBase):
@@ -53,6 +54,8 @@ class OrderBase(BaseModel):
 
 
 class OrderCreate(OrderBase):
+    # Computed server-side from the items and shipping method; any client value is ignored
+    total_amount: Optional[float] = None
     items: List[OrderItemCreate]
 
 
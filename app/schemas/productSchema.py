@@ -1,22 +1,22 @@
-from pydantic import BaseModel, Field, UUID4
+from pydantic import BaseModel, Field, UUID4, field_validator
 from typing import List, Optional
 
+from app.schemas.common import CategorySummary, ImageVariant, MainImageVariants, ProductSummary
+
 
 class ProductImageBase(BaseModel):
     url: str
     alt_text: Optional[str] = None
     is_main: bool = False
 
-class CategoryRead(BaseModel):
+class ProductImageCreate(ProductImageBase):
+    pass
+
+class ProductImageRead(ProductImageBase):
     id: UUID4
-    image: Optional[str] = None
-    name: str
 
     model_config = {"from_attributes": True}
 
-class ProductImageCreate(ProductImageBase):
-    pass
-
 class ProductBase(BaseModel):
     name: str
     price: float
@@ -62,15 +62,92 @@ class ProductUpdate(BaseModel):
     class Config:
         orm_mode = True
 
-class ProductRead(ProductBase):
+class ProductRead(ProductBase, MainImageVariants):
     id: UUID4
     category_id: UUID4
-    category: CategoryRead
+    category: CategorySummary
 
     class Config:
         orm_mode = True
 
+class ProductDetail(ProductRead):
+    images_rel: List[ProductImageRead] = []
+    review_average: Optional[float] = None
+    review_total: int = 0
+
     # @property
     # def main_image(self):
     #     main_img = next((img.url for img in self.images if img.is_main), None)
     #     return main_img or (self.images[0].url if self.images else None)
+
+
+# RECOMMENDATIONS
+
+class RelatedProduct(BaseModel):
+    id: UUID4
+    score: float
+    product: Optional[ProductSummary] = None    # with ?expand=true
+
+
+# IMAGE UPLOAD
+
+class ProductImageUpload(BaseModel):
+    url: str                                    # the stored original, now in the product's images
+    main_image: Optional[str] = None
+    variants: List[ImageVariant]
+
+
+# AUTOCOMPLETE
+
+class AutocompleteSuggestion(BaseModel):
+    type: str                                   # "product" or "category"
+    id: UUID4
+    name: str
+    category_id: Optional[UUID4] = None         # products only
+
+
+# BULK PATCH
+
+class ProductPatch(BaseModel):
+    """One entry of PATCH /products/bulk; only the fields sent are changed."""
+    id: UUID4
+    price: Optional[float] = None
+    originalPrice: Optional[float] = None
+    stock: Optional[int] = None
+    cost_per_item: Optional[float] = None
+    isSale: Optional[bool] = None
+    isNew: Optional[bool] = None
+    isFeatured: Optional[bool] = None
+    status: Optional[str] = None
+
+    # Omitting a field leaves it alone; null would write NULL (a NULL price
+    # sells at cost or for free). Only originalPrice can be cleared
+    @field_validator("price", "stock", "cost_per_item", "isSale", "isNew", "isFeatured", "status")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null; leave the field out to keep its value")
+        return value
+
+class ProductPatchResult(BaseModel):
+    id: UUID4
+    status: str     # updated | not_found | unchanged (no fields sent)
+
+class ProductBulkPatchResult(BaseModel):
+    updated: int
+    not_found: int
+    results: List[ProductPatchResult]
+
+
+# BULK IMPORT
+
+class ProductImportError(BaseModel):
+    line: int
+    errors: List[str]
+
+class ProductImportResult(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[ProductImportError] = []
@@ -2,6 +2,8 @@ from pydantic import BaseModel, UUID4
 from typing import Optional
 from datetime import datetime
 
+from app.schemas.common import ProductRef
+
 
 # LIGHTWEIGHT NESTED OBJECTS (optional)
 
@@ -13,13 +15,6 @@ class UserSummary(BaseModel):
     model_config = {"from_attributes": True}
 
 
-class ProductSummary(BaseModel):
-    id: UUID4
-    name: str
-
-    model_config = {"from_attributes": True}
-
-
 # REVIEW SCHEMAS
 
 class ReviewBase(BaseModel):
@@ -42,6 +37,6 @@ class ReviewRead(ReviewBase):
 
     # Optional nested relationships
     user: Optional[UserSummary] = None
-    product: Optional[ProductSummary] = None
+    product: Optional[ProductRef] = None
 
     model_config = {"from_attributes": True}
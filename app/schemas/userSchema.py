@@ -21,4 +21,18 @@ class UserRead(UserBase):
     created_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class CustomerStatsRead(BaseModel):
+    user_id: UUID4
+    order_count: int = 0
+    lifetime_spend: float = 0.0
+    average_order_value: float = 0.0
+    last_order_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class UserWithStats(UserRead):
+    stats: Optional[CustomerStatsRead] = None
@@ -1,27 +1,7 @@
 from pydantic import BaseModel, UUID4
 from typing import List, Optional
 
-
-class CategoryRead(BaseModel):
-  id: UUID4
-  name: str
-
-  class Config:
-      orm_mode = True
-
-
-
-class ProductSummary(BaseModel):
-    id: UUID4
-    name: str
-    price: float
-    category: CategoryRead
-    main_image: Optional[str] = None
-    rating: Optional[float] = None
-    reviewCount: Optional[int] = None
-
-    class Config:
-        orm_mode = True
+from app.schemas.common import ProductCard
 
 
 # WISHLIST ITEM SCHEMAS
@@ -38,7 +18,7 @@ class WishlistItemCreate(WishlistItemBase):
 
 class WishlistItemRead(WishlistItemBase):
     id: UUID4
-    product: ProductSummary
+    product: ProductCard
 
     class Config:
         orm_mode = True
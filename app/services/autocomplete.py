@@ -0,0 +1,280 @@
+# app/services/autocomplete.py
+"""
+Search-as-you-type over product and category names.
+
+Every word of a name is indexed under each of its prefixes (up to
+MAX_PREFIX_LENGTH characters) in a Redis sorted set scored by popularity:
+
+    ac:entries          hash member -> suggestion JSON {"type", "id", "name"[, "category_id"]}
+    ac:popularity       hash member -> score
+    ac:prefix:{prefix}  sorted set of members whose name has a word starting with prefix
+
+Members are "product:{id}" and "category:{id}". A product's popularity is the
+number of orders containing it; a category's is the sum over its products.
+
+GET /products/autocomplete?q= reads the top of the query word's set (the
+intersection of the words' sets for several words) plus the matching
+entries, and never touches Postgres.
+
+Catalog writes call index_product / index_category / remove_* and
+create_order calls record_order. `rebuild()` regenerates everything:
+`python -m app.services.autocomplete`.
+"""
+import asyncio
+import json
+import logging
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import get_redis
+from app.services.recommendations import POPULARITY_SQL
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "ac:"
+ENTRIES_KEY = f"{PREFIX}entries"
+POPULARITY_KEY = f"{PREFIX}popularity"
+PREFIX_PREFIX = f"{PREFIX}prefix:"
+BUILD_PREFIX = f"{PREFIX}build:"
+
+MAX_PREFIX_LENGTH = 20
+# Candidates read per result when names must be re-checked (words over MAX_PREFIX_LENGTH)
+CANDIDATES_PER_RESULT = 10
+WRITE_BATCH = 500
+
+_WORD = re.compile(r"\w+")
+
+
+def words(value: Optional[str]) -> List[str]:
+    """Lowercased words with accents stripped ("Piment d'Espelette" -> piment, d, espelette)."""
+    folded = unicodedata.normalize("NFKD", value or "")
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).casefold()
+    return _WORD.findall(folded)
+
+
+def prefixes(name: Optional[str]) -> Set[str]:
+    return {word[:i] for word in words(name) for i in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1)}
+
+
+def _member(kind: str, entity_id) -> str:
+    return f"{kind}:{entity_id}"
+
+
+def _entry(kind: str, entity_id, name: str, category_id=None) -> str:
+    entry = {"type": kind, "id": str(entity_id), "name": name}
+    if kind == "product":
+        entry["category_id"] = str(category_id) if category_id else None
+    return json.dumps(entry, separators=(",", ":"))
+
+
+# --- Serving ---
+
+async def suggest(q: str, limit: int) -> bytes:
+    """Suggestions for q as a JSON array (bytes), most popular first."""
+    terms = words(q)
+    if not terms:
+        return b"[]"
+    keys = sorted({f"{PREFIX_PREFIX}{term[:MAX_PREFIX_LENGTH]}" for term in terms})
+    # Words longer than the indexed prefixes are checked against the names afterwards
+    truncated = any(len(term) > MAX_PREFIX_LENGTH for term in terms)
+    count = limit * CANDIDATES_PER_RESULT if truncated else limit
+
+    r = await get_redis()
+    if len(keys) == 1:
+        members = await r.zrevrange(keys[0], 0, count - 1)
+    else:
+        # Every word must match: members in all of the words' sets
+        scored = await r.zinter(keys, aggregate="MIN", withscores=True)
+        members = [member for member, _ in sorted(scored, key=lambda item: -item[1])[:count]]
+    if not members:
+        return b"[]"
+    entries = [entry for entry in await r.hmget(ENTRIES_KEY, members) if entry]
+    if truncated:
+        entries = [entry for entry in entries if _matches(json.loads(entry)["name"], terms)]
+    return ("[" + ",".join(entries[:limit]) + "]").encode()
+
+
+def _matches(name: str, terms: List[str]) -> bool:
+    name_words = words(name)
+    return all(any(word.startswith(term) for word in name_words) for term in terms)
+
+
+# --- Incremental updates ---
+
+async def _index(member: str, name: Optional[str], entry: Optional[str]):
+    """Point member's prefixes at its new name (entry None removes it)."""
+    r = await get_redis()
+    old = await r.hget(ENTRIES_KEY, member)
+    score = float(await r.hget(POPULARITY_KEY, member) or 0)
+    old_prefixes = prefixes(json.loads(old)["name"]) if old else set()
+    new_prefixes = prefixes(name) if entry else set()
+
+    pipe = r.pipeline(transaction=False)
+    for prefix in old_prefixes - new_prefixes:
+        pipe.zrem(f"{PREFIX_PREFIX}{prefix}", member)
+    for prefix in new_prefixes - old_prefixes:
+        pipe.zadd(f"{PREFIX_PREFIX}{prefix}", {member: score})
+    if entry:
+        pipe.hset(ENTRIES_KEY, member, entry)
+    else:
+        pipe.hdel(ENTRIES_KEY, member)
+        pipe.hdel(POPULARITY_KEY, member)
+    await pipe.execute()
+
+
+async def index_product(product_id, name: Optional[str], category_id=None):
+    """Add or re-index a product after it was created or renamed/moved."""
+    try:
+        await _index(_member("product", product_id), name, _entry("product", product_id, name or "", category_id))
+    except Exception:
+        logger.exception("Could not index product %s for autocomplete", product_id)
+
+
+async def index_category(category_id, name: Optional[str]):
+    try:
+        await _index(_member("category", category_id), name, _entry("category", category_id, name or ""))
+    except Exception:
+        logger.exception("Could not index category %s for autocomplete", category_id)
+
+
+async def remove_product(product_id):
+    try:
+        await _index(_member("product", product_id), None, None)
+    except Exception:
+        logger.exception("Could not remove product %s from autocomplete", product_id)
+
+
+async def remove_category(category_id):
+    try:
+        await _index(_member("category", category_id), None, None)
+    except Exception:
+        logger.exception("Could not remove category %s from autocomplete", category_id)
+
+
+async def record_order(product_ids: Iterable):
+    """Raise the ranking of an order's products (and their categories) by one order each."""
+    ids = sorted({str(product_id) for product_id in product_ids if product_id})
+    if not ids:
+        return
+    try:
+        r = await get_redis()
+        members = [_member("product", product_id) for product_id in ids]
+        names: Dict[str, str] = {}
+        increments: Dict[str, int] = {}
+        for member, entry in zip(members, await r.hmget(ENTRIES_KEY, members)):
+            if entry:
+                entry = json.loads(entry)
+                names[member] = entry["name"]
+                increments[member] = 1
+                if entry.get("category_id"):
+                    category = _member("category", entry["category_id"])
+                    increments[category] = increments.get(category, 0) + 1
+        categories = [member for member in increments if member not in names]
+        if categories:
+            for member, entry in zip(categories, await r.hmget(ENTRIES_KEY, categories)):
+                if entry:
+                    names[member] = json.loads(entry)["name"]
+
+        pipe = r.pipeline(transaction=False)
+        for member, name in names.items():
+            pipe.hincrby(POPULARITY_KEY, member, increments[member])
+            for prefix in prefixes(name):
+                pipe.zincrby(f"{PREFIX_PREFIX}{prefix}", increments[member], member)
+        await pipe.execute()
+    except Exception:
+        logger.exception("Could not update autocomplete ranking for an order")
+
+
+# --- Full rebuild ---
+
+async def rebuild(db: AsyncSession) -> int:
+    """
+    Regenerate the index from the catalog. New sets are built under
+    ac:build:* and renamed into place, so lookups never see a half-built index.
+    Returns the number of entries.
+    """
+    popularity = {str(product_id): orders for product_id, orders in (await db.execute(POPULARITY_SQL)).all()}
+    products = (await db.execute(text("SELECT id, name, category_id FROM products"))).all()
+    categories = (await db.execute(text("SELECT id, name FROM categories"))).all()
+
+    entries, scores, names = {}, {}, {}
+    category_scores: Dict[str, int] = {}
+    for product_id, name, category_id in products:
+        member = _member("product", product_id)
+        entries[member] = _entry("product", product_id, name or "", category_id)
+        scores[member] = popularity.get(str(product_id), 0)
+        names[member] = name
+        if category_id:
+            category_scores[str(category_id)] = category_scores.get(str(category_id), 0) + scores[member]
+    for category_id, name in categories:
+        member = _member("category", category_id)
+        entries[member] = _entry("category", category_id, name or "")
+        scores[member] = category_scores.get(str(category_id), 0)
+        names[member] = name
+
+    sets: Dict[str, Dict[str, int]] = {}
+    for member, name in names.items():
+        for prefix in prefixes(name):
+            sets.setdefault(prefix, {})[member] = scores[member]
+
+    r = await get_redis()
+    pipe = r.pipeline(transaction=False)
+    for prefix, members in sets.items():
+        pipe.delete(f"{BUILD_PREFIX}{prefix}")
+        pipe.zadd(f"{BUILD_PREFIX}{prefix}", members)
+        if len(pipe) >= WRITE_BATCH:
+            await pipe.execute()
+    await pipe.execute()
+
+    for prefix in sets:
+        pipe.rename(f"{BUILD_PREFIX}{prefix}", f"{PREFIX_PREFIX}{prefix}")
+        if len(pipe) >= WRITE_BATCH:
+            await pipe.execute()
+    pipe.delete(ENTRIES_KEY, POPULARITY_KEY)
+    if entries:
+        pipe.hset(ENTRIES_KEY, mapping=entries)
+        pipe.hset(POPULARITY_KEY, mapping=scores)
+    await pipe.execute()
+
+    stale = []
+    async for key in r.scan_iter(match=f"{PREFIX_PREFIX}*", count=1000):
+        if key[len(PREFIX_PREFIX):] not in sets:
+            stale.append(key)
+    for i in range(0, len(stale), WRITE_BATCH):
+        await r.delete(*stale[i:i + WRITE_BATCH])
+    return len(entries)
+
+
+async def rebuild_in_background():
+    """rebuild() with its own session, for background tasks (e.g. after a bulk import)."""
+    from app.db.session import async_session
+
+    try:
+        async with async_session() as db:
+            await rebuild(db)
+    except Exception:
+        logger.exception("Could not rebuild the autocomplete index")
+
+
+async def _main():
+    import time
+
+    from app.db.redis import close_redis
+    from app.db.session import async_session, engine
+
+    started = time.perf_counter()
+    try:
+        async with async_session() as db:
+            count = await rebuild(db)
+    finally:
+        await close_redis()
+        await engine.dispose()
+    print(f"Indexed {count} names for autocomplete in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,96 @@
+# app/services/cache.py
+"""
+Read-through cache for hot, rarely-changing payloads.
+
+Each entry is the serialized JSON body of a read endpoint, stored in Redis
+under a fixed key, so a hit is one GET and goes out without touching Postgres
+or Pydantic. Writes that change an entry delete its key after they commit;
+CACHE_TTL_SECONDS bounds staleness from anything that doesn't (e.g. edits made
+straight in the database). The lifespan warm-up fills every entry in ENTRIES
+before the worker reports ready.
+"""
+import json
+from typing import Awaitable, Callable, Dict
+
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.fields import schema_adapter
+from app.db.redis import get_bytes, get_redis
+from app.models.product import Product
+from app.repositories.category_repository import category_repository
+from app.repositories.product_repository import SUMMARY, product_repository
+from app.schemas.categorySchema import CategoryRead
+from app.schemas.productSchema import ProductRead
+from app.services import dashboard
+
+CACHE_PREFIX = "cache:"
+
+FEATURED_PRODUCTS = f"{CACHE_PREFIX}products:featured"
+CATEGORIES = f"{CACHE_PREFIX}categories"
+TOP_PRODUCTS = f"{CACHE_PREFIX}dashboard:top_products"
+CATEGORY_SALES = f"{CACHE_PREFIX}dashboard:category_sales"
+
+# Keys to drop when products/categories change (categories embed product summaries)
+CATALOG_KEYS = (FEATURED_PRODUCTS, CATEGORIES)
+# Keys to drop when orders change, and when the product names, prices and
+# categories the dashboard reports them under do
+DASHBOARD_KEYS = (TOP_PRODUCTS, CATEGORY_SALES)
+
+
+# --- Builders: load from Postgres and serialize to the response body ---
+
+async def featured_products_body(db: AsyncSession) -> bytes:
+    stmt = product_repository.select_products(SUMMARY).where(Product.isFeatured.is_(True))
+    products = (await db.execute(stmt)).scalars().all()
+    adapter = schema_adapter(ProductRead)
+    return adapter.dump_json(adapter.validate_python(products, from_attributes=True))
+
+
+async def categories_body(db: AsyncSession) -> bytes:
+    categories = await category_repository.list_with_products(db)
+    adapter = schema_adapter(CategoryRead)
+    return adapter.dump_json(adapter.validate_python(categories, from_attributes=True))
+
+
+async def top_products_body(db: AsyncSession) -> bytes:
+    return json.dumps(await dashboard.top_products(db), separators=(",", ":")).encode()
+
+
+async def category_sales_body(db: AsyncSession) -> bytes:
+    return json.dumps(await dashboard.category_sales(db), separators=(",", ":")).encode()
+
+
+ENTRIES: Dict[str, Callable[[AsyncSession], Awaitable[bytes]]] = {
+    FEATURED_PRODUCTS: featured_products_body,
+    CATEGORIES: categories_body,
+    TOP_PRODUCTS: top_products_body,
+    CATEGORY_SALES: category_sales_body,
+}
+
+
+# --- Cache operations ---
+
+async def fill(db: AsyncSession, key: str) -> bytes:
+    """Build the entry for `key` and store it. Returns the body."""
+    body = await ENTRIES[key](db)
+    r = await get_redis()
+    await r.set(key, body, ex=settings.CACHE_TTL_SECONDS or None)
+    return body
+
+
+async def cached_response(db: AsyncSession, key: str) -> Response:
+    """Serve `key` from Redis, building and storing it on a miss."""
+    body = await get_bytes(key)
+    if body is None:
+        body = await fill(db, key)
+    return Response(content=body, media_type="application/json")
+
+
+async def invalidate(*keys: str):
+    """Drop entries after a write; the next read (or warm-up) rebuilds them."""
+    if keys:
+        r = await get_redis()
+        await r.delete(*keys)
@@ -0,0 +1,268 @@
+# app/services/cart_buffer.py
+"""
+Write-coalescing for cart quantity updates.
+
+The cart UI sends PUT /carts/items/{item_id} on every +/- click. With
+CART_COALESCE_ENABLED, each click is one Redis round trip instead of a Postgres
+write:
+
+    cart_item:{item_id}        cached item (cart_id, product_id, product summary),
+                               loaded from Postgres on the first click
+    cart_pending:{cart_id}     hash of item_id -> [quantity, container], last write wins
+    cart_pending:due           sorted set of cart ids scored by their first buffered click
+
+Pending updates for a cart are written back in one UPDATE:
+  - by the background flusher, CART_COALESCE_WINDOW_SECONDS after the first click;
+  - before anything reads or changes the cart in Postgres (cart reads, adds, the
+    login merge, checkout); item deletes and cart clears discard them instead;
+  - for every pending cart when a worker shuts down.
+
+Taking a cart's pending updates and setting its flush lock is one atomic script,
+so concurrent flushers never apply the same batch twice or out of order; a
+reader that finds a flush in progress waits for it. A failed write puts the
+batch back (newer clicks win).
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.db.redis import get_redis, run_script
+from app.db.session import async_session
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+from app.schemas.cartSchema import CartProduct
+
+logger = logging.getLogger(__name__)
+
+ITEM_PREFIX = "cart_item:"
+PENDING_PREFIX = "cart_pending:"
+DUE_KEY = "cart_pending:due"
+LOCK_PREFIX = "cart_flush:"
+
+ITEM_TTL_SECONDS = 600
+LOCK_MS = 5000
+FLUSH_BATCH = 100
+
+# KEYS: cached item, due set. ARGV: item_id, [quantity, container] json, now,
+# item ttl, item json ('' to use the cached one), pending key prefix.
+# Returns the cached item, or nil when it isn't cached and wasn't given.
+# The pending hash key comes from the cached item's cart_id (standalone Redis).
+BUFFER_LUA = """
+local item = ARGV[5]
+if item == '' then
+  item = redis.call('GET', KEYS[1])
+  if not item then return nil end
+else
+  redis.call('SET', KEYS[1], item, 'EX', ARGV[4])
+end
+local cart_id = cjson.decode(item)['cart_id']
+redis.call('HSET', ARGV[6] .. cart_id, ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], 'NX', ARGV[3], cart_id)
+return item
+"""
+
+# KEYS: pending hash, due set, flush lock. ARGV: cart_id, lock ms.
+# Returns -1 while another flush holds the lock, else the taken
+# [item_id, value, ...] pairs (locking the cart if there are any).
+TAKE_LUA = """
+if redis.call('EXISTS', KEYS[3]) == 1 then return -1 end
+if redis.call('HLEN', KEYS[1]) == 0 then
+  redis.call('ZREM', KEYS[2], ARGV[1])
+  return {}
+end
+redis.call('SET', KEYS[3], '1', 'PX', ARGV[2])
+local entries = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return entries
+"""
+
+FLUSH_SQL = text("""
+UPDATE cart_items AS ci
+SET quantity = v.quantity, container = v.container
+FROM unnest(
+    CAST(:ids AS uuid[]), CAST(:quantities AS int[]), CAST(:containers AS varchar[])
+) AS v(id, quantity, container)
+WHERE ci.id = v.id AND ci.cart_id = :cart_id
+""")
+
+
+# --- Buffering ---
+
+async def _load_item(db: AsyncSession, item_id: str) -> Optional[dict]:
+    try:
+        item_id = uuid.UUID(item_id)
+    except ValueError:
+        return None
+    result = await db.execute(
+        select(CartItem)
+        .where(CartItem.id == item_id)
+        .options(joinedload(CartItem.product).joinedload(Product.category))
+    )
+    cart_item = result.scalar_one_or_none()
+    if cart_item is None or cart_item.product is None:
+        return None
+    return {
+        "cart_id": str(cart_item.cart_id),
+        "product_id": str(cart_item.product_id),
+        "product": CartProduct.model_validate(cart_item.product, from_attributes=True).model_dump(mode="json"),
+    }
+
+
+async def buffer_update(db: AsyncSession, item_id: str, quantity: int, container: Optional[str]) -> Optional[dict]:
+    """
+    Record a quantity/container change for a cart item without writing to
+    Postgres. Returns the item as CartItemRead data, or None if it doesn't exist.
+    """
+    keys = [f"{ITEM_PREFIX}{item_id}", DUE_KEY]
+    args = [item_id, json.dumps([quantity, container]), time.time(), ITEM_TTL_SECONDS, "", PENDING_PREFIX]
+    cached = await run_script(BUFFER_LUA, keys=keys, args=args)
+    if cached is None:
+        loaded = await _load_item(db, item_id)
+        if loaded is None:
+            return None
+        args[4] = json.dumps(loaded)
+        cached = await run_script(BUFFER_LUA, keys=keys, args=args)
+
+    item = json.loads(cached)
+    return {
+        "id": item_id,
+        "product_id": item["product_id"],
+        "container": container,
+        "quantity": quantity,
+        "product": item["product"],
+    }
+
+
+async def discard(cart_id, item_ids=(), whole_cart: bool = False):
+    """
+    Drop buffered updates and cached items for deleted cart items (all of the
+    cart's pending updates with whole_cart), in one round trip.
+    """
+    r = await get_redis()
+    pipe = r.pipeline(transaction=False)
+    if whole_cart:
+        pipe.delete(f"{PENDING_PREFIX}{cart_id}")
+        pipe.zrem(DUE_KEY, str(cart_id))
+    elif item_ids:
+        pipe.hdel(f"{PENDING_PREFIX}{cart_id}", *[str(item_id) for item_id in item_ids])
+    if item_ids:
+        pipe.delete(*[f"{ITEM_PREFIX}{item_id}" for item_id in item_ids])
+    await pipe.execute()
+
+
+# --- Flushing ---
+
+async def _take(cart_id: str) -> dict:
+    """Take the cart's pending updates, waiting out a flush in progress elsewhere."""
+    keys = [f"{PENDING_PREFIX}{cart_id}", DUE_KEY, f"{LOCK_PREFIX}{cart_id}"]
+    deadline = time.monotonic() + LOCK_MS / 1000
+    while True:
+        entries = await run_script(TAKE_LUA, keys=keys, args=[cart_id, LOCK_MS])
+        if entries != -1:
+            return dict(zip(entries[::2], entries[1::2]))
+        if time.monotonic() > deadline:
+            # The lock expires on its own; read what Postgres has meanwhile
+            return {}
+        await asyncio.sleep(0.02)
+
+
+async def _restore(cart_id: str, entries: dict):
+    """Put a batch back after a failed write, without overwriting newer clicks."""
+    r = await get_redis()
+    pipe = r.pipeline(transaction=False)
+    for item_id, value in entries.items():
+        pipe.hsetnx(f"{PENDING_PREFIX}{cart_id}", item_id, value)
+    pipe.zadd(DUE_KEY, {cart_id: time.time()}, nx=True)
+    await pipe.execute()
+
+
+async def flush_cart(db: AsyncSession, cart_id, items=None) -> int:
+    """
+    Write the cart's pending updates to Postgres in one UPDATE and commit.
+    Pass the cart's already-loaded `items` to have them reflect the new values.
+    Returns the number of items updated.
+    """
+    cart_id = str(cart_id)
+    entries = await _take(cart_id)
+    if not entries:
+        return 0
+
+    values = {item_id: json.loads(value) for item_id, value in entries.items()}
+    try:
+        await db.execute(FLUSH_SQL, {
+            "cart_id": cart_id,
+            "ids": list(values),
+            "quantities": [quantity for quantity, _ in values.values()],
+            "containers": [container for _, container in values.values()],
+        })
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        await _restore(cart_id, entries)
+        raise
+    finally:
+        r = await get_redis()
+        await r.delete(f"{LOCK_PREFIX}{cart_id}")
+
+    for item in items or ():
+        value = values.get(str(item.id))
+        if value is not None:
+            set_committed_value(item, "quantity", value[0])
+            set_committed_value(item, "container", value[1])
+    return len(values)
+
+
+async def flush_user_cart(db: AsyncSession, user_id: str) -> int:
+    """Flush the cart belonging to user_id (a supabase id), if anything is pending at all."""
+    r = await get_redis()
+    if not await r.zcard(DUE_KEY):
+        return 0
+    cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == user_id))
+    if cart_id is None:
+        return 0
+    return await flush_cart(db, cart_id)
+
+
+async def flush_due(older_than: float = 0.0) -> int:
+    """
+    Flush up to FLUSH_BATCH carts whose first pending click is older than
+    `older_than` seconds. Returns how many carts were due.
+    """
+    r = await get_redis()
+    cart_ids = await r.zrangebyscore(DUE_KEY, "-inf", time.time() - older_than, start=0, num=FLUSH_BATCH)
+    for cart_id in cart_ids:
+        try:
+            async with async_session() as db:
+                await flush_cart(db, cart_id)
+        except Exception:
+            logger.exception("Could not flush buffered updates for cart %s", cart_id)
+    return len(cart_ids)
+
+
+async def flush_all():
+    """Flush every pending cart (worker shutdown)."""
+    while await flush_due() >= FLUSH_BATCH:
+        pass
+
+
+async def run_flusher():
+    """Background loop started from the lifespan: flush carts once their window has passed."""
+    window = settings.CART_COALESCE_WINDOW_SECONDS
+    while True:
+        await asyncio.sleep(max(window / 2, 0.1))
+        try:
+            while await flush_due(window) >= FLUSH_BATCH:
+                pass
+        except Exception:
+            logger.exception("Cart flusher failed; retrying")
@@ -0,0 +1,120 @@
+# app/services/customer_stats.py
+"""
+Per-customer lifetime metrics (the customer_stats table).
+
+Order writes call add_order / remove_order before they commit, so the stats
+change in the same transaction as the order:
+
+- create_order adds the order;
+- update_order adds or removes it when its status moves out of or into
+  "cancelled" (cancelled orders don't count);
+- delete_order removes it;
+- editing or deleting an order item changes the order's total, and
+  change_spend moves the customer's lifetime spend with it.
+
+Increments are single-row upserts, so concurrent orders for one customer don't
+lose updates. Removing an order re-reads the customer's latest remaining order
+date from ix_orders_user_id_created_at. `rebuild()` recomputes every row from
+the orders table: `python -m app.services.customer_stats`.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import CustomerStats
+
+CANCELLED = "cancelled"
+
+
+def counts(status: Optional[str]) -> bool:
+    """Whether an order with this status counts towards its customer's stats."""
+    return (status or "").lower() != CANCELLED
+
+
+def counts_sql(status_column: str) -> str:
+    """counts() as a SQL condition."""
+    return f"lower(coalesce({status_column}, '')) <> '{CANCELLED}'"
+
+
+async def add_order(db: AsyncSession, user_id, total_amount: Optional[float], created_at: Optional[datetime] = None):
+    """Count an order (created_at defaults to now(), the timestamp a new order gets)."""
+    stmt = insert(CustomerStats).values(
+        user_id=user_id,
+        order_count=1,
+        lifetime_spend=total_amount or 0,
+        last_order_at=created_at if created_at is not None else func.now(),
+    )
+    stats = CustomerStats.__table__.c
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[stats.user_id],
+        set_={
+            "order_count": stats.order_count + stmt.excluded.order_count,
+            "lifetime_spend": stats.lifetime_spend + stmt.excluded.lifetime_spend,
+            "last_order_at": func.greatest(stats.last_order_at, stmt.excluded.last_order_at),
+        },
+    ))
+
+
+async def remove_order(db: AsyncSession, user_id, order_id, total_amount: Optional[float]):
+    """Stop counting an order (deleted, or cancelled)."""
+    await db.execute(
+        text(f"""
+            UPDATE customer_stats SET
+                order_count = greatest(order_count - 1, 0),
+                lifetime_spend = lifetime_spend - :spend,
+                last_order_at = (
+                    SELECT max(created_at) FROM orders
+                    WHERE user_id = :user_id AND id <> :order_id AND {counts_sql('status')}
+                )
+            WHERE user_id = :user_id
+        """),
+        {"user_id": user_id, "order_id": order_id, "spend": total_amount or 0},
+    )
+
+
+async def change_spend(db: AsyncSession, user_id, delta: float):
+    """A counted order's total changed by delta (one of its items was repriced or removed)."""
+    await db.execute(
+        text("UPDATE customer_stats SET lifetime_spend = lifetime_spend + :delta WHERE user_id = :user_id"),
+        {"user_id": user_id, "delta": delta},
+    )
+
+
+async def rebuild(db: AsyncSession) -> int:
+    """Recompute every customer's row from the orders table. Returns the number of rows."""
+    result = await db.execute(text(f"""
+        INSERT INTO customer_stats (user_id, order_count, lifetime_spend, last_order_at)
+        SELECT u.id, count(o.id), coalesce(sum(o.total_amount), 0), max(o.created_at)
+        FROM users AS u
+        LEFT JOIN orders AS o ON o.user_id = u.id AND {counts_sql('o.status')}
+        GROUP BY u.id
+        ON CONFLICT (user_id) DO UPDATE SET
+            order_count = EXCLUDED.order_count,
+            lifetime_spend = EXCLUDED.lifetime_spend,
+            last_order_at = EXCLUDED.last_order_at
+    """))
+    await db.commit()
+    return result.rowcount
+
+
+async def _main():
+    import time
+
+    from app.db.session import async_session, engine
+
+    started = time.perf_counter()
+    try:
+        async with async_session() as db:
+            count = await rebuild(db)
+    finally:
+        await engine.dispose()
+    print(f"Rebuilt stats for {count} customers in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(_main())
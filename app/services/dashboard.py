@@ -0,0 +1,103 @@
+# app/services/dashboard.py
+"""
+Admin dashboard aggregates (top products, sales per category).
+
+Both scan every order, so the routes serve them through app.services.cache and
+the lifespan warm-up computes them before the first admin request.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+
+CATEGORY_COLORS = [
+    "#99582A", "#B5764A", "#D19B6A", "#E8C18C", "#FFE6A7"
+]
+
+
+async def top_products(db: AsyncSession, limit: int = 5) -> list:
+    # Fetch orders and items, joined with products
+    result = await db.execute(
+        select(Order)
+        .options(joinedload(Order.items).joinedload(OrderItem.product))
+    )
+    orders = result.unique().scalars().all()
+
+    product_stats = {}
+
+    for order in orders:
+        for item in order.items:
+            product = item.product
+            if not product:
+                continue
+
+            name = product.name
+            price = product.price
+            quantity = item.quantity
+            revenue = quantity * price
+
+            if name not in product_stats:
+                product_stats[name] = {
+                    "name": name,
+                    "price": price,
+                    "sales": 0,
+                    "revenue": 0,
+                }
+
+            product_stats[name]["sales"] += quantity
+            product_stats[name]["revenue"] += revenue
+
+    # Sort by total revenue
+    return sorted(
+        product_stats.values(),
+        key=lambda x: x["revenue"],
+        reverse=True,
+    )[:limit]
+
+
+async def category_sales(db: AsyncSession) -> list:
+    # Fetch orders and items with product and category info
+    result = await db.execute(
+        select(Order)
+        .options(
+            joinedload(Order.items)
+            .joinedload(OrderItem.product)
+            .joinedload(Product.category)
+        )
+    )
+    orders = result.unique().scalars().all()
+
+    category_stats = {}
+
+    for order in orders:
+        for item in order.items:
+            product = item.product
+            if not product or not product.category:
+                continue
+
+            category_name = product.category.name
+            quantity = item.quantity
+            revenue = quantity * item.price
+
+            if category_name not in category_stats:
+                category_stats[category_name] = {
+                    "name": category_name,
+                    "value": 0,  # will store total sales count
+                    "revenue": 0.0,
+                }
+
+            category_stats[category_name]["value"] += quantity
+            category_stats[category_name]["revenue"] += revenue
+
+    # Convert dict to list and assign colors dynamically
+    category_list = []
+    for i, cat in enumerate(category_stats.values()):
+        cat["color"] = CATEGORY_COLORS[i % len(CATEGORY_COLORS)]
+        category_list.append(cat)
+
+    # Sort by most sold
+    category_list.sort(key=lambda x: x["value"], reverse=True)
+
+    return category_list
@@ -1,25 +1,73 @@
 # app/services/guest_cart.py
-import json
-import redis.asyncio as redis
+import uuid
 from fastapi import HTTPException
-from app.schemas.cartSchema import ProductSummary, CategoryRead
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.cart import Cart
 from app.repositories.product_repository import product_repository
 from app.core.config import settings
+from app.db.redis import get_redis, get_bytes, run_script, take_bytes
+from app.services.guest_codec import LUA_CODEC, decode_cart, encode_cart, pack_cart_lines, pack_id
+from app.services.pricing import PriceBook
 
-redis_client = None
 REDIS_PREFIX = "guest_cart:"
 
+# Carts are stored as one compact value (see guest_codec): version byte + msgpack
+# lines of [product_id, quantity, container]. Every read-modify-write runs
+# server-side in a Lua script, so each guest operation costs a single round trip
+# and concurrent updates can't lose writes. An emptied cart is deleted.
 
-async def get_redis():
-    global redis_client
-    if redis_client is None:
-        redis_client = redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True
-        )
-    return redis_client
+_LUA_NORM = """
+local function norm(v)
+  if v == nil then return '' end
+  return v
+end
+"""
+
+
+# ARGV: ttl, msgpack list of [product_id, quantity, container]
+ADD_ITEMS_LUA = LUA_CODEC + _LUA_NORM + """
+local lines = load_cart(KEYS[1]) or {}
+for _, new in ipairs(cmsgpack.unpack(ARGV[2])) do
+  local found = false
+  for _, line in ipairs(lines) do
+    if line[1] == new[1] and norm(line[3]) == norm(new[3]) then
+      line[2] = line[2] + new[2]
+      found = true
+      break
+    end
+  end
+  if not found then
+    table.insert(lines, new)
+  end
+end
+return save(KEYS[1], lines, tonumber(ARGV[1]))
+"""
+
+# ARGV: ttl, product_id, container ('' for none), quantity. Returns {found, value}
+SET_QUANTITY_LUA = LUA_CODEC + _LUA_NORM + """
+local lines = load_cart(KEYS[1]) or {}
+for _, line in ipairs(lines) do
+  if line[1] == ARGV[2] and norm(line[3]) == ARGV[3] then
+    line[2] = tonumber(ARGV[4])
+    return {1, save(KEYS[1], lines, tonumber(ARGV[1]))}
+  end
+end
+return {0, ''}
+"""
+
+# ARGV: ttl, product_id. Returns {found, value}; found is 0 when the cart is missing or empty
+REMOVE_PRODUCT_LUA = LUA_CODEC + """
+local lines = load_cart(KEYS[1])
+if not lines or #lines == 0 then return {0, ''} end
+local kept = {}
+for _, line in ipairs(lines) do
+  if line[1] ~= ARGV[2] then table.insert(kept, line) end
+end
+return {1, save(KEYS[1], kept, tonumber(ARGV[1]))}
+"""
 
 
 # --- Raw cart utilities (compact) ---
@@ -29,15 +77,12 @@ async def get_raw_cart(session_id: str) -> dict:
     Return the raw compact cart stored in Redis (no product enrichment).
     Always returns {'items': [...]}
     """
-    r = await get_redis()
-    data = await r.get(f"{REDIS_PREFIX}{session_id}")
-    if not data:
-        return {"items": []}
-    try:
-        return json.loads(data)
-    except Exception:
-        # If corrupted, return empty
-        return {"items": []}
+    return decode_cart(await get_bytes(f"{REDIS_PREFIX}{session_id}"))
+
+
+async def take_raw_cart(session_id: str) -> dict:
+    """Read and delete the raw cart in one step (GETDEL). Always returns {'items': [...]}"""
+    return decode_cart(await take_bytes(f"{REDIS_PREFIX}{session_id}"))
 
 
 async def save_raw_cart(session_id: str, cart: dict):
@@ -45,8 +90,15 @@ async def save_raw_cart(session_id: str, cart: dict):
     Normalize and save only the compact form to Redis.
     """
     r = await get_redis()
-    normalized = {"items": cart.get("items", [])}
-    await r.set(f"{REDIS_PREFIX}{session_id}", json.dumps(normalized, default=str))
+    items = cart.get("items", [])
+    if not items:
+        await r.delete(f"{REDIS_PREFIX}{session_id}")
+        return
+    await r.set(
+        f"{REDIS_PREFIX}{session_id}",
+        encode_cart(items),
+        ex=settings.GUEST_SESSION_TTL_SECONDS or None,
+    )
 
 
 async def clear_cart(session_id: str):
@@ -54,84 +106,202 @@ async def clear_cart(session_id: str):
     await r.delete(f"{REDIS_PREFIX}{session_id}")
 
 
-# --- Enriched cart returned to clients ---
+async def add_items(session_id: str, items: list) -> dict:
+    """
+    Merge items ({product_id, container, quantity}) into the cart, summing
+    quantities of matching product/container lines. Returns the new raw cart.
+    """
+    value = await run_script(
+        ADD_ITEMS_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, pack_cart_lines(items)],
+        decode=False,
+    )
+    return decode_cart(value)
+
 
-async def get_cart(db: AsyncSession, session_id: str):
+async def set_item_quantity(session_id: str, product_id: str, container, quantity: int):
     """
-    Return enriched cart for responses: each item includes a 'product' summary.
-    If product is deleted / not found, that item will be skipped.
+    Set the quantity of one product/container line.
+    Returns the new raw cart, or None if the line is not in the cart.
     """
-    raw = await get_raw_cart(session_id)
-    items_output = []
+    found, value = await run_script(
+        SET_QUANTITY_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, pack_id(product_id), container or "", quantity],
+        decode=False,
+    )
+    return decode_cart(value) if int(found) else None
 
-    # Create a small cache to avoid hitting DB multiple times per product
-    product_cache = {}
 
-    for item in raw.get("items", []):
-        pid = item.get("product_id")
-        if pid is None:
-            continue
+# --- Enriched cart returned to clients ---
 
-        # reuse cached product if present
-        product = product_cache.get(pid)
-        if product is None:
-            product = await product_repository.get_product_by_id(db, pid)
-            product_cache[pid] = product
+async def get_cart(db: AsyncSession, session_id: str, raw: dict = None, prices: PriceBook = None):
+    """
+    Return enriched cart for responses: each item is flattened with its product summary
+    and priced server-side, with cart totals alongside.
+    If product is deleted / not found, that item will be skipped.
+    Pass `raw` when the caller already holds the cart, to skip the Redis read.
+    """
+    if raw is None:
+        raw = await get_raw_cart(session_id)
 
-        if not product:
-            # skip stale product references
-            continue
+    # One query for all products in the cart
+    product_ids = {item.get("product_id") for item in raw.get("items", []) if item.get("product_id")}
+    products = await product_repository.get_products_by_ids(db, product_ids)
 
-        product_summary = ProductSummary(
-            id=product.id,
-            name=product.name,
-            price=product.price,
-            main_image=product.main_image,
-            category=CategoryRead(
-                id=product.category.id,
-                name=product.category.name
-            ) if product.category else None,
-            rating=product.rating,
-            reviewCount=product.reviewCount,
-            isSale=product.isSale,
-            isNew=product.isNew,
-            size=item.get("size"),
-            color=item.get("color"),
-        )
+    # skip stale product references
+    lines = [
+        (products[str(item.get("product_id"))], item)
+        for item in raw.get("items", [])
+        if str(item.get("product_id")) in products
+    ]
+    quote = (prices or PriceBook()).quote(
+        (product, item.get("container"), item.get("quantity", 1)) for product, item in lines
+    )
 
+    items_output = []
+    for (product, item), pricing in zip(lines, quote["lines"]):
         items_output.append({
-            "product_id": product.id,
-            "size": item.get("size"),
-            "color": item.get("color"),
+            "product_id": str(product.id),
+            "name": product.name,
+            "price": product.price,
+            "main_image": product.main_image,
+            "category_name": product.category.name if product.category else None,
+            "rating": product.rating,
+            "reviewCount": product.reviewCount,
+            "isSale": product.isSale,
+            "isNew": product.isNew,
+            "container": item.get("container"),
             "quantity": item.get("quantity", 1),
-            "product": product_summary
+            **pricing,
         })
 
     return {
         "session_id": session_id,
-        "items": items_output
+        "items": items_output,
+        "subtotal": quote["subtotal"],
+        "discount": quote["discount"],
+        "total": quote["total"],
     }
 
 
 # --- Helpers used by routes (remove item etc.) ---
 
-async def remove_item_from_cart_raw(session_id: str, product_id: int):
+async def remove_item_from_cart_raw(session_id: str, product_id: str):
     """
     Remove any item(s) with product_id from the raw cart.
     Returns the new raw cart.
     """
-    cart = await get_raw_cart(session_id)
-    cart["items"] = [i for i in cart.get("items", []) if i.get("product_id") != product_id]
-    await save_raw_cart(session_id, cart)
-    return cart
+    _, value = await run_script(
+        REMOVE_PRODUCT_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, pack_id(product_id)],
+        decode=False,
+    )
+    return decode_cart(value)
 
 
 # If you still want the function signature that uses DB (as earlier), keep compatibility
-async def remove_item_from_cart(db: AsyncSession, session_id: str, product_id: int):
-    raw = await get_raw_cart(session_id)
-    if not raw or not raw.get("items"):
+async def remove_item_from_cart(db: AsyncSession, session_id: str, product_id: str):
+    found, value = await run_script(
+        REMOVE_PRODUCT_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, pack_id(product_id)],
+        decode=False,
+    )
+    if not int(found):
         raise HTTPException(status_code=404, detail="Cart not found")
-    raw["items"] = [i for i in raw["items"] if i.get("product_id") != product_id]
-    await save_raw_cart(session_id, raw)
     # return enriched
-    return await get_cart(db, session_id)
+    return await get_cart(db, session_id, decode_cart(value))
+
+
+# --- Merge into a user's cart on login ---
+
+# Adds each incoming line to a matching (product, container) line or inserts it,
+# in one statement. `container` is nullable, so lines match with IS NOT DISTINCT FROM
+# instead of relying on a unique constraint.
+MERGE_LINES_SQL = text("""
+WITH incoming AS (
+    SELECT * FROM unnest(
+        CAST(:ids AS uuid[]), CAST(:product_ids AS uuid[]), CAST(:containers AS varchar[]), CAST(:quantities AS int[])
+    ) AS i(id, product_id, container, quantity)
+), updated AS (
+    UPDATE cart_items ci
+    SET quantity = COALESCE(ci.quantity, 0) + i.quantity
+    FROM incoming i
+    WHERE ci.cart_id = :cart_id
+      AND ci.product_id = i.product_id
+      AND ci.container IS NOT DISTINCT FROM i.container
+    RETURNING ci.product_id, ci.container
+)
+INSERT INTO cart_items (id, cart_id, product_id, container, quantity)
+SELECT i.id, :cart_id, i.product_id, i.container, i.quantity
+FROM incoming i
+WHERE NOT EXISTS (
+    SELECT 1 FROM updated u
+    WHERE u.product_id = i.product_id AND u.container IS NOT DISTINCT FROM i.container
+)
+""")
+
+
+async def merge_guest_cart_into_user(db: AsyncSession, session_id: str, user_id: str):
+    """
+    Move a guest cart into the user's Cart with a fixed number of round trips:
+    one Redis GETDEL, one product check, one cart upsert, one line upsert (the
+    product check and line upsert only when there are lines to merge). Lines
+    for products that no longer exist are dropped. Returns the cart id; a user
+    without a cart gets an empty one even when there is nothing to merge, so
+    the caller can always return the user's cart.
+
+    The cart is taken (read and deleted atomically) before the database write,
+    so a retried merge finds nothing to add twice, and a guest add that lands
+    meanwhile starts a new cart instead of being deleted afterwards. If the
+    merge fails, the taken lines are added back on top of that cart.
+    """
+    raw = await take_raw_cart(session_id)
+    try:
+        return await _merge_lines(db, raw["items"], user_id)
+    except BaseException:
+        if raw["items"]:
+            await add_items(session_id, raw["items"])
+        raise
+
+
+async def _merge_lines(db: AsyncSession, items: list, user_id: str):
+    # Collapse duplicate product/container lines before they reach the VALUES set
+    lines = {}
+    for item in items:
+        try:
+            key = (uuid.UUID(str(item.get("product_id"))), item.get("container"))
+        except ValueError:
+            continue
+        lines[key] = lines.get(key, 0) + int(item.get("quantity") or 1)
+
+    existing = await product_repository.get_existing_ids(db, {pid for pid, _ in lines})
+    lines = {key: qty for key, qty in lines.items() if key[0] in existing}
+
+    # Get-or-create the user's cart in one statement; the upsert also row-locks it,
+    # so concurrent merges for the same user serialize here.
+    stmt = pg_insert(Cart).values(id=uuid.uuid4(), user_id=user_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Cart.user_id], set_={"user_id": stmt.excluded.user_id}
+    ).returning(Cart.id)
+    try:
+        cart_id = (await db.execute(stmt)).scalar_one()
+    except IntegrityError:
+        # carts.user_id references users.supabase_id
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if lines:
+        await db.execute(MERGE_LINES_SQL, {
+            "cart_id": cart_id,
+            "ids": [uuid.uuid4() for _ in lines],
+            "product_ids": [pid for pid, _ in lines],
+            "containers": [container for _, container in lines],
+            "quantities": list(lines.values()),
+        })
+
+    await db.commit()
+    return cart_id
@@ -0,0 +1,160 @@
+# app/services/guest_codec.py
+"""
+Compact binary encoding for guest cart / wishlist values in Redis.
+
+Values are a version byte followed by msgpack:
+
+    cart      b"\\x01" + [[product_id, quantity, container?], ...]
+    wishlist  b"\\x01" + [product_id, ...]
+
+Product ids are packed as their 16 raw UUID bytes and fields are tagged by
+position, so a typical line is ~25 bytes instead of ~90 bytes of JSON.
+Strings are packed as msgpack raw (use_bin_type=False) because that is what
+Redis' embedded cmsgpack produces, so the Lua scripts and Python agree.
+
+Legacy JSON values (first byte "{") are still read, both here and in the Lua
+helpers, and are rewritten in the compact form on their next update.
+"""
+import json
+import uuid
+
+import msgpack
+
+VERSION = 1
+_PREFIX = bytes([VERSION])
+
+
+def pack_id(product_id) -> bytes:
+    try:
+        return uuid.UUID(str(product_id)).bytes
+    except ValueError:
+        return str(product_id).encode()
+
+
+def unpack_id(value) -> str:
+    if isinstance(value, bytes) and len(value) == 16:
+        return str(uuid.UUID(bytes=value))
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _as_bytes(data) -> bytes:
+    return data.encode() if isinstance(data, str) else data
+
+
+# --- Carts ---
+
+def pack_cart_lines(items) -> bytes:
+    """msgpack the cart lines without the version byte (also used as a Lua script argument)."""
+    lines = []
+    for item in items:
+        line = [pack_id(item["product_id"]), int(item.get("quantity", 1))]
+        if item.get("container") is not None:
+            line.append(item["container"])
+        lines.append(line)
+    return msgpack.packb(lines, use_bin_type=False)
+
+
+def encode_cart(items) -> bytes:
+    return _PREFIX + pack_cart_lines(items)
+
+
+def decode_cart(data) -> dict:
+    """Decode a compact or legacy JSON cart. Always returns {'items': [...]}"""
+    if not data:
+        return {"items": []}
+    data = _as_bytes(data)
+    try:
+        if data[0] == VERSION:
+            items = []
+            for line in msgpack.unpackb(data[1:], raw=True):
+                items.append({
+                    "product_id": unpack_id(line[0]),
+                    "quantity": line[1],
+                    "container": line[2].decode() if len(line) > 2 else None,
+                })
+            return {"items": items}
+
+        cart = json.loads(data)
+        items = cart.get("items") if isinstance(cart, dict) else None
+        return {"items": items if isinstance(items, list) else []}
+    except Exception:
+        # If corrupted, return empty
+        return {"items": []}
+
+
+# --- Wishlists ---
+
+def encode_wishlist(product_ids) -> bytes:
+    return _PREFIX + msgpack.packb([pack_id(pid) for pid in product_ids], use_bin_type=False)
+
+
+def decode_wishlist(data) -> list:
+    """Decode a compact or legacy JSON wishlist into a list of product id strings."""
+    if not data:
+        return []
+    data = _as_bytes(data)
+    try:
+        if data[0] == VERSION:
+            return [unpack_id(pid) for pid in msgpack.unpackb(data[1:], raw=True)]
+
+        wishlist = json.loads(data)
+        return [str(item["product_id"]) for item in wishlist.get("items", [])]
+    except Exception:
+        return []
+
+
+# --- Lua counterparts, prepended to the guest scripts ---
+
+LUA_CODEC = """
+local VERSION = 1
+local function uuid_to_bin(s)
+  local hex = string.gsub(s, '-', '')
+  if #hex ~= 32 or string.find(hex, '[^%x]') then return s end
+  return (string.gsub(hex, '%x%x', function(h) return string.char(tonumber(h, 16)) end))
+end
+local function unjson(v)
+  if v == cjson.null then return nil end
+  return v
+end
+local function save(key, payload, ttl)
+  if #payload == 0 then
+    redis.call('DEL', key)
+    return ''
+  end
+  local value = string.char(VERSION) .. cmsgpack.pack(payload)
+  if ttl > 0 then
+    redis.call('SET', key, value, 'EX', ttl)
+  else
+    redis.call('SET', key, value)
+  end
+  return value
+end
+-- cart lines as {product_id, quantity, container}; nil if the key is missing
+local function load_cart(key)
+  local raw = redis.call('GET', key)
+  if not raw then return nil end
+  if string.byte(raw, 1) == VERSION then return cmsgpack.unpack(string.sub(raw, 2)) end
+  local ok, cart = pcall(cjson.decode, raw)
+  local lines = {}
+  if not ok or type(cart) ~= 'table' or type(cart.items) ~= 'table' then return lines end
+  for _, item in ipairs(cart.items) do
+    if type(item.product_id) == 'string' then
+      table.insert(lines, {uuid_to_bin(item.product_id), tonumber(item.quantity) or 1, unjson(item.container)})
+    end
+  end
+  return lines
+end
+-- wishlist product ids; nil if the key is missing
+local function load_wishlist(key)
+  local raw = redis.call('GET', key)
+  if not raw then return nil end
+  if string.byte(raw, 1) == VERSION then return cmsgpack.unpack(string.sub(raw, 2)) end
+  local ok, wishlist = pcall(cjson.decode, raw)
+  local ids = {}
+  if not ok or type(wishlist) ~= 'table' or type(wishlist.items) ~= 'table' then return ids end
+  for _, item in ipairs(wishlist.items) do
+    if type(item.product_id) == 'string' then table.insert(ids, uuid_to_bin(item.product_id)) end
+  end
+  return ids
+end
+"""
@@ -1,45 +1,93 @@
-import json
-import redis.asyncio as redis
+import uuid
+import msgpack
 from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.product_repository import product_repository
-from app.schemas.cartSchema import ProductSummary, CategoryRead
-from sqlalchemy.future import select
-from app.models.wishlist import Wishlist, WishlistItem
-from app.models.product import Product
+from app.schemas.common import CategorySummary, ProductCard
 from app.core.config import settings
+from app.db.redis import get_redis, get_bytes, run_script, take_bytes
+from app.services.guest_codec import LUA_CODEC, decode_wishlist, encode_wishlist, pack_id
+
+REDIS_PREFIX = "guest_wishlist:"
+
+# Wishlists are stored compactly (see guest_codec): version byte + msgpack list of
+# 16-byte product ids. Add/remove run as Lua scripts so each is a single atomic
+# round trip; an emptied wishlist is deleted.
+
+# ARGV: ttl, product_id
+ADD_ITEM_LUA = LUA_CODEC + """
+local ids = load_wishlist(KEYS[1]) or {}
+for _, pid in ipairs(ids) do
+  if pid == ARGV[2] then return string.char(VERSION) .. cmsgpack.pack(ids) end
+end
+table.insert(ids, ARGV[2])
+return save(KEYS[1], ids, tonumber(ARGV[1]))
+"""
+
+# ARGV: ttl, msgpack list of product ids. Adds the ones not already listed
+ADD_ITEMS_LUA = LUA_CODEC + """
+local ids = load_wishlist(KEYS[1]) or {}
+local listed = {}
+for _, pid in ipairs(ids) do listed[pid] = true end
+for _, pid in ipairs(cmsgpack.unpack(ARGV[2])) do
+  if not listed[pid] then
+    table.insert(ids, pid)
+    listed[pid] = true
+  end
+end
+return save(KEYS[1], ids, tonumber(ARGV[1]))
+"""
+
+# ARGV: ttl, product_id. Returns {found, value}
+REMOVE_ITEM_LUA = LUA_CODEC + """
+local ids = load_wishlist(KEYS[1])
+if not ids then return {0, ''} end
+local kept = {}
+for _, pid in ipairs(ids) do
+  if pid ~= ARGV[2] then table.insert(kept, pid) end
+end
+return {1, save(KEYS[1], kept, tonumber(ARGV[1]))}
+"""
+
+
+def _decode(session_id: str, data) -> dict:
+    return {
+        "session_id": session_id,
+        "items": [{"product_id": pid} for pid in decode_wishlist(data)],
+    }
 
-async def get_redis():
-    global redis_client
-    if redis_client is None:
-        redis_client = redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True
-        )
-    return redis_client
+
+async def get_raw_wishlist(session_id: str) -> dict:
+    return _decode(session_id, await get_bytes(f"{REDIS_PREFIX}{session_id}"))
 
 
 # GET WISHLIST
-async def get_wishlist(db: AsyncSession, session_id: str):
-    r = await get_redis()
-    data = await r.get(f"guest_wishlist:{session_id}")
+async def get_wishlist(db: AsyncSession, session_id: str, raw: dict = None):
+    if raw is None:
+        raw = await get_raw_wishlist(session_id)
 
-    if not data:
+    if not raw["items"]:
         return {"session_id": session_id, "items": []}
 
-    wishlist = json.loads(data)
+    # One query for every product in the wishlist
+    products = await product_repository.get_products_by_ids(
+        db, {item["product_id"] for item in raw["items"]}
+    )
 
     items_output = []
-    for item in wishlist["items"]:
-        product = await product_repository.get_product_by_id(db, item["product_id"])
+    for item in raw["items"]:
+        product = products.get(str(item["product_id"]))
+        if not product:
+            continue
 
-        product_summary = ProductSummary(
+        product_summary = ProductCard(
             id=product.id,
             name=product.name,
             price=product.price,
             main_image=product.main_image,
-            category=CategoryRead(
+            category=CategorySummary(
                 id=product.category.id,
                 name=product.category.name
             ) if product.category else None,
@@ -63,82 +111,129 @@ async def get_wishlist(db: AsyncSession, session_id: str):
 # SAVE WISHLIST
 async def save_wishlist(session_id: str, wishlist: dict):
     r = await get_redis()
-    await r.set(f"guest_wishlist:{session_id}", json.dumps(wishlist, default=str))
+    await r.set(
+        f"{REDIS_PREFIX}{session_id}",
+        encode_wishlist(item["product_id"] for item in wishlist.get("items", [])),
+        ex=settings.GUEST_SESSION_TTL_SECONDS or None,
+    )
 
 
 # ADD ITEM
-async def add_item_to_wishlist(db: AsyncSession, session_id: str, product_id: int):
-    r = await get_redis()
-    raw = await r.get(f"guest_wishlist:{session_id}")
-
-    if raw:
-        wishlist = json.loads(raw)
-    else:
-        wishlist = {"session_id": session_id, "items": []}
-
-    # Avoid duplicates
-    if any(i["product_id"] == product_id for i in wishlist["items"]):
-        return await get_wishlist(db, session_id)
-
-    wishlist["items"].append({"product_id": product_id})
-    await save_wishlist(session_id, wishlist)
-    return await get_wishlist(db, session_id)
+async def add_item_to_wishlist(db: AsyncSession, session_id: str, product_id: str):
+    # Duplicates are skipped inside the script
+    value = await run_script(
+        ADD_ITEM_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, pack_id(product_id)],
+        decode=False,
+    )
+    return await get_wishlist(db, session_id, _decode(session_id, value))
+
+
+async def add_items_to_wishlist(session_id: str, product_ids: list):
+    """Add several products at once (skipping ones already listed)."""
+    await run_script(
+        ADD_ITEMS_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, msgpack.packb([pack_id(pid) for pid in product_ids], use_bin_type=False)],
+        decode=False,
+    )
 
 
 # REMOVE ITEM
-async def remove_item_from_wishlist(db: AsyncSession, session_id: str, product_id: int):
-    r = await get_redis()
-    raw = await r.get(f"guest_wishlist:{session_id}")
-
-    if not raw:
+async def remove_item_from_wishlist(db: AsyncSession, session_id: str, product_id: str):
+    found, value = await run_script(
+        REMOVE_ITEM_LUA,
+        keys=[f"{REDIS_PREFIX}{session_id}"],
+        args=[settings.GUEST_SESSION_TTL_SECONDS, pack_id(product_id)],
+        decode=False,
+    )
+
+    if not int(found):
         raise HTTPException(status_code=404, detail="Wishlist not found")
 
-    wishlist = json.loads(raw)
-    wishlist["items"] = [i for i in wishlist["items"] if i["product_id"] != product_id]
-
-    await save_wishlist(session_id, wishlist)
-    return await get_wishlist(db, session_id)
+    return await get_wishlist(db, session_id, _decode(session_id, value))
 
 
 # CLEAR WISHLIST
 async def clear_wishlist(session_id: str):
     r = await get_redis()
-    await r.delete(f"guest_wishlist:{session_id}")
-
-
-
-async def merge_guest_wishlist_into_user(db: AsyncSession, session_id: str, user_id: int):
-    # Step 1: Fetch guest wishlist
-    guest = await get_wishlist(db, session_id)
-    guest_items = guest.get("items", [])
+    await r.delete(f"{REDIS_PREFIX}{session_id}")
+
+
+# MERGE INTO USER WISHLIST (on login)
+
+# Gets or creates the user's wishlist and adds every product it doesn't already
+# hold, in one statement. ON CONFLICT DO NOTHING also skips rows that would break
+# the unique constraints on wishlist_items.
+MERGE_ITEMS_SQL = text("""
+WITH w AS (
+    INSERT INTO wishlists (id, user_id) VALUES (:wishlist_id, :user_id)
+    ON CONFLICT (user_id) DO UPDATE SET user_id = EXCLUDED.user_id
+    RETURNING id
+), added AS (
+    INSERT INTO wishlist_items (id, wishlist_id, product_id)
+    SELECT i.id, w.id, i.product_id
+    FROM w CROSS JOIN unnest(CAST(:ids AS uuid[]), CAST(:product_ids AS uuid[])) AS i(id, product_id)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM wishlist_items wi WHERE wi.wishlist_id = w.id AND wi.product_id = i.product_id
+    )
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+SELECT (SELECT id FROM w) AS wishlist_id, (SELECT count(*) FROM added) AS added
+""")
+
+
+async def merge_guest_wishlist_into_user(db: AsyncSession, session_id: str, user_id: str):
+    """
+    Move a guest wishlist into the user's Wishlist: one Redis GETDEL, one
+    product existence check, one upsert of wishlist + items, and the commit.
+    Products that no longer exist are dropped.
+
+    The wishlist is taken (read and deleted atomically) before the database
+    write, so concurrent or retried merges can't both merge it, and a guest add
+    that lands meanwhile starts a new wishlist instead of being deleted. If the
+    merge fails, the taken products are added back to that wishlist.
+    """
+    taken = decode_wishlist(await take_bytes(f"{REDIS_PREFIX}{session_id}"))
+    if not taken:
+        return None
+    try:
+        return await _merge_items(db, taken, user_id)
+    except BaseException:
+        await add_items_to_wishlist(session_id, taken)
+        raise
+
+
+async def _merge_items(db: AsyncSession, taken: list, user_id: str):
+    product_ids = []
+    for pid in taken:
+        try:
+            product_id = uuid.UUID(pid)
+        except ValueError:
+            continue
+        if product_id not in product_ids:
+            product_ids.append(product_id)
 
     # If guest wishlist is empty, nothing to merge
-    if not guest_items:
-        return
-
-    # Step 2: Load user's wishlist (create if missing)
-    
-
-    result = await db.execute(select(Wishlist).where(Wishlist.user_id == user_id))
-    wishlist = result.scalars().first()
+    if not product_ids:
+        return None
+
+    existing = await product_repository.get_existing_ids(db, product_ids)
+    product_ids = [pid for pid in product_ids if pid in existing]
+
+    try:
+        row = (await db.execute(MERGE_ITEMS_SQL, {
+            "wishlist_id": uuid.uuid4(),
+            "user_id": user_id,
+            "ids": [uuid.uuid4() for _ in product_ids],
+            "product_ids": product_ids,
+        })).one()
+    except IntegrityError:
+        # wishlists.user_id references users.supabase_id
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
 
-    if not wishlist:
-        wishlist = Wishlist(user_id=user_id)
-        db.add(wishlist)
-        await db.flush()
-
-    # Step 3: Merge — avoid duplicates
-    existing_product_ids = {item.product_id for item in wishlist.items}
-
-    for item in guest_items:
-        product_id = item["product_id"]
-        if product_id not in existing_product_ids:
-            wishlist.items.append(WishlistItem(product_id=product_id))
-
-    # Save changes
     await db.commit()
-
-    # Step 4: Clear guest wishlist
-    await clear_wishlist(session_id)
-
-    return wishlist
\ No newline at end of file
+    return {"wishlist_id": row.wishlist_id, "added": row.added}
@@ -0,0 +1,209 @@
+# app/services/images.py
+"""
+Uploaded product images and their resized variants.
+
+An upload is stored once under the hash of its bytes, next to a WebP and a
+JPEG rendering at each of IMAGE_VARIANT_WIDTHS:
+
+    {IMAGE_BASE_URL}/{hash}/original.{ext}
+    {IMAGE_BASE_URL}/{hash}/{width}.webp
+    {IMAGE_BASE_URL}/{hash}/{width}.jpg
+
+Names only depend on the content, so files never change once written (they
+are served with an immutable Cache-Control), re-uploading the same image is
+free, and the variant URLs can be derived from the original's URL alone:
+ProductSummary exposes them without a column or a query. Images narrower than
+a width are stored at their own size under that width's name, so every width
+always exists.
+
+Decoding and resizing are CPU-bound and run in a ProcessPoolExecutor of
+IMAGE_WORKERS processes; file writes run in a thread. Pillow is only imported
+in the workers (optional `images` extra); without it uploads are refused.
+
+Storage is behind a small interface (put / exists / url). LocalStorage writes
+below IMAGE_STORAGE_DIR, which the app serves at IMAGE_BASE_URL; an object
+store client with the same three methods can replace it.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import io
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from starlette.staticfiles import StaticFiles
+
+from app.core.config import settings
+
+VARIANT_FORMATS = (("webp", "WEBP"), ("jpg", "JPEG"))
+# Original formats accepted, by Pillow format name -> file extension
+ORIGINAL_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+HASH_LENGTH = 32
+
+
+class ImageError(ValueError):
+    """The upload isn't an image we can process."""
+
+
+# --- Rendering (runs in worker processes) ---
+
+def render_variants(data: bytes, widths: Tuple[int, ...], quality: int, max_pixels: int) -> Tuple[str, Dict[str, bytes]]:
+    """
+    Decode an image and encode each variant. Returns the original's extension and
+    {file name: bytes}. Raises ImageError for anything Pillow can't read.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        image = Image.open(io.BytesIO(data))
+        fmt = image.format
+        image.load()
+    except Image.DecompressionBombError:
+        raise ImageError(f"Image is larger than {max_pixels} pixels") from None
+    except OSError:
+        raise ImageError("Not a readable image") from None
+    if fmt not in ORIGINAL_EXTENSIONS:
+        raise ImageError(f"Unsupported image format {fmt}; use one of {', '.join(ORIGINAL_EXTENSIONS)}")
+
+    # Camera photos are often stored rotated with an EXIF orientation flag
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        flat = Image.new("RGB", image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel("A"))
+    else:
+        flat = image
+
+    variants = {}
+    for width in widths:
+        size = (width, max(1, round(image.height * width / image.width))) if width < image.width else image.size
+        for ext, pil_format in VARIANT_FORMATS:
+            source = image if pil_format == "WEBP" else flat
+            resized = source.resize(size, Image.LANCZOS) if size != source.size else source
+            out = io.BytesIO()
+            options = {"quality": quality, "method": 4} if pil_format == "WEBP" else {"quality": quality, "optimize": True, "progressive": True}
+            resized.save(out, pil_format, **options)
+            variants[f"{width}.{ext}"] = out.getvalue()
+    return ORIGINAL_EXTENSIONS[fmt], variants
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown():
+    """Stop the worker processes (app shutdown), letting resizes in progress finish."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+# --- Storage ---
+
+class LocalStorage:
+    """Files below a directory, served by the app (see app/main.py)."""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split("/"))
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def put(self, name: str, data: bytes):
+        """Write atomically, so a reader never sees a partial file."""
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+
+storage = LocalStorage(settings.IMAGE_STORAGE_DIR, settings.IMAGE_BASE_URL)
+
+
+class MediaFiles(StaticFiles):
+    """Serves LocalStorage. Content-addressed files can be cached forever."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", "public, max-age=31536000, immutable")
+        return response
+
+
+# --- Uploads ---
+
+def _stored_original(digest: str) -> Optional[str]:
+    for ext in ORIGINAL_EXTENSIONS.values():
+        if storage.exists(f"{digest}/original.{ext}"):
+            return f"{digest}/original.{ext}"
+    return None
+
+
+async def store_upload(data: bytes) -> str:
+    """Store an image and its variants (unless already stored). Returns the original's URL."""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    loop = asyncio.get_running_loop()
+    original = await loop.run_in_executor(None, _stored_original, digest)
+    if original is not None:
+        return storage.url(original)
+
+    ext, variants = await loop.run_in_executor(
+        _get_pool(), render_variants, data, tuple(settings.IMAGE_VARIANT_WIDTHS),
+        settings.IMAGE_QUALITY, settings.IMAGE_MAX_PIXELS,
+    )
+    original = f"{digest}/original.{ext}"
+
+    def write_all():
+        for name, body in variants.items():
+            storage.put(f"{digest}/{name}", body)
+        # The original goes last: its presence means the set is complete
+        storage.put(original, data)
+
+    await loop.run_in_executor(None, write_all)
+    return storage.url(original)
+
+
+# --- Variant URLs ---
+
+_ORIGINAL = re.compile(
+    rf"^{re.escape(settings.IMAGE_BASE_URL.rstrip('/'))}/[0-9a-f]{{{HASH_LENGTH}}}/original\.[a-z]+$"
+)
+
+
+def variant_urls(url: Optional[str]) -> Optional[List[dict]]:
+    """[{"width", "webp", "jpeg"}] for an uploaded image's URL; None for any other URL."""
+    if not url or _ORIGINAL.match(url) is None:
+        return None
+    prefix = url[:url.rindex("/")]
+    return [
+        {"width": width, "webp": f"{prefix}/{width}.webp", "jpeg": f"{prefix}/{width}.jpg"}
+        for width in settings.IMAGE_VARIANT_WIDTHS
+    ]
@@ -0,0 +1,227 @@
+# app/services/order_timeseries.py
+"""
+Orders and revenue per day, week or month (GET /orders/stats/timeseries).
+
+Buckets are computed in SQL with date_trunc on orders.created_at (in UTC;
+weeks start on Monday) and gap-filled with generate_series, so every bucket
+of the range is present. Cancelled orders don't count, as in customer_stats.
+
+Only the bucket containing today (the "open" bucket) changes as orders
+arrive, so the two are cached separately:
+
+    ts:range:{bucket}:{first}:{last}:{open}  JSON rows of a range, keyed by the open bucket's start
+    ts:ranges:{bucket}                       the range keys cached for that bucket size
+    ts:open:{bucket}                         hash {start, orders, revenue}: the open bucket
+
+A response is the cached range with the open bucket's row replaced by the live
+counters, so a chart load is two Redis reads however long the history is.
+Order writes call record(): a change to an order in the open bucket adjusts
+its counters in place; a change to an older order (cancelling or deleting it)
+drops the cached ranges of that bucket size. Range keys include the open
+bucket's start, so nothing cached before a rollover is served after it.
+Everything expires after CACHE_TTL_SECONDS, which bounds staleness from writes
+that bypass the order routes (e.g. deleting a user with their orders).
+"""
+import json
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.redis import get_redis, run_script
+from app.services.customer_stats import counts_sql
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "ts:"
+RANGE_PREFIX = f"{PREFIX}range:"
+RANGES_PREFIX = f"{PREFIX}ranges:"
+OPEN_PREFIX = f"{PREFIX}open:"
+
+# Bucket size -> generate_series step
+STEPS = {"day": "1 day", "week": "1 week", "month": "1 month"}
+BUCKETS = tuple(STEPS)
+# Length of the range when `from` isn't given, in buckets ending with `to`
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 12}
+
+# KEYS: open bucket hashes. ARGV: orders delta, revenue delta, then each hash's
+# expected start. Buckets that aren't cached for that start are left alone;
+# the next read fills them from Postgres.
+RECORD_LUA = """
+for i, key in ipairs(KEYS) do
+  if redis.call('HGET', key, 'start') == ARGV[i + 2] then
+    redis.call('HINCRBY', key, 'orders', ARGV[1])
+    redis.call('HINCRBYFLOAT', key, 'revenue', ARGV[2])
+  end
+end
+return 0
+"""
+
+
+# --- Bucket arithmetic (matches date_trunc) ---
+
+def utc_day(moment: Optional[datetime] = None) -> date:
+    return (moment or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+
+
+def bucket_start(bucket: str, day: date) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def shift(bucket: str, start: date, buckets: int) -> date:
+    """The start of the bucket `buckets` after (or before, if negative) the one starting at `start`."""
+    if bucket == "week":
+        return start + timedelta(weeks=buckets)
+    if bucket == "month":
+        months = start.year * 12 + start.month - 1 + buckets
+        return date(months // 12, months % 12 + 1, 1)
+    return start + timedelta(days=buckets)
+
+
+def bucket_count(bucket: str, first: date, last: date) -> int:
+    if bucket == "week":
+        return (last - first).days // 7 + 1
+    if bucket == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days + 1
+
+
+def resolve_range(bucket: str, start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """
+    The first and last bucket starts for a request's `from` / `to` dates (both
+    inclusive, `to` defaulting to today). Raises ValueError for an empty or too
+    long range.
+    """
+    last = bucket_start(bucket, end or utc_day())
+    first = bucket_start(bucket, start) if start else shift(bucket, last, 1 - DEFAULT_BUCKETS[bucket])
+    if first > last:
+        raise ValueError("`from` is after `to`")
+    if bucket_count(bucket, first, last) > settings.TIMESERIES_MAX_BUCKETS:
+        raise ValueError(f"The range is longer than {settings.TIMESERIES_MAX_BUCKETS} buckets")
+    return first, last
+
+
+# --- Serving ---
+
+def _series_sql(bucket: str):
+    # bucket comes from STEPS, never from the request
+    return text(f"""
+        WITH totals AS (
+            SELECT date_trunc('{bucket}', created_at AT TIME ZONE 'UTC') AS bucket,
+                   count(*) AS orders, coalesce(sum(total_amount), 0) AS revenue
+            FROM orders
+            WHERE created_at >= :since AND created_at < :until AND {counts_sql('status')}
+            GROUP BY 1
+        )
+        SELECT CAST(s.bucket AS date), coalesce(t.orders, 0), coalesce(t.revenue, 0)
+        FROM generate_series(CAST(:first AS timestamp), CAST(:last AS timestamp), interval '{STEPS[bucket]}') AS s(bucket)
+        LEFT JOIN totals AS t ON t.bucket = s.bucket
+        ORDER BY s.bucket
+    """)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+async def _query(db: AsyncSession, bucket: str, first: date, last: date) -> List[dict]:
+    until = shift(bucket, last, 1)
+    result = await db.execute(_series_sql(bucket), {
+        "first": _midnight(first),
+        "last": _midnight(last),
+        "since": _midnight(first).replace(tzinfo=timezone.utc),
+        "until": _midnight(until).replace(tzinfo=timezone.utc),
+    })
+    return [
+        {"bucket": day.isoformat(), "orders": orders, "revenue": round(revenue, 2)}
+        for day, orders, revenue in result.all()
+    ]
+
+
+async def series(db: AsyncSession, bucket: str, first: date, last: date) -> bytes:
+    """Rows {"bucket", "orders", "revenue"} from first to last (bucket starts) as a JSON array."""
+    open_start = bucket_start(bucket, utc_day())
+    key = f"{RANGE_PREFIX}{bucket}:{first}:{last}:{open_start}"
+    open_key = f"{OPEN_PREFIX}{bucket}"
+    ttl = settings.CACHE_TTL_SECONDS or None
+
+    r = await get_redis()
+    pipe = r.pipeline(transaction=False)
+    pipe.get(key)
+    pipe.hgetall(open_key)
+    cached, live = await pipe.execute()
+
+    if cached is None:
+        rows = await _query(db, bucket, first, last)
+        registry = f"{RANGES_PREFIX}{bucket}"
+        pipe.set(key, json.dumps(rows, separators=(",", ":")), ex=ttl)
+        pipe.sadd(registry, key)
+        if ttl:
+            pipe.expire(registry, ttl)
+        await pipe.execute()
+    else:
+        rows = json.loads(cached)
+
+    if not first <= open_start <= last:
+        return json.dumps(rows, separators=(",", ":")).encode()
+
+    index = bucket_count(bucket, first, open_start) - 1
+    if live.get("start") == str(open_start):
+        rows[index] = {
+            "bucket": rows[index]["bucket"],
+            "orders": int(live["orders"]),
+            "revenue": round(float(live["revenue"]), 2),
+        }
+    else:
+        # First read since the rollover (or since the counters expired)
+        if cached is not None:
+            rows[index] = (await _query(db, bucket, open_start, open_start))[0]
+        pipe.delete(open_key)
+        pipe.hset(open_key, mapping={"start": str(open_start), "orders": rows[index]["orders"], "revenue": rows[index]["revenue"]})
+        if ttl:
+            pipe.expire(open_key, ttl)
+        await pipe.execute()
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+# --- Updates from order writes ---
+
+async def record(created_at: Optional[datetime], orders: int, revenue: float):
+    """
+    Apply an order write to the series after it committed: `orders` and
+    `revenue` are the changes in what the order contributes (+1 / -1 and its
+    total when it's created, cancelled, restored or deleted).
+    """
+    if not orders and not revenue:
+        return
+    today = utc_day()
+    day = utc_day(created_at)
+    live = [bucket for bucket in BUCKETS if bucket_start(bucket, day) == bucket_start(bucket, today)]
+    try:
+        if live:
+            await run_script(
+                RECORD_LUA,
+                keys=[f"{OPEN_PREFIX}{bucket}" for bucket in live],
+                args=[orders, repr(float(revenue))] + [str(bucket_start(bucket, today)) for bucket in live],
+            )
+        past = [bucket for bucket in BUCKETS if bucket not in live]
+        if past:
+            await invalidate(*past)
+    except Exception:
+        logger.exception("Could not update the order time series")
+
+
+async def invalidate(*buckets: str):
+    """Drop the cached ranges of these bucket sizes (all of them by default)."""
+    r = await get_redis()
+    for bucket in buckets or BUCKETS:
+        registry = f"{RANGES_PREFIX}{bucket}"
+        keys = await r.smembers(registry)
+        await r.delete(registry, *keys)
@@ -0,0 +1,97 @@
+# app/services/pricing.py
+"""
+Server-side pricing for carts and orders.
+
+Quantities are in grams and product prices are per 100g, as the storefront has
+always displayed them. A line costs
+
+    rate * quantity / 100 + container fee
+
+where `rate` is the product's `price` (its `cost_per_item` when no price is set)
+and the container fee is the packaging surcharge advertised on the product page.
+While a product is on sale with a higher `originalPrice`, the difference is
+reported as the line's discount.
+"""
+from typing import Iterable, Optional, Tuple
+
+GRAMS_PER_UNIT = 100.0
+
+# Packaging surcharge per cart line; other containers (paper) are free
+CONTAINER_FEES = {"plastic": 50.0, "glass": 100.0}
+
+EXPRESS_SHIPPING_FEE = 500.0
+
+
+def _money(value: float) -> float:
+    return round(value, 2)
+
+
+def unit_rate(product, container: Optional[str]) -> Tuple[float, float, float]:
+    """Return (rate, compare-at rate, container fee) for one product/container pair."""
+    rate = product.price if product.price is not None else (product.cost_per_item or 0.0)
+    compare_at = rate
+    if product.isSale and product.originalPrice and product.originalPrice > rate:
+        compare_at = product.originalPrice
+    fee = CONTAINER_FEES.get((container or "").strip().lower(), 0.0)
+    return rate, compare_at, fee
+
+
+def line_total(unit_price: float, container: Optional[str], quantity: Optional[int]) -> float:
+    """What a line at `unit_price` per 100g costs, container fee included (as quote() prices it)."""
+    fee = CONTAINER_FEES.get((container or "").strip().lower(), 0.0)
+    return _money((unit_price or 0.0) * (quantity or 0) / GRAMS_PER_UNIT + fee)
+
+
+def shipping_fee(method: Optional[str]) -> float:
+    return 0.0 if (method or "standard") == "standard" else EXPRESS_SHIPPING_FEE
+
+
+class PriceBook:
+    """
+    Prices cart/order lines, memoizing each product/container rate for the
+    lifetime of the book. Routes get one book per request via get_price_book.
+    """
+
+    def __init__(self):
+        self._rates = {}
+
+    def rate(self, product, container: Optional[str]) -> Tuple[float, float, float]:
+        key = (product.id, container)
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = self._rates[key] = unit_rate(product, container)
+        return rate
+
+    def quote(self, lines: Iterable[tuple]) -> dict:
+        """
+        Price (product, container, quantity) lines in one pass.
+        Returns {"lines": [...], "subtotal", "discount", "total"}; each line has
+        unit_price, container_fee, discount and line_total. Lines without a
+        product (deleted since they were added) price at zero.
+        """
+        lines = list(lines)
+        rates = [self.rate(p, c) if p is not None else (0.0, 0.0, 0.0) for p, c, _ in lines]
+        units = [(q or 0) / GRAMS_PER_UNIT for _, _, q in lines]
+
+        priced = []
+        for (rate, compare_at, fee), units_ in zip(rates, units):
+            priced.append({
+                "unit_price": rate,
+                "container_fee": fee,
+                "discount": _money((compare_at - rate) * units_),
+                "line_total": _money(rate * units_ + fee),
+            })
+
+        total = _money(sum(line["line_total"] for line in priced))
+        discount = _money(sum(line["discount"] for line in priced))
+        return {
+            "lines": priced,
+            "subtotal": _money(total + discount),
+            "discount": discount,
+            "total": total,
+        }
+
+
+def get_price_book() -> PriceBook:
+    """FastAPI dependency: a fresh PriceBook per request (shared by sub-dependencies)."""
+    return PriceBook()
@@ -0,0 +1,342 @@
+# app/services/product_import.py
+"""
+Bulk product import from CSV or JSON Lines.
+
+    POST /products/import?format=csv        (request body is the file)
+    python -m app.services.product_import catalog.csv [--format jsonl]
+
+The file is read as a stream. Each row is validated against ProductCreate
+(collecting per-row errors instead of aborting), and valid rows are COPYed in
+chunks of CHUNK_ROWS into a temporary staging table. Once the whole file is
+staged, one INSERT ... ON CONFLICT (id) DO UPDATE applies it, and everything
+commits together.
+
+Rows:
+  - `category` (a name, case-insensitive) or `category_id` picks the
+    category; names are resolved against one query made up front.
+  - `id` updates that product (or creates it with that id). Without one, a
+    product with the same name (case-insensitive) is updated, otherwise a new
+    product is created. If a file lists the same product twice, the later row wins.
+  - CSV: a header row, empty cells are left out (defaults apply), and
+    `containers` / `images` are `|`-separated.
+  - On update, each row only writes the columns it sets: a blank CSV cell or
+    a key missing from a JSON line keeps the stored value.
+"""
+import codecs
+import csv
+import json
+import types
+import typing
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.productSchema import ProductCreate
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+
+CHUNK_ROWS = 1000
+MAX_REPORTED_ERRORS = 1000
+LIST_SEPARATOR = "|"
+
+STAGING = "product_import"
+PRODUCT_COLUMNS = list(ProductCreate.model_fields)
+LIST_COLUMNS = ("containers", "images")
+STAGING_COLUMNS = ["line", "id", "id_given", "provided", *PRODUCT_COLUMNS]
+
+
+def _allows_none(annotation) -> bool:
+    if annotation is type(None):
+        return True
+    origin = typing.get_origin(annotation)
+    union_types = (typing.Union,) + ((types.UnionType,) if hasattr(types, "UnionType") else ())
+    return origin in union_types and type(None) in typing.get_args(annotation)
+
+
+# Declared Optional but without a default: an absent key means null
+NULLABLE_REQUIRED = [
+    name for name, field in ProductCreate.model_fields.items()
+    if field.is_required() and _allows_none(field.annotation)
+]
+
+
+# --- Reading ---
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines (UTF-8, BOM stripped), without reading it all."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    header = None
+    record, start = [], 0
+    line_no = 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not record:
+            start = line_no
+        record.append(line)
+        # A quoted field spans lines until its quotes balance ("" escapes one)
+        if sum(part.count('"') for part in record) % 2:
+            continue
+        text_record = "\n".join(record).rstrip("\r")
+        record = []
+        if not text_record.strip():
+            continue
+        try:
+            values = next(csv.reader([text_record], strict=True))
+        except csv.Error as exc:
+            yield start, [f"invalid CSV: {exc}"]
+            continue
+
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, [f"expected {len(header)} columns, got {len(values)}"]
+            continue
+        row = {}
+        for name, value in zip(header, values):
+            value = value.strip()
+            if value == "":
+                continue
+            row[name] = [v.strip() for v in value.split(LIST_SEPARATOR) if v.strip()] if name in LIST_COLUMNS else value
+        yield start, row
+    if record:
+        yield start, ["unterminated quoted field"]
+
+
+async def _jsonl_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    line_no = 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_no, [f"invalid JSON: {exc}"]
+            continue
+        if not isinstance(row, dict):
+            yield line_no, ["expected a JSON object"]
+            continue
+        yield line_no, row
+
+
+def read_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """(line, row dict) per row, or (line, [errors]) for rows that can't be parsed."""
+    return _csv_rows(chunks) if fmt == CSV else _jsonl_rows(chunks)
+
+
+# --- Validation ---
+
+class ProductRows:
+    """Validates rows into staging records, keeping per-row errors."""
+
+    def __init__(self, categories: Dict[str, uuid.UUID]):
+        self.by_name = {name.lower(): category_id for name, category_id in categories.items()}
+        self.ids = set(categories.values())
+        # New products' ids by name, so repeated names in a file stay one product
+        self.new_ids: Dict[str, uuid.UUID] = {}
+        self.errors: List[dict] = []
+        self.failed = 0
+
+    def fail(self, line: int, errors: List[str]):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def _category_id(self, row: dict) -> Optional[uuid.UUID]:
+        if "category" in row:
+            return self.by_name.get(str(row.pop("category")).strip().lower())
+        try:
+            category_id = uuid.UUID(str(row["category_id"]))
+        except (KeyError, ValueError):
+            return None
+        return category_id if category_id in self.ids else None
+
+    def record(self, line: int, row: dict) -> Optional[tuple]:
+        """The staging record for a valid row; None (and an error) otherwise."""
+        row = dict(row)
+        given = row.pop("id", None)
+        try:
+            product_id = uuid.UUID(str(given)) if given not in (None, "") else None
+        except ValueError:
+            self.fail(line, ["id: not a valid UUID"])
+            return None
+
+        category_id = self._category_id(row)
+        if category_id is None:
+            self.fail(line, ["category: unknown category"])
+            return None
+        row["category_id"] = str(category_id)
+
+        provided = set(row) & set(PRODUCT_COLUMNS)
+        for name in NULLABLE_REQUIRED:
+            row.setdefault(name, None)
+        try:
+            product = ProductCreate.model_validate(row)
+        except ValidationError as exc:
+            self.fail(line, [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()])
+            return None
+
+        values = product.model_dump()
+        values["category_id"] = category_id
+        id_given = product_id is not None
+        if not id_given:
+            product_id = self.new_ids.setdefault(product.name.lower(), uuid.uuid4())
+        return (line, product_id, id_given, sorted(provided), *[values[c] for c in PRODUCT_COLUMNS])
+
+
+# --- Loading ---
+
+def _quoted(columns) -> str:
+    return ", ".join(f'"{c}"' for c in columns)
+
+
+async def _copy(db: AsyncSession, records: List[tuple]):
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(STAGING, records=records, columns=STAGING_COLUMNS)
+
+
+async def _apply(db: AsyncSession) -> Tuple[int, int]:
+    """Match rows without an id by name, then upsert the staging table. Returns (inserted, updated)."""
+    await db.execute(text(f"""
+        UPDATE {STAGING} AS s SET id = p.id
+        FROM products AS p
+        WHERE NOT s.id_given AND lower(p.name) = lower(s.name)
+    """))
+    # Existing products only take the columns their row set (s.provided); the
+    # staged defaults for the others would overwrite stored values
+    updates = ", ".join(
+        f'"{c}" = CASE WHEN \'{c}\' = ANY(s.provided) THEN s."{c}" ELSE p."{c}" END' for c in PRODUCT_COLUMNS
+    )
+    result = await db.execute(text(f"""
+        WITH latest AS (
+            SELECT DISTINCT ON (id) * FROM {STAGING} ORDER BY id, line DESC
+        ), updated AS (
+            UPDATE products AS p SET {updates}
+            FROM latest AS s
+            WHERE p.id = s.id
+            RETURNING p.id
+        ), inserted AS (
+            INSERT INTO products (id, {_quoted(PRODUCT_COLUMNS)})
+            SELECT id, {_quoted(PRODUCT_COLUMNS)} FROM latest
+            WHERE id NOT IN (SELECT id FROM updated)
+            ON CONFLICT (id) DO NOTHING
+            RETURNING id
+        )
+        SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM updated)
+    """))
+    inserted, updated = result.one()
+    return inserted, updated
+
+
+async def import_products(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str) -> dict:
+    """
+    Stream, validate and upsert a product file in one transaction.
+    Returns counts plus the errors of rejected rows (the first MAX_REPORTED_ERRORS).
+    """
+    categories = dict((await db.execute(text("SELECT name, id FROM categories"))).all())
+    rows = ProductRows({name: category_id for name, category_id in categories.items() if name})
+
+    # Serialize imports, so two files can't both create the same new name
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext('product_import'))"))
+    await db.execute(text(f"CREATE TEMP TABLE {STAGING} (LIKE products) ON COMMIT DROP"))
+    await db.execute(text(f"ALTER TABLE {STAGING} ADD COLUMN line integer, ADD COLUMN id_given boolean, ADD COLUMN provided text[]"))
+
+    received, batch = 0, []
+    async for line, row in read_rows(chunks, fmt):
+        received += 1
+        if isinstance(row, list):
+            rows.fail(line, row)
+            continue
+        record = rows.record(line, row)
+        if record is not None:
+            batch.append(record)
+        if len(batch) >= CHUNK_ROWS:
+            await _copy(db, batch)
+            batch = []
+    if batch:
+        await _copy(db, batch)
+
+    inserted = updated = 0
+    if received > rows.failed:
+        inserted, updated = await _apply(db)
+    await db.commit()
+    return {
+        "received": received,
+        "inserted": inserted,
+        "updated": updated,
+        "failed": rows.failed,
+        "errors": rows.errors,
+    }
+
+
+def format_for(name: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Pick the format from an explicit name, a file extension or a content type."""
+    name = (name or "").lower()
+    if name in FORMATS:
+        return name
+    if name.endswith(".csv") or "csv" in (content_type or ""):
+        return CSV
+    if name.endswith((".jsonl", ".ndjson")) or any(t in (content_type or "") for t in ("jsonl", "ndjson")):
+        return JSONL
+    return None
+
+
+# --- CLI ---
+
+async def _file_chunks(path: str, size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _main(path: str, fmt: Optional[str]):
+    from app.db.session import async_session, engine
+    from app.services import cache
+
+    fmt = format_for(fmt) or format_for(path)
+    if fmt is None:
+        raise SystemExit("Can't tell the format from the file name; pass --format csv or --format jsonl")
+    try:
+        async with async_session() as db:
+            result = await import_products(db, _file_chunks(path), fmt)
+        await cache.invalidate(*cache.CATALOG_KEYS, *cache.DASHBOARD_KEYS)
+    finally:
+        await engine.dispose()
+
+    print(f"{result['received']} rows: {result['inserted']} inserted, {result['updated']} updated, {result['failed']} failed")
+    for error in result["errors"]:
+        print(f"  line {error['line']}: {'; '.join(error['errors'])}")
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Bulk-import products from a CSV or JSON Lines file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args()
+    asyncio.run(_main(args.path, args.format))
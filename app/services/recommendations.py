@@ -0,0 +1,210 @@
+# app/services/recommendations.py
+"""
+"Frequently bought together" from order co-occurrence.
+
+Two products co-occur once for every order that contains both. Scores are
+normalized by popularity (Ochiai / cosine over order baskets):
+
+    score(a, b) = orders(a and b) / sqrt(orders(a) * orders(b))
+
+so a best-seller isn't related to everything. State lives in Redis:
+
+    recs:popularity        hash product_id -> orders containing it
+    recs:cooc:{a}          hash b -> orders containing both a and b
+    recs:related:{a}       JSON [{"id", "score"}, ...], the top RELATED_PRODUCTS_LIMIT
+
+GET /products/{id}/related is one GET of recs:related:{id}.
+
+`rebuild()` recomputes everything from order_items in one set-based query
+(Postgres does the pair counting, popularity join and per-product ranking).
+`record_order()` runs after create_order commits: it increments the counts
+for the order's products and re-ranks their lists. Lists of products that
+weren't in the order aren't re-ranked when a neighbour's popularity changes,
+and deleted orders aren't subtracted; run the rebuild periodically
+(`python -m app.services.recommendations`) to true them up.
+"""
+import json
+import logging
+import math
+from typing import Iterable, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.redis import get_bytes, get_redis
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "recs:"
+POPULARITY_KEY = f"{PREFIX}popularity"
+COOC_PREFIX = f"{PREFIX}cooc:"
+RELATED_PREFIX = f"{PREFIX}related:"
+
+WRITE_BATCH = 500
+
+# One row per co-occurring pair, ranked within each product; ordered by product
+PAIRS_SQL = text("""
+WITH baskets AS (
+    SELECT DISTINCT order_id, product_id FROM order_items
+    WHERE order_id IS NOT NULL AND product_id IS NOT NULL
+),
+popularity AS (
+    SELECT product_id, count(*) AS orders FROM baskets GROUP BY product_id
+),
+pairs AS (
+    SELECT a.product_id AS a, b.product_id AS b, count(*) AS together
+    FROM baskets AS a
+    JOIN baskets AS b ON a.order_id = b.order_id AND a.product_id <> b.product_id
+    GROUP BY a.product_id, b.product_id
+),
+scored AS (
+    SELECT pairs.a, pairs.b, pairs.together,
+           pairs.together / sqrt(pa.orders * pb.orders) AS score
+    FROM pairs
+    JOIN popularity AS pa ON pa.product_id = pairs.a
+    JOIN popularity AS pb ON pb.product_id = pairs.b
+)
+SELECT a, b, together, score,
+       row_number() OVER (PARTITION BY a ORDER BY score DESC, together DESC, b) AS rank
+FROM scored
+ORDER BY a
+""")
+
+POPULARITY_SQL = text("""
+SELECT product_id, count(DISTINCT order_id) FROM order_items
+WHERE order_id IS NOT NULL AND product_id IS NOT NULL
+GROUP BY product_id
+""")
+
+
+def _related_json(ranked: List[tuple]) -> str:
+    return json.dumps([{"id": b, "score": round(score, 4)} for b, score in ranked], separators=(",", ":"))
+
+
+def _top(counts: dict, popularity: dict, a: str) -> List[tuple]:
+    pop_a = popularity.get(a) or 1
+    scored = [
+        (b, together / math.sqrt(pop_a * (popularity.get(b) or 1)), together)
+        for b, together in counts.items()
+    ]
+    scored.sort(key=lambda item: (-item[1], -item[2], item[0]))
+    return [(b, score) for b, score, _ in scored[:settings.RELATED_PRODUCTS_LIMIT]]
+
+
+# --- Serving ---
+
+async def related_body(product_id: str) -> bytes:
+    """The stored neighbour list for product_id as JSON bytes (`[]` when it has none)."""
+    body = await get_bytes(f"{RELATED_PREFIX}{product_id}")
+    return body if body is not None else b"[]"
+
+
+# --- Incremental updates ---
+
+async def record_order(product_ids: Iterable):
+    """
+    Count a committed order and re-rank its products' lists. Failures are
+    logged, never raised: recommendations must not fail a checkout.
+    """
+    ids = sorted({str(product_id) for product_id in product_ids if product_id})
+    if not ids:
+        return
+    try:
+        r = await get_redis()
+        pipe = r.pipeline(transaction=False)
+        for a in ids:
+            pipe.hincrby(POPULARITY_KEY, a, 1)
+            for b in ids:
+                if b != a:
+                    pipe.hincrby(f"{COOC_PREFIX}{a}", b, 1)
+        for a in ids:
+            pipe.hgetall(f"{COOC_PREFIX}{a}")
+        results = await pipe.execute()
+        neighbours = dict(zip(ids, results[-len(ids):]))
+
+        involved = sorted(set(ids).union(*[counts.keys() for counts in neighbours.values()]))
+        popularity = dict(zip(involved, await r.hmget(POPULARITY_KEY, involved)))
+        popularity = {key: int(value or 0) for key, value in popularity.items()}
+
+        pipe = r.pipeline(transaction=False)
+        for a, counts in neighbours.items():
+            ranked = _top({b: int(together) for b, together in counts.items()}, popularity, a)
+            pipe.set(f"{RELATED_PREFIX}{a}", _related_json(ranked))
+        await pipe.execute()
+    except Exception:
+        logger.exception("Could not update recommendations for an order")
+
+
+# --- Full rebuild ---
+
+async def _delete_stale(r, prefix: str, keep: set):
+    stale = []
+    async for key in r.scan_iter(match=f"{prefix}*", count=1000):
+        if key[len(prefix):] not in keep:
+            stale.append(key)
+    for i in range(0, len(stale), WRITE_BATCH):
+        await r.delete(*stale[i:i + WRITE_BATCH])
+
+
+async def rebuild(db: AsyncSession) -> int:
+    """Recompute counts and neighbour lists from order_items. Returns the number of products with a list."""
+    r = await get_redis()
+    popularity = {str(product_id): orders for product_id, orders in (await db.execute(POPULARITY_SQL)).all()}
+
+    seen = set()
+    pipe = r.pipeline(transaction=False)
+    current, counts, ranked = None, {}, []
+
+    def flush_product():
+        key = f"{COOC_PREFIX}{current}"
+        pipe.delete(key)
+        pipe.hset(key, mapping=counts)
+        pipe.set(f"{RELATED_PREFIX}{current}", _related_json(ranked))
+        seen.add(current)
+
+    result = await db.stream(PAIRS_SQL)
+    async for a, b, together, score, rank in result:
+        a, b = str(a), str(b)
+        if a != current:
+            if current is not None:
+                flush_product()
+                if len(pipe) >= WRITE_BATCH * 3:
+                    await pipe.execute()
+            current, counts, ranked = a, {}, []
+        counts[b] = together
+        if rank <= settings.RELATED_PRODUCTS_LIMIT:
+            ranked.append((b, score))
+    if current is not None:
+        flush_product()
+
+    pipe.delete(POPULARITY_KEY)
+    if popularity:
+        pipe.hset(POPULARITY_KEY, mapping=popularity)
+    await pipe.execute()
+
+    await _delete_stale(r, COOC_PREFIX, seen)
+    await _delete_stale(r, RELATED_PREFIX, seen)
+    return len(seen)
+
+
+async def _main():
+    import time
+
+    from app.db.redis import close_redis
+    from app.db.session import async_session, engine
+
+    started = time.perf_counter()
+    try:
+        async with async_session() as db:
+            count = await rebuild(db)
+    finally:
+        await close_redis()
+        await engine.dispose()
+    print(f"Rebuilt related products for {count} products in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(_main())
@@ -0,0 +1,388 @@
+# app/services/similarity.py
+"""
+Content-based "similar products" from product text and category.
+
+Products without order history have no co-purchase signal
+(app/services/recommendations.py), so this ranks neighbours by what they are:
+
+- Features are words and character trigrams of `name` (weight 3),
+  `short_description` (2) and `description` (1), hashed into BUCKETS
+  buckets. crc32 keeps the bucket of a term stable across processes.
+- Vectors are TF-IDF, L2-normalized: (1 + log tf) * log((1 + n) / (1 + df)).
+- score = (1 - CATEGORY_WEIGHT) * cosine + CATEGORY_WEIGHT * same category.
+  Same-category products also fill lists that text alone leaves short.
+
+Everything is precomputed into Redis; GET /products/{id}/similar is one GET:
+
+    sim:docs             hash product_id -> {"c": category_id, "v": {bucket: weight}}
+    sim:df               hash bucket -> number of products containing it
+    sim:post:{bucket}    set of product ids containing the bucket
+    sim:cat:{category}   set of product ids in the category
+    sim:similar:{id}     JSON [{"id", "score"}, ...], top SIMILAR_PRODUCTS_LIMIT
+
+`rebuild()` computes the whole index in a worker process (pure-Python CPU
+work that would otherwise hold the GIL and stall the event loop) and is the
+background job: `python -m app.services.similarity` (bulk imports also
+schedule one). The new sets and hashes are written under sim:build:* and
+renamed into place, then stale keys are dropped, so lookups and refreshes
+never see an empty index while it runs. Product creates and text/category updates call
+`refresh_product()` after the response is sent.
+It re-vectorizes that product, ranks it against the products sharing a
+selective bucket (or its category), and inserts it into those products'
+lists. Other products' weights drift slightly as document frequencies
+change until the next rebuild.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.redis import get_bytes, get_redis
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "sim:"
+DOCS_KEY = f"{PREFIX}docs"
+DF_KEY = f"{PREFIX}df"
+POSTINGS_PREFIX = f"{PREFIX}post:"
+CATEGORY_PREFIX = f"{PREFIX}cat:"
+SIMILAR_PREFIX = f"{PREFIX}similar:"
+BUILD_PREFIX = f"{PREFIX}build:"
+
+BUCKETS = 1 << 18
+FIELD_WEIGHTS = (("name", 3.0), ("short_description", 2.0), ("description", 1.0))
+# Fields that change a product's vector; updates touching none of them skip the refresh
+INDEXED_FIELDS = {"name", "short_description", "description", "category_id"}
+CATEGORY_WEIGHT = 0.2
+# Buckets in more than this share of products are too common to pick candidates
+MAX_DF_RATIO = 0.2
+WRITE_BATCH = 500
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+Vector = Dict[str, float]
+
+
+# --- Vectors ---
+
+def features(name: Optional[str], short_description: Optional[str], description: Optional[str]) -> Counter:
+    """Weighted term counts, keyed by bucket (as a string, like the Redis hash fields)."""
+    counts = Counter()
+    for (_, weight), value in zip(FIELD_WEIGHTS, (name, short_description, description)):
+        for word in _WORD.findall((value or "").lower()):
+            counts[f"w{word}"] += weight
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                counts[f"c{padded[i:i + 3]}"] += weight / 2
+    buckets = Counter()
+    for term, count in counts.items():
+        buckets[str(zlib.crc32(term.encode()) % BUCKETS)] += count
+    return buckets
+
+
+def weigh(tf: Counter, df: Dict[str, int], n: int) -> Vector:
+    vector = {
+        bucket: (1 + math.log(count)) * math.log((1 + n) / (1 + df.get(bucket, 0)))
+        for bucket, count in tf.items() if count > 0
+    }
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {bucket: round(w / norm, 5) for bucket, w in vector.items() if w > 0}
+
+
+def score(u: dict, v: dict) -> float:
+    """Blend of text cosine and category match between two docs ({"c", "v"})."""
+    a, b = (u["v"], v["v"]) if len(u["v"]) <= len(v["v"]) else (v["v"], u["v"])
+    cosine = sum(w * b.get(bucket, 0.0) for bucket, w in a.items())
+    same = 1.0 if u["c"] is not None and u["c"] == v["c"] else 0.0
+    return (1 - CATEGORY_WEIGHT) * cosine + CATEGORY_WEIGHT * same
+
+
+def _top(scored: Iterable[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    ranked = sorted((item for item in scored if item[1] > 0), key=lambda item: (-item[1], item[0]))
+    return ranked[:settings.SIMILAR_PRODUCTS_LIMIT]
+
+
+def _similar_json(ranked: List[Tuple[str, float]]) -> str:
+    return json.dumps([{"id": pid, "score": round(s, 4)} for pid, s in ranked], separators=(",", ":"))
+
+
+# --- Full build ---
+
+def build(rows: List[tuple]) -> Tuple[Dict[str, dict], Dict[str, int], Dict[str, List[Tuple[str, float]]]]:
+    """
+    Compute docs, document frequencies and neighbour lists for
+    (id, name, short_description, description, category_id) rows. CPU-bound.
+    """
+    tfs = {str(pid): (features(name, short, desc), str(category) if category else None)
+           for pid, name, short, desc, category in rows}
+    n = len(tfs)
+    df = Counter()
+    for tf, _ in tfs.values():
+        df.update(tf.keys())
+    docs = {pid: {"c": category, "v": weigh(tf, df, n)} for pid, (tf, category) in tfs.items()}
+
+    postings = defaultdict(list)
+    by_category = defaultdict(list)
+    limit = max(MAX_DF_RATIO * n, 2)
+    for pid, doc in docs.items():
+        by_category[doc["c"]].append(pid)
+        for bucket in doc["v"]:
+            if df[bucket] <= limit:
+                postings[bucket].append(pid)
+
+    similar = {}
+    for pid, doc in docs.items():
+        # Dot products over the selective buckets only, through the postings
+        dots = defaultdict(float)
+        for bucket, w in doc["v"].items():
+            for other in postings.get(bucket, ()):
+                if other != pid:
+                    dots[other] += w * docs[other]["v"][bucket]
+        candidates = set(dots)
+        if len(candidates) < settings.SIMILAR_PRODUCTS_LIMIT and doc["c"] is not None:
+            candidates.update(other for other in by_category[doc["c"]] if other != pid)
+        similar[pid] = _top((other, score(doc, docs[other])) for other in candidates)
+    return docs, dict(df), similar
+
+
+def _build_key(key: str) -> str:
+    """Where rebuild() writes key's new value before renaming it into place."""
+    return f"{BUILD_PREFIX}{key[len(PREFIX):]}"
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # One rebuild at a time is plenty; the process is reused by the next one
+        _pool = ProcessPoolExecutor(max_workers=1)
+    return _pool
+
+
+def shutdown():
+    """Stop the build process (app shutdown), letting a build in progress finish."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+async def _delete_stale(r, prefix: str, keep: set):
+    """Delete keys under prefix whose suffix isn't in keep."""
+    batch = []
+    async for key in r.scan_iter(match=f"{prefix}*", count=1000):
+        if key[len(prefix):] not in keep:
+            batch.append(key)
+        if len(batch) >= WRITE_BATCH:
+            await r.delete(*batch)
+            batch = []
+    if batch:
+        await r.delete(*batch)
+
+
+async def rebuild(db: AsyncSession) -> int:
+    """Recompute the whole index from the products table. Returns the number of products indexed."""
+    rows = [
+        (str(pid), name, short, desc, str(category) if category else None)
+        for pid, name, short, desc, category in (await db.execute(select(
+            Product.id, Product.name, Product.short_description, Product.description, Product.category_id,
+        ))).all()
+    ]
+    docs, df, similar = await asyncio.get_running_loop().run_in_executor(_get_pool(), build, rows)
+
+    postings = defaultdict(list)
+    by_category = defaultdict(list)
+    for pid, doc in docs.items():
+        for bucket in doc["v"]:
+            postings[bucket].append(pid)
+        if doc["c"] is not None:
+            by_category[doc["c"]].append(pid)
+
+    # Neighbour lists are replaced key by key; everything else is built aside
+    r = await get_redis()
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(_build_key(DOCS_KEY), _build_key(DF_KEY))
+    built = []
+    for pid, doc in docs.items():
+        pipe.hset(_build_key(DOCS_KEY), pid, json.dumps(doc, separators=(",", ":")))
+        pipe.set(f"{SIMILAR_PREFIX}{pid}", _similar_json(similar[pid]))
+        if len(pipe) >= WRITE_BATCH:
+            await pipe.execute()
+    if df:
+        pipe.hset(_build_key(DF_KEY), mapping=df)
+    for prefix, sets in ((POSTINGS_PREFIX, postings), (CATEGORY_PREFIX, by_category)):
+        for name, ids in sets.items():
+            key = f"{prefix}{name}"
+            pipe.delete(_build_key(key))
+            pipe.sadd(_build_key(key), *ids)
+            built.append(key)
+            if len(pipe) >= WRITE_BATCH:
+                await pipe.execute()
+    await pipe.execute()
+
+    for key in built:
+        pipe.rename(_build_key(key), key)
+        if len(pipe) >= WRITE_BATCH:
+            await pipe.execute()
+    # RENAME needs the source to exist: an empty catalog has no docs / df
+    for key, built_any in ((DOCS_KEY, docs), (DF_KEY, df)):
+        if built_any:
+            pipe.rename(_build_key(key), key)
+        else:
+            pipe.delete(key)
+    await pipe.execute()
+
+    await _delete_stale(r, POSTINGS_PREFIX, set(postings))
+    await _delete_stale(r, CATEGORY_PREFIX, set(by_category))
+    await _delete_stale(r, SIMILAR_PREFIX, set(docs))
+    return len(docs)
+
+
+async def rebuild_in_background():
+    """rebuild() with its own session, for background tasks (e.g. after a bulk import)."""
+    from app.db.session import async_session
+
+    try:
+        async with async_session() as db:
+            await rebuild(db)
+    except Exception:
+        logger.exception("Could not rebuild similar products")
+
+
+# --- Incremental updates ---
+
+async def refresh_product(product_id):
+    """
+    Re-index one product after it was created or its text/category changed.
+    Runs as a background task; failures are logged and left for the next rebuild.
+    """
+    from app.db.session import async_session
+
+    pid = str(product_id)
+    try:
+        async with async_session() as db:
+            row = (await db.execute(
+                select(Product.name, Product.short_description, Product.description, Product.category_id)
+                .where(Product.id == product_id)
+            )).one_or_none()
+        if row is None:
+            return await remove_product(pid)
+        name, short, desc, category = row
+        category = str(category) if category else None
+        tf = features(name, short, desc)
+
+        r = await get_redis()
+        old = await r.hget(DOCS_KEY, pid)
+        old = json.loads(old) if old else None
+        old_buckets = set(old["v"]) if old else set()
+
+        pipe = r.pipeline(transaction=False)
+        for bucket in set(tf) - old_buckets:
+            pipe.hincrby(DF_KEY, bucket, 1)
+            pipe.sadd(f"{POSTINGS_PREFIX}{bucket}", pid)
+        for bucket in old_buckets - set(tf):
+            pipe.hincrby(DF_KEY, bucket, -1)
+            pipe.srem(f"{POSTINGS_PREFIX}{bucket}", pid)
+        if old and old["c"] != category and old["c"] is not None:
+            pipe.srem(f"{CATEGORY_PREFIX}{old['c']}", pid)
+        if category is not None:
+            pipe.sadd(f"{CATEGORY_PREFIX}{category}", pid)
+        pipe.hlen(DOCS_KEY)
+        *_, n = await pipe.execute()
+        n = n + (0 if old else 1)
+        buckets = list(tf)
+        df_values = await r.hmget(DF_KEY, buckets) if buckets else []
+        df = {bucket: int(value or 0) for bucket, value in zip(buckets, df_values)}
+
+        doc = {"c": category, "v": weigh(tf, df, n)}
+        await r.hset(DOCS_KEY, pid, json.dumps(doc, separators=(",", ":")))
+
+        selective = [bucket for bucket in doc["v"] if df.get(bucket, 0) <= max(MAX_DF_RATIO * n, 2)]
+        candidates = set(await r.sunion(*[f"{POSTINGS_PREFIX}{b}" for b in selective])) if selective else set()
+        if len(candidates) < settings.SIMILAR_PRODUCTS_LIMIT + 1 and category is not None:
+            candidates |= set(await r.smembers(f"{CATEGORY_PREFIX}{category}"))
+        candidates.discard(pid)
+        candidates = sorted(candidates)
+        others = dict(zip(candidates, await r.hmget(DOCS_KEY, candidates))) if candidates else {}
+
+        scored = [(other, score(doc, json.loads(raw))) for other, raw in others.items() if raw]
+        await r.set(f"{SIMILAR_PREFIX}{pid}", _similar_json(_top(scored)))
+        await _insert_into_lists(r, pid, scored)
+    except Exception:
+        logger.exception("Could not refresh similar products for %s", pid)
+
+
+async def _insert_into_lists(r, pid: str, scored: List[Tuple[str, float]]):
+    """Put pid, at its new score, into the neighbour lists of the products it was scored against."""
+    others = [other for other, _ in scored]
+    for i in range(0, len(others), WRITE_BATCH):
+        chunk = scored[i:i + WRITE_BATCH]
+        lists = await r.mget([f"{SIMILAR_PREFIX}{other}" for other, _ in chunk])
+        pipe = r.pipeline(transaction=False)
+        for (other, s), raw in zip(chunk, lists):
+            current = [(item["id"], item["score"]) for item in json.loads(raw or "[]") if item["id"] != pid]
+            ranked = _top(current + [(pid, s)])
+            pipe.set(f"{SIMILAR_PREFIX}{other}", _similar_json(ranked))
+        await pipe.execute()
+
+
+async def remove_product(product_id):
+    """Drop a deleted product from the index (other lists forget it at the next rebuild)."""
+    pid = str(product_id)
+    try:
+        r = await get_redis()
+        old = await r.hget(DOCS_KEY, pid)
+        pipe = r.pipeline(transaction=False)
+        if old:
+            doc = json.loads(old)
+            for bucket in doc["v"]:
+                pipe.hincrby(DF_KEY, bucket, -1)
+                pipe.srem(f"{POSTINGS_PREFIX}{bucket}", pid)
+            if doc["c"] is not None:
+                pipe.srem(f"{CATEGORY_PREFIX}{doc['c']}", pid)
+        pipe.hdel(DOCS_KEY, pid)
+        pipe.delete(f"{SIMILAR_PREFIX}{pid}")
+        await pipe.execute()
+    except Exception:
+        logger.exception("Could not remove %s from similar products", pid)
+
+
+# --- Serving ---
+
+async def similar_body(product_id: str) -> bytes:
+    """The stored neighbour list for product_id as JSON bytes (`[]` when it has none)."""
+    body = await get_bytes(f"{SIMILAR_PREFIX}{product_id}")
+    return body if body is not None else b"[]"
+
+
+async def _main():
+    import time
+
+    from app.db.redis import close_redis
+    from app.db.session import async_session, engine
+
+    started = time.perf_counter()
+    try:
+        async with async_session() as db:
+            count = await rebuild(db)
+    finally:
+        shutdown()
+        await close_redis()
+        await engine.dispose()
+    print(f"Indexed {count} products for similarity in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,100 @@
+# app/services/warmup.py
+"""
+Worker warm-up, started from the app lifespan.
+
+1. Open WARMUP_DB_CONNECTIONS Postgres connections at once and SELECT 1 on each,
+   so the pool holds live, TLS-negotiated connections before the first request
+   (retried every WARMUP_RETRY_SECONDS while the database is unreachable).
+2. Ping WARMUP_REDIS_CONNECTIONS Redis connections concurrently, which makes
+   the pool open that many sockets.
+3. Preload every app.services.cache entry (featured products, categories,
+   dashboard aggregates), each on its own pooled session.
+
+`state` tracks progress; GET /health/ready answers 503 until it is ready. A
+cache entry that fails to load is reported but doesn't hold readiness back:
+reads fall through to Postgres and fill it on first use.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.db.session import async_session, engine
+from app.services import cache
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.checks = {}
+
+    def as_dict(self) -> dict:
+        duration = None
+        if self.started_at is not None and self.finished_at is not None:
+            duration = round(self.finished_at - self.started_at, 3)
+        return {
+            "status": "ready" if self.ready else "warming",
+            "checks": dict(self.checks),
+            "warmup_seconds": duration,
+        }
+
+
+state = WarmupState()
+
+
+async def prime_db(count: int):
+    """Hold `count` connections open together so the pool keeps that many."""
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(count)))
+    try:
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in connections))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in connections))
+
+
+async def prime_redis(count: int):
+    r = await get_redis()
+    await asyncio.gather(*(r.ping() for _ in range(count)))
+
+
+async def preload(key: str):
+    try:
+        async with async_session() as db:
+            await cache.fill(db, key)
+        state.checks[key] = "ok"
+    except Exception as exc:
+        logger.exception("Warm-up: could not preload %s", key)
+        state.checks[key] = f"failed: {exc.__class__.__name__}"
+
+
+async def warm_up():
+    state.ready = False
+    state.started_at = time.monotonic()
+    state.checks = {"database": "pending", "redis": "pending"}
+    state.checks.update({key: "pending" for key in cache.ENTRIES})
+
+    while True:
+        results = await asyncio.gather(
+            prime_db(settings.WARMUP_DB_CONNECTIONS),
+            prime_redis(settings.WARMUP_REDIS_CONNECTIONS),
+            return_exceptions=True,
+        )
+        for name, result in zip(("database", "redis"), results):
+            state.checks[name] = f"failed: {result.__class__.__name__}" if isinstance(result, Exception) else "ok"
+        if not any(isinstance(result, Exception) for result in results):
+            break
+        logger.warning("Warm-up: connections not ready (%s), retrying", state.checks)
+        await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+
+    await asyncio.gather(*(preload(key) for key in cache.ENTRIES))
+
+    state.finished_at = time.monotonic()
+    state.ready = True
+    logger.info("Warm-up finished in %.2fs", state.finished_at - state.started_at)
@@ -0,0 +1,157 @@
+# benchmarks/explain_audit.py
+"""
+Check that the routes' lookups are index-driven.
+
+    python -m benchmarks.explain_audit
+    python -m benchmarks.explain_audit --min-rows 1000 --verbose
+
+Calls each keyed read route in-process against the seeded database, captures
+every SELECT it sends, and EXPLAINs them with sequential scans disabled
+(enable_seqscan = off). The planner still falls back to a Seq Scan when no
+index can serve a filter or join, so one left in a plan means a missing index
+rather than a planner preference that holds only for a small dataset. Exits
+non-zero when that happens on a table with at least --min-rows rows (small
+lookup tables such as categories are cheaper to scan).
+
+Paged routes (a LIMIT in the plan) also fail when the page is cut from a Sort
+rather than read in index order. Full listings (GET /products, /orders, ...)
+scan by design and aren't checked.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import httpx
+from sqlalchemy import event, select, text
+
+from app.db.session import engine, async_session
+from app.main import app
+from app.models.order import Order
+from app.models.product import Product
+from app.models.review import Review
+from app.models.user import User
+
+
+async def sample_ids() -> dict:
+  """Ids that exercise each route: a user with orders and a product with reviews."""
+  async with async_session() as db:
+    user = (await db.execute(select(User).join(Order, Order.user_id == User.id).limit(1))).scalars().first()
+    product_id = await db.scalar(select(Review.product_id).limit(1))
+    category_id = await db.scalar(select(Product.category_id).where(Product.category_id.isnot(None)).limit(1))
+    order_id = await db.scalar(select(Order.id).limit(1))
+    review_id = await db.scalar(select(Review.id).limit(1))
+  if None in (user, product_id, category_id, order_id, review_id):
+    raise SystemExit("Not enough data; run `python -m benchmarks.seed` first")
+  return {
+    "user_id": user.id, "supabase_id": user.supabase_id, "product_id": product_id,
+    "category_id": category_id, "order_id": order_id, "review_id": review_id,
+  }
+
+
+def routes(ids: dict) -> list:
+  return [
+    f"/products/products/{ids['product_id']}",
+    f"/category/categories/{ids['category_id']}",
+    f"/carts/carts/user/{ids['supabase_id']}",
+    f"/wishlists/wishlists/user/{ids['supabase_id']}",
+    f"/orders/orders/{ids['order_id']}",
+    f"/orders/orders/user/{ids['user_id']}",
+    f"/reviews/reviews/{ids['review_id']}",
+    f"/reviews/reviews/product/{ids['product_id']}",
+    f"/reviews/reviews/user/{ids['user_id']}",
+    f"/users/users/{ids['user_id']}",
+    f"/users/users/by-supabase/{ids['supabase_id']}",
+    # Pages of the customer list, read off the customer_stats indexes
+    "/users/users/?limit=20",
+    *(
+      f"/users/users/?sort={sort}&order={order}&limit=20&offset=20"
+      for sort in ("order_count", "lifetime_spend", "average_order_value", "last_order_at")
+      for order in ("desc", "asc")
+    ),
+  ]
+
+
+async def capture(client: httpx.AsyncClient, path: str) -> list:
+  """[(sql, parameters)] for the SELECTs one request sends."""
+  statements = []
+
+  def record(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT"):
+      statements.append((statement, parameters))
+
+  event.listen(engine.sync_engine, "before_cursor_execute", record)
+  try:
+    response = await client.get(path)
+  finally:
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+  # 404 is fine (e.g. a user without a cart): the lookup still ran
+  if response.status_code not in (200, 404):
+    raise SystemExit(f"GET {path} -> {response.status_code} {response.text}")
+  return statements
+
+
+def plan_nodes(node: dict):
+  yield node
+  for child in node.get("Plans", ()):
+    yield from plan_nodes(child)
+
+
+async def explain(conn, sql: str, parameters) -> list:
+  result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parameters)
+  plan = result.scalar()
+  if isinstance(plan, str):
+    plan = json.loads(plan)
+  return list(plan_nodes(plan[0]["Plan"]))
+
+
+async def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--min-rows", type=int, default=100, help="ignore seq scans on tables smaller than this")
+  parser.add_argument("--verbose", action="store_true", help="print each statement's scans")
+  args = parser.parse_args()
+
+  ids = await sample_ids()
+  transport = httpx.ASGITransport(app=app)
+  async with httpx.AsyncClient(transport=transport, base_url="http://explain-audit") as client:
+    captured = [(path, await capture(client, path)) for path in routes(ids)]
+
+  ok = True
+  async with engine.connect() as conn:
+    sizes = dict((await conn.execute(text(
+      "SELECT relname, n_live_tup FROM pg_stat_user_tables"
+    ))).all())
+    await conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+    for path, statements in captured:
+      problems, scans = [], []
+      for sql, parameters in statements:
+        nodes = await explain(conn, sql, parameters)
+        if any(node["Node Type"] == "Limit" for node in nodes):
+          # A page should come straight off an index, not out of a sort of every row
+          for node in nodes:
+            if node["Node Type"] in ("Sort", "Incremental Sort"):
+              problems.append(f"{node['Node Type']} under LIMIT on {', '.join(node['Sort Key'])}")
+        for node in nodes:
+          table = node.get("Relation Name")
+          if table is None:
+            continue
+          scans.append(f"{node['Node Type']} on {table}" + (f" using {node['Index Name']}" if "Index Name" in node else ""))
+          if node["Node Type"] == "Seq Scan" and sizes.get(table, 0) >= args.min_rows:
+            problems.append(f"Seq Scan on {table} (~{sizes[table]} rows)" + (f" filter {node['Filter']}" if "Filter" in node else ""))
+
+      ok = ok and not problems
+      print(f"{'FAIL' if problems else 'ok  '} GET {path}  ({len(statements)} statement(s))")
+      for problem in problems:
+        print(f"       {problem}")
+      if args.verbose:
+        for scan in scans:
+          print(f"       {scan}")
+    await conn.rollback()
+
+  await engine.dispose()
+  sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+  asyncio.run(main())
@@ -0,0 +1,104 @@
+# benchmarks/guest_payload_size.py
+"""
+Compare legacy JSON vs compact guest cart/wishlist encodings on synthetic data.
+
+    python -m benchmarks.guest_payload_size --carts 1000000
+    python -m benchmarks.guest_payload_size --carts 100000 --redis   # also measure MEMORY USAGE
+
+Without --redis only value bytes are compared. With --redis a sample of keys is
+written in both formats to REDIS_URL and Redis' own per-key accounting
+(MEMORY USAGE, which includes key and allocator overhead) is extrapolated.
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+
+from app.services.guest_codec import encode_cart, encode_wishlist
+
+CONTAINERS = ["100g", "250g", "500g", "1kg", None]
+
+
+def synthetic_sessions(n, seed, catalog_size=5000):
+  rng = random.Random(seed)
+  catalog = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(catalog_size)]
+  for i in range(n):
+    items = [
+      {"product_id": pid, "container": rng.choice(CONTAINERS), "quantity": rng.randint(1, 5)}
+      for pid in rng.sample(catalog, k=rng.randint(1, 6))
+    ]
+    wishlist = rng.sample(catalog, k=rng.randint(0, 4))
+    yield i, items, wishlist
+
+
+def legacy_cart(items):
+  # What the services wrote before: JSON with size/color keys from the old route code
+  return json.dumps({"items": [dict(item, size=None, color=None) for item in items]}).encode()
+
+
+def legacy_wishlist(session_id, product_ids):
+  return json.dumps({"session_id": session_id, "items": [{"product_id": pid} for pid in product_ids]}).encode()
+
+
+def measure_values(args):
+  totals = {"cart_json": 0, "cart_compact": 0, "wishlist_json": 0, "wishlist_compact": 0}
+  for i, items, wishlist in synthetic_sessions(args.carts, args.seed):
+    session_id = f"{uuid.UUID(int=i)}"
+    totals["cart_json"] += len(legacy_cart(items))
+    totals["cart_compact"] += len(encode_cart(items))
+    if wishlist:
+      totals["wishlist_json"] += len(legacy_wishlist(session_id, wishlist))
+      totals["wishlist_compact"] += len(encode_wishlist(wishlist))
+  return totals
+
+
+async def measure_redis(args):
+  from app.db.redis import get_redis, close_redis
+
+  r = await get_redis()
+  sample = min(args.carts, args.sample)
+  usage = {"json": 0, "compact": 0}
+  for i, items, _ in synthetic_sessions(sample, args.seed):
+    for fmt, value in (("json", legacy_cart(items)), ("compact", encode_cart(items))):
+      key = f"bench_size:{fmt}:{uuid.UUID(int=i)}"
+      await r.set(key, value)
+      usage[fmt] += await r.memory_usage(key) or 0
+      await r.delete(key)
+  await close_redis()
+  scale = args.carts / sample
+  return {fmt: int(total * scale) for fmt, total in usage.items()}
+
+
+def mb(n):
+  return f"{n / 1024 / 1024:,.1f} MiB"
+
+
+def main(args):
+  totals = measure_values(args)
+  print(f"{args.carts:,} synthetic guest sessions (1-6 cart lines, 0-4 wishlist items)\n")
+  for kind in ("cart", "wishlist"):
+    before, after = totals[f"{kind}_json"], totals[f"{kind}_compact"]
+    saved = (1 - after / before) * 100 if before else 0.0
+    print(f"{kind:9} values  json {mb(before):>12}  compact {mb(after):>12}  saved {saved:5.1f}%")
+
+  if args.redis:
+    usage = asyncio.run(measure_redis(args))
+    saved = (1 - usage["compact"] / usage["json"]) * 100 if usage["json"] else 0.0
+    print(
+      f"\nRedis MEMORY USAGE (carts, extrapolated from {min(args.carts, args.sample):,} keys): "
+      f"json {mb(usage['json'])}  compact {mb(usage['compact'])}  saved {saved:.1f}%"
+    )
+
+
+def parse_args(argv=None):
+  parser = argparse.ArgumentParser(description="Measure guest cart/wishlist payload sizes")
+  parser.add_argument("--carts", type=int, default=1_000_000)
+  parser.add_argument("--seed", type=int, default=42)
+  parser.add_argument("--redis", action="store_true", help="also measure per-key MEMORY USAGE in Redis")
+  parser.add_argument("--sample", type=int, default=20_000, help="keys written to Redis with --redis")
+  return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+  main(parse_args())
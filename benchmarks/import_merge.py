@@ -0,0 +1,112 @@
+# benchmarks/import_merge.py
+"""
+Check that a product import only overwrites the columns each row sets.
+
+    python -m benchmarks.import_merge
+
+Imports a few throwaway products with every column filled, then re-imports
+them (matched by name) from a CSV with a partly blank column and from JSON
+Lines with keys left out, and compares the stored rows with what each import
+should have written: blank cells and missing keys keep the stored value, set
+ones replace it. Exits non-zero on any difference. The products are deleted
+again afterwards.
+
+Needs a migrated database with at least one category.
+"""
+import asyncio
+import json
+import sys
+import uuid
+
+from sqlalchemy import text
+
+from app.db.session import async_session, engine
+from app.services.product_import import CSV, JSONL, import_products
+
+CHECKED = ["price", "stock", "rating", "description", "short_description", "status", "cost_per_item", "containers", "images"]
+
+
+async def chunks(body: str):
+  yield body.encode()
+
+
+async def run_import(body: str, fmt: str) -> dict:
+  async with async_session() as db:
+    result = await import_products(db, chunks(body), fmt)
+  if result["failed"]:
+    raise SystemExit(f"import rejected rows: {result['errors']}")
+  return result
+
+
+async def stored(names) -> dict:
+  async with async_session() as db:
+    rows = (await db.execute(
+      text(f"SELECT name, {', '.join(CHECKED)} FROM products WHERE name = ANY(:names)"), {"names": list(names)}
+    )).mappings().all()
+  return {row["name"]: {c: row[c] for c in CHECKED} for row in rows}
+
+
+def compare(label: str, actual: dict, expected: dict) -> bool:
+  problems = [
+    f"{name}.{column}: {actual[name][column]!r}, expected {value!r}"
+    for name, columns in expected.items() for column, value in columns.items()
+    if actual[name][column] != value
+  ]
+  print(f"{'FAIL' if problems else 'ok  '} {label}")
+  for problem in problems:
+    print(f"       {problem}")
+  return not problems
+
+
+async def main():
+  async with async_session() as db:
+    category = await db.scalar(text("SELECT name FROM categories WHERE name IS NOT NULL LIMIT 1"))
+  if category is None:
+    raise SystemExit("No categories; run `python -m benchmarks.seed` first")
+
+  tag = uuid.uuid4().hex[:8]
+  names = [f"import-merge-{tag}-{i}" for i in range(3)]
+  full = {
+    name: {
+      "price": 10.0 + i, "stock": 5, "rating": 4.5, "description": f"description {i}",
+      "short_description": f"short {i}", "status": "active", "cost_per_item": 3.0,
+      "containers": ["jar", "refill"], "images": [f"https://img.example/{i}.jpg"],
+    }
+    for i, name in enumerate(names)
+  }
+  ok = True
+  try:
+    await run_import("\n".join(json.dumps({"name": name, "category": category, **values}) for name, values in full.items()), JSONL)
+    ok = compare("insert sets every column", await stored(names), full) and ok
+
+    # description blank on the first row only; the third product isn't in the file
+    await run_import(
+      "name,category,price,stock,description\n"
+      f"{names[0]},{category},20,7,\n"
+      f"{names[1]},{category},21,8,new description\n",
+      CSV,
+    )
+    expected = {name: dict(values) for name, values in full.items()}
+    expected[names[0]].update(price=20.0, stock=7)
+    expected[names[1]].update(price=21.0, stock=8, description="new description")
+    ok = compare("CSV: blank cells keep stored values", await stored(names), expected) and ok
+
+    # rating and containers only on the second line
+    await run_import(
+      json.dumps({"name": names[0], "category": category, "price": 30, "stock": 9}) + "\n"
+      + json.dumps({"name": names[1], "category": category, "price": 31, "stock": 9, "rating": 3.0, "containers": []}),
+      JSONL,
+    )
+    expected[names[0]].update(price=30.0, stock=9)
+    expected[names[1]].update(price=31.0, stock=9, rating=3.0, containers=[])
+    ok = compare("JSONL: missing keys keep stored values", await stored(names), expected) and ok
+  finally:
+    async with async_session() as db:
+      await db.execute(text("DELETE FROM products WHERE name = ANY(:names)"), {"names": names})
+      await db.commit()
+    await engine.dispose()
+  sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+  asyncio.run(main())
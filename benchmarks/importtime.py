@@ -0,0 +1,69 @@
+# benchmarks/importtime.py
+"""
+Measure cold-start import time of the API (or any module).
+
+    python -m benchmarks.importtime                      # app.main, 5 runs
+    python -m benchmarks.importtime --runs 10 --top 25
+    python -m benchmarks.importtime --module app.db.session
+
+Each run imports the module in a fresh interpreter under `python -X importtime`
+(bytecode already compiled, like a worker starting from a built image) and
+reads the cumulative time the module took. Prints min/median/max over the runs,
+then the slowest modules of the median run, so regressions can be traced to
+the import that caused them. `--max-ms` makes it exit non-zero when the median
+exceeds a budget, for CI.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def import_times(module: str) -> dict:
+  """{module name: (self us, cumulative us)} for one fresh-interpreter import."""
+  proc = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+    capture_output=True,
+    text=True,
+  )
+  if proc.returncode != 0:
+    raise SystemExit(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+
+  times = {}
+  for line in proc.stderr.splitlines():
+    if not line.startswith("import time:") or "self [us]" in line:
+      continue
+    self_us, cumulative_us, name = line[len("import time:"):].split("|")
+    times[name.strip()] = (int(self_us), int(cumulative_us))
+  return times
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--module", default="app.main")
+  parser.add_argument("--runs", type=int, default=5)
+  parser.add_argument("--top", type=int, default=15)
+  parser.add_argument("--max-ms", type=float, default=None)
+  args = parser.parse_args()
+
+  import_times(args.module)  # warm the bytecode cache
+  runs = [import_times(args.module) for _ in range(args.runs)]
+  runs.sort(key=lambda times: times[args.module][1])
+  totals = [times[args.module][1] / 1000 for times in runs]
+  median_run = runs[len(runs) // 2]
+  median = statistics.median(totals)
+
+  print(f"import {args.module}: min {min(totals):.1f} ms  median {median:.1f} ms  max {max(totals):.1f} ms  ({args.runs} runs)")
+  print()
+  print(f"{'cumulative ms':>14} {'self ms':>9}  module (median run)")
+  slowest = sorted(median_run.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+  for name, (self_us, cumulative_us) in slowest:
+    print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+  if args.max_ms is not None and median > args.max_ms:
+    print(f"\nFAIL median {median:.1f} ms exceeds budget {args.max_ms:.1f} ms")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,285 @@
+# benchmarks/loadtest.py
+"""
+Async load driver that replays a storefront request mix against a running API.
+
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app --workers 4
+    python -m benchmarks.loadtest --base-url http://localhost:8000 --concurrency 50 --duration 60
+
+Run `python -m benchmarks.seed` first. Ids (products, users) are discovered from
+the API itself, so the driver works against any seeded database. Latency is
+reported per route template so results can be compared between runs with
+--output / --baseline.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+# (scenario name, weight). Weights approximate storefront traffic: mostly
+# browsing, some guest cart activity, a few checkouts and admin page loads.
+DEFAULT_MIX = [
+  ("browse_products", 30),
+  ("view_product", 25),
+  ("guest_cart_add", 10),
+  ("guest_cart_read", 10),
+  ("login_cart_merge", 5),
+  ("cart_quantity_clicks", 5),
+  ("checkout", 5),
+  ("product_reviews", 8),
+  ("admin_dashboard", 2),
+]
+
+
+def percentile(sorted_values, pct):
+  """Nearest-rank percentile of an already sorted list."""
+  if not sorted_values:
+    return 0.0
+  rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+  return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class Recorder:
+  def __init__(self):
+    self.latencies = defaultdict(list)
+    self.errors = defaultdict(int)
+    self.started = time.perf_counter()
+
+  def record(self, route, elapsed, ok):
+    self.latencies[route].append(elapsed)
+    if not ok:
+      self.errors[route] += 1
+
+  def summary(self):
+    wall = time.perf_counter() - self.started
+    rows = {}
+    for route, values in sorted(self.latencies.items()):
+      values.sort()
+      rows[route] = {
+        "count": len(values),
+        "errors": self.errors[route],
+        "rps": len(values) / wall if wall else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000,
+      }
+    return {"wall_seconds": wall, "routes": rows}
+
+
+class Storefront:
+  """Holds discovered ids and issues requests, timing each one by route template."""
+
+  def __init__(self, client, recorder):
+    self.client = client
+    self.recorder = recorder
+    self.products = []
+    self.users = []
+
+  async def call(self, route, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+      response = await self.client.request(method, path, **kwargs)
+      ok = response.status_code < 400
+    except httpx.HTTPError:
+      response, ok = None, False
+    self.recorder.record(route, time.perf_counter() - start, ok)
+    return response
+
+  async def discover(self):
+    products = await self.client.get("/products/products/")
+    products.raise_for_status()
+    self.products = products.json()
+    users = await self.client.get("/users/users/")
+    users.raise_for_status()
+    self.users = users.json()
+    if not self.products or not self.users:
+      raise SystemExit("No products or users found; run `python -m benchmarks.seed` first")
+
+  def _line(self, product=None):
+    product = product or random.choice(self.products)
+    containers = product.get("containers") or [None]
+    return {
+      "product_id": product["id"],
+      "container": random.choice(containers),
+      "quantity": 100 * random.randint(1, 3),   # grams
+    }
+
+  # --- scenarios ---
+
+  async def browse_products(self):
+    await self.call("GET /products/products/", "GET", "/products/products/")
+
+  async def view_product(self):
+    product = random.choice(self.products)
+    await self.call("GET /products/products/{product_id}", "GET", f"/products/products/{product['id']}")
+
+  async def product_reviews(self):
+    product = random.choice(self.products)
+    await self.call(
+      "GET /reviews/reviews/product/{product_id}", "GET", f"/reviews/reviews/product/{product['id']}"
+    )
+
+  async def guest_cart_add(self):
+    session_id = f"bench-guest-{random.randint(0, 999)}"
+    await self.call(
+      "POST /guest/guest-cart/guest/add", "POST", "/guest/guest-cart/guest/add",
+      json={"session_id": session_id, "items": [self._line()]},
+    )
+
+  async def guest_cart_read(self):
+    session_id = f"bench-guest-{random.randint(0, 999)}"
+    await self.call("GET /guest/guest-cart/{session_id}", "GET", f"/guest/guest-cart/{session_id}")
+
+  async def login_cart_merge(self):
+    # A guest fills a cart, then logs in and the guest cart is merged server-side
+    user = random.choice(self.users)
+    session_id = f"bench-login-{uuid.uuid4().hex}"
+    await self.call(
+      "POST /guest/guest-cart/guest/add", "POST", "/guest/guest-cart/guest/add",
+      json={"session_id": session_id, "items": [self._line() for _ in range(random.randint(1, 4))]},
+    )
+    await self.call(
+      "POST /carts/carts/merge/{session_id}", "POST", f"/carts/carts/merge/{session_id}",
+      json={"user_id": user["supabase_id"]},
+    )
+
+  async def cart_quantity_clicks(self):
+    # Logged-in cart page: the UI sends one PUT per +/- click on a line
+    user = random.choice(self.users)
+    response = await self.call(
+      "GET /carts/carts/user/{user_id}", "GET", f"/carts/carts/user/{user['supabase_id']}"
+    )
+    if response is None or response.status_code != 200 or not response.json()["items"]:
+      return
+    item = random.choice(response.json()["items"])
+    quantity = item["quantity"]
+    for _ in range(random.randint(3, 8)):
+      quantity = max(100, quantity + random.choice((-100, 100)))
+      await self.call(
+        "PUT /carts/carts/items/{item_id}", "PUT", f"/carts/carts/items/{item['id']}",
+        json={"product_id": item["product_id"], "container": item["container"], "quantity": quantity},
+      )
+
+  async def checkout(self):
+    user = random.choice(self.users)
+    items = []
+    for product in random.sample(self.products, k=min(len(self.products), random.randint(1, 4))):
+      items.append({
+        **self._line(product),
+        "name": product["name"],
+        "image": product.get("main_image"),
+      })
+    await self.call(
+      "POST /orders/orders/", "POST", "/orders/orders/",
+      json={
+        "user_id": user["id"],
+        "status": "pending",
+        "city": "Nairobi",
+        "area": "Westlands",
+        "paid": False,
+        "address": "1 Bench Road",
+        "phoneNumber": "0700000000",
+        "apartment": "A1",
+        "internal_notes": [],
+        "additionalNote": f"bench-{uuid.uuid4().hex[:8]}",
+        "items": items,
+      },
+    )
+
+  async def admin_dashboard(self):
+    # The admin dashboard fires these together on load
+    await asyncio.gather(
+      self.call("GET /orders/orders/", "GET", "/orders/orders/"),
+      self.call("GET /users/users/", "GET", "/users/users/"),
+      self.call("GET /orders/orders/items/topProducts", "GET", "/orders/orders/items/topProducts"),
+      self.call("GET /orders/orders/items/categorySales", "GET", "/orders/orders/items/categorySales"),
+      self.call("GET /orders/orders/stats/timeseries", "GET", "/orders/orders/stats/timeseries"),
+    )
+
+
+async def worker(storefront, scenarios, weights, deadline):
+  while time.perf_counter() < deadline:
+    name = random.choices(scenarios, weights=weights)[0]
+    await getattr(storefront, name)()
+
+
+def print_report(summary, baseline=None):
+  header = f"{'route':52} {'count':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}"
+  if baseline:
+    header += f" {'Δp95':>9}"
+  print(header)
+  print("-" * len(header))
+  for route, row in summary["routes"].items():
+    line = (
+      f"{route:52} {row['count']:>7} {row['errors']:>5} {row['rps']:>8.1f} "
+      f"{row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms"
+    )
+    if baseline:
+      previous = baseline.get("routes", {}).get(route)
+      if previous:
+        delta = (row["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100 if previous["p95_ms"] else 0.0
+        line += f" {delta:>+8.1f}%"
+      else:
+        line += f" {'new':>9}"
+    print(line)
+  total = sum(r["count"] for r in summary["routes"].values())
+  print(f"\n{total} requests in {summary['wall_seconds']:.1f}s ({total / summary['wall_seconds']:.1f} req/s)")
+
+
+async def main(args):
+  random.seed(args.seed)
+  mix = DEFAULT_MIX
+  if args.only:
+    mix = [(name, weight) for name, weight in DEFAULT_MIX if name in args.only]
+  scenarios = [name for name, _ in mix]
+  weights = [weight for _, weight in mix]
+
+  limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+  async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+    recorder = Recorder()
+    storefront = Storefront(client, recorder)
+    await storefront.discover()
+
+    if args.warmup:
+      await asyncio.gather(*(
+        worker(storefront, scenarios, weights, time.perf_counter() + args.warmup)
+        for _ in range(args.concurrency)
+      ))
+      storefront.recorder = recorder = Recorder()
+
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(worker(storefront, scenarios, weights, deadline) for _ in range(args.concurrency)))
+
+  summary = recorder.summary()
+  baseline = None
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+  print_report(summary, baseline)
+  if args.output:
+    with open(args.output, "w") as f:
+      json.dump(summary, f, indent=2)
+
+
+def parse_args(argv=None):
+  parser = argparse.ArgumentParser(description="Replay a storefront request mix and report latency per route")
+  parser.add_argument("--base-url", default="http://localhost:8000")
+  parser.add_argument("--concurrency", type=int, default=20, help="number of concurrent virtual users")
+  parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+  parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+  parser.add_argument("--timeout", type=float, default=30)
+  parser.add_argument("--only", nargs="*", help=f"restrict to scenarios: {', '.join(n for n, _ in DEFAULT_MIX)}")
+  parser.add_argument("--seed", type=int, default=42)
+  parser.add_argument("--output", help="write the summary as JSON")
+  parser.add_argument("--baseline", help="JSON summary from a previous run to diff p95 against")
+  return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+  asyncio.run(main(parse_args()))
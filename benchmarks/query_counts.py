@@ -0,0 +1,79 @@
+# benchmarks/query_counts.py
+"""
+Check how many SQL statements each repository load profile emits.
+
+    python -m benchmarks.query_counts
+
+Runs every profile against the seeded database, serializes the result with its
+response schema (so a missed eager load shows up as an extra statement, or a
+lazy-load error), and exits non-zero if any count differs from the expected one.
+"""
+import asyncio
+import sys
+
+from sqlalchemy import event, select
+
+from app.db.session import engine, async_session
+from app.models.product import Category, Product
+from app.repositories.category_repository import category_repository
+from app.repositories.product_repository import DETAIL, SUMMARY, product_repository
+from app.schemas.categorySchema import CategoryRead
+from app.schemas.productSchema import ProductDetail, ProductRead
+
+
+class StatementCounter:
+  def __init__(self):
+    self.count = 0
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    self.count += 1
+
+
+async def products_by_ids(db, ids):
+  return list((await product_repository.get_products_by_ids(db, ids)).values())
+
+
+async def check(name, expected, load, schema, many=False):
+  counter = StatementCounter()
+  async with async_session() as db:
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+      result = await load(db)
+      for row in (result if many else [result]):
+        schema.model_validate(row, from_attributes=True)
+    finally:
+      event.remove(engine.sync_engine, "before_cursor_execute", counter)
+
+  ok = counter.count == expected
+  print(f"{'ok  ' if ok else 'FAIL'} {name:38} {counter.count} statement(s), expected {expected}")
+  return ok
+
+
+async def main():
+  async with async_session() as db:
+    product_id = await db.scalar(select(Product.id).where(Product.category_id.isnot(None)).limit(1))
+    category_id = await db.scalar(select(Category.id).limit(1))
+    ids = (await db.execute(select(Product.id).limit(20))).scalars().all()
+  if product_id is None or category_id is None:
+    raise SystemExit("No products found; run `python -m benchmarks.seed` first")
+
+  results = [
+    await check("product summary (list)", 1,
+                lambda db: product_repository.list_products(db, SUMMARY), ProductRead, many=True),
+    await check("product summary (by id)", 1,
+                lambda db: product_repository.get_product_by_id(db, product_id, SUMMARY), ProductRead),
+    await check("product detail (by id)", 2,
+                lambda db: product_repository.get_product_by_id(db, product_id, DETAIL), ProductDetail),
+    await check("products by ids", 1,
+                lambda db: products_by_ids(db, ids), ProductRead, many=True),
+    await check("categories with product summaries", 2,
+                lambda db: category_repository.list_with_products(db), CategoryRead, many=True),
+    await check("category with product summaries", 2,
+                lambda db: category_repository.get_with_products(db, category_id), CategoryRead),
+  ]
+  await engine.dispose()
+  sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+  asyncio.run(main())
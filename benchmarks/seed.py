@@ -0,0 +1,250 @@
+# benchmarks/seed.py
+"""
+Seed a local database and Redis with a synthetic catalog for load testing.
+
+    python -m benchmarks.seed --categories 12 --products 2000 --users 500 --orders 5000
+
+Uses DATABASE_URI / REDIS_URL from the environment (.env), so point them at a
+throwaway Postgres and Redis (or any Redis-compatible server) before running.
+Set DATABASE_SSL=false for a plain local Postgres.
+"""
+import argparse
+import asyncio
+import random
+import uuid
+
+from sqlalchemy import insert, text
+
+from app.db.base_class import Base
+from app.db.redis import get_redis, close_redis
+from app.db.session import engine, async_session
+from app.models import (
+    Category, Product, User, Order, OrderItem, Cart, CartItem, Wishlist, WishlistItem, Review
+)
+from app.models.user import UserRole
+from app.services import customer_stats
+from app.services.guest_cart import REDIS_PREFIX
+from app.services.guest_codec import encode_cart
+
+CONTAINERS = ["glass", "plastic", "paper"]
+STATUSES = ["pending", "processing", "shipped", "delivered"]
+WORDS = [
+  "smoked", "sweet", "hot", "ground", "whole", "wild", "golden", "black",
+  "red", "green", "ceylon", "kashmiri", "aleppo", "zanzibar", "pickling",
+]
+SPICES = [
+  "paprika", "cumin", "turmeric", "cinnamon", "cardamom", "clove", "pepper",
+  "chilli", "coriander", "nutmeg", "ginger", "saffron", "fenugreek", "mace",
+]
+
+# Truncated in dependency order on --reset
+TABLES = [
+  "reviews", "wishlist_items", "wishlists", "cart_items", "carts",
+  "order_items", "orders", "product_images", "products", "categories",
+  "shipping_addresses", "customer_stats", "users",
+]
+
+CHUNK = 1000
+
+
+def _chunks(rows, size=CHUNK):
+  for i in range(0, len(rows), size):
+    yield rows[i:i + size]
+
+
+async def _bulk_insert(session, model, rows):
+  for chunk in _chunks(rows):
+    await session.execute(insert(model), chunk)
+
+
+def build_catalog(rng, n_categories, n_products):
+  categories = [
+    {
+      "id": uuid.uuid4(),
+      "name": f"{rng.choice(WORDS).title()} {rng.choice(SPICES).title()} {i}",
+      "status": "active",
+      "isFeatured": i < 4,
+      "image": f"https://cdn.example.com/categories/{i}.jpg",
+      "description": "Synthetic benchmark category",
+    }
+    for i in range(n_categories)
+  ]
+
+  products = []
+  for i in range(n_products):
+    price = round(rng.uniform(2, 60), 2)
+    on_sale = rng.random() < 0.2
+    products.append({
+      "id": uuid.uuid4(),
+      "name": f"{rng.choice(WORDS).title()} {rng.choice(SPICES).title()} #{i}",
+      "price": price,
+      "originalPrice": round(price * 1.25, 2) if on_sale else None,
+      "stock": rng.randint(0, 500),
+      "rating": round(rng.uniform(3, 5), 1),
+      "isFeatured": rng.random() < 0.05,
+      "reviewCount": 0,
+      "isSale": on_sale,
+      "isNew": rng.random() < 0.1,
+      "containers": rng.sample(CONTAINERS, k=rng.randint(1, len(CONTAINERS))),
+      "short_description": "A synthetic spice used for load testing.",
+      "description": " ".join(rng.choice(WORDS + SPICES) for _ in range(120)),
+      "status": "active",
+      "main_image": f"https://cdn.example.com/products/{i}.jpg",
+      "images": [f"https://cdn.example.com/products/{i}-{j}.jpg" for j in range(4)],
+      "cost_per_item": price,
+      "category_id": rng.choice(categories)["id"],
+    })
+  return categories, products
+
+
+def build_users(n_users):
+  return [
+    {
+      "id": uuid.uuid4(),
+      "supabase_id": f"bench-{i}",
+      "firstName": "Bench",
+      "lastName": f"User{i}",
+      "role": UserRole.ADMIN if i == 0 else UserRole.USER,
+      "email": f"bench{i}@example.com",
+      "phoneNumber": "0700000000",
+    }
+    for i in range(n_users)
+  ]
+
+
+def build_orders(rng, users, products, n_orders, max_items):
+  orders, order_items = [], []
+  for _ in range(n_orders):
+    order_id = uuid.uuid4()
+    lines = rng.sample(products, k=rng.randint(1, min(max_items, len(products))))
+    total = 0.0
+    for product in lines:
+      quantity = 100 * rng.randint(1, 4)   # grams; prices are per 100g
+      total += quantity / 100 * product["price"]
+      order_items.append({
+        "id": uuid.uuid4(),
+        "order_id": order_id,
+        "product_id": product["id"],
+        "name": product["name"],
+        "image": product["main_image"],
+        "container": rng.choice(product["containers"]),
+        "quantity": quantity,
+        "price": product["price"],
+      })
+    orders.append({
+      "id": order_id,
+      "user_id": rng.choice(users)["id"],
+      "status": rng.choice(STATUSES),
+      "city": "Nairobi",
+      "area": "Westlands",
+      "address": "1 Bench Road",
+      "phoneNumber": "0700000000",
+      "apartment": "A1",
+      "payOnDelivery": rng.random() < 0.5,
+      "paid": rng.random() < 0.7,
+      "total_amount": round(total, 2),
+      "shipping_method": "standard",
+    })
+  return orders, order_items
+
+
+async def seed_database(args, rng):
+  async with engine.begin() as conn:
+    await conn.run_sync(Base.metadata.create_all)
+    if args.reset:
+      await conn.execute(text(f"TRUNCATE {', '.join(TABLES)} CASCADE"))
+
+  categories, products = build_catalog(rng, args.categories, args.products)
+  users = build_users(args.users)
+  orders, order_items = build_orders(rng, users, products, args.orders, args.max_items)
+
+  carts, cart_items, wishlists, wishlist_items, reviews = [], [], [], [], []
+  for user in users[: args.users // 2]:
+    cart_id = uuid.uuid4()
+    carts.append({"id": cart_id, "user_id": user["supabase_id"]})
+    for product in rng.sample(products, k=min(3, len(products))):
+      cart_items.append({
+        "id": uuid.uuid4(),
+        "cart_id": cart_id,
+        "product_id": product["id"],
+        "container": rng.choice(product["containers"]),
+        "quantity": 100 * rng.randint(1, 3),
+      })
+    wishlist_id = uuid.uuid4()
+    wishlists.append({"id": wishlist_id, "user_id": user["supabase_id"]})
+    # wishlist_items.wishlist_id / product_id are unique in the current schema
+    if len(wishlist_items) < len(products):
+      wishlist_items.append({
+        "id": uuid.uuid4(),
+        "wishlist_id": wishlist_id,
+        "product_id": products[len(wishlist_items)]["id"],
+      })
+
+  for _ in range(args.reviews):
+    reviews.append({
+      "id": uuid.uuid4(),
+      "product_id": rng.choice(products)["id"],
+      "user_id": rng.choice(users)["id"],
+      "rating": float(rng.randint(1, 5)),
+      "comment": "Synthetic review",
+    })
+
+  async with async_session() as session:
+    await _bulk_insert(session, Category, categories)
+    await _bulk_insert(session, Product, products)
+    await _bulk_insert(session, User, users)
+    await _bulk_insert(session, Order, orders)
+    await _bulk_insert(session, OrderItem, order_items)
+    await _bulk_insert(session, Cart, carts)
+    await _bulk_insert(session, CartItem, cart_items)
+    await _bulk_insert(session, Wishlist, wishlists)
+    await _bulk_insert(session, WishlistItem, wishlist_items)
+    await _bulk_insert(session, Review, reviews)
+    await session.commit()
+    # Bulk inserts bypass the order routes that maintain the stats
+    await customer_stats.rebuild(session)
+
+  return products
+
+
+async def seed_redis(args, rng, products):
+  """Pre-populate guest carts so read-heavy guest traffic hits warm keys."""
+  r = await get_redis()
+  pipe = r.pipeline(transaction=False)
+  for i in range(args.guest_carts):
+    items = [
+      {"product_id": p["id"], "container": rng.choice(p["containers"]), "quantity": 100 * rng.randint(1, 3)}
+      for p in rng.sample(products, k=min(3, len(products)))
+    ]
+    pipe.set(f"{REDIS_PREFIX}bench-guest-{i}", encode_cart(items))
+  await pipe.execute()
+
+
+async def main(args):
+  rng = random.Random(args.seed)
+  products = await seed_database(args, rng)
+  await seed_redis(args, rng, products)
+  await close_redis()
+  await engine.dispose()
+  print(
+    f"Seeded {args.categories} categories, {args.products} products, {args.users} users, "
+    f"{args.orders} orders, {args.reviews} reviews and {args.guest_carts} guest carts"
+  )
+
+
+def parse_args(argv=None):
+  parser = argparse.ArgumentParser(description="Seed the database and Redis for load tests")
+  parser.add_argument("--categories", type=int, default=12)
+  parser.add_argument("--products", type=int, default=2000)
+  parser.add_argument("--users", type=int, default=500)
+  parser.add_argument("--orders", type=int, default=5000)
+  parser.add_argument("--max-items", type=int, default=5, help="max lines per seeded order")
+  parser.add_argument("--reviews", type=int, default=2000)
+  parser.add_argument("--guest-carts", type=int, default=1000)
+  parser.add_argument("--seed", type=int, default=42, help="RNG seed for a reproducible dataset")
+  parser.add_argument("--reset", action="store_true", help="truncate all tables before seeding")
+  return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+  asyncio.run(main(parse_args()))
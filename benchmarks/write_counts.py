@@ -0,0 +1,161 @@
+# benchmarks/write_counts.py
+"""
+Check how many SQL statements each write endpoint emits.
+
+    python -m benchmarks.write_counts
+
+Drives the API in-process (no server, no lifespan) through a create / update /
+delete round of every resource, using throwaway rows that it removes again, and
+counts the statements each request sends to Postgres. Exits non-zero if any
+request goes over its budget, e.g. because a route went back to refreshing or
+re-selecting after commit (see app/db/writes.py).
+
+Needs a migrated database (it creates every row it writes to) and Redis, which
+the cart and cache code use.
+"""
+import asyncio
+import sys
+import uuid
+
+import httpx
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.main import app
+
+# Most statements each write request may issue, by label
+BUDGETS = {
+  "create category": 1,
+  "update category": 3,
+  "create product": 3,      # + the similarity refresh's read (background task, after the response)
+  "update product": 2,
+  "create user": 2,         # its customer_stats row comes from a trigger
+  "update user": 2,
+  "create review": 3,
+  "update review": 2,
+  "delete review": 1,
+  "create order": 5,        # + the customer_stats upsert
+  "update order": 3,
+  "update order item": 4,   # + the order total and customer_stats updates
+  "delete order item": 3,   # + the order total and customer_stats updates
+  "delete order": 3,        # + the customer_stats update
+  "create cart": 4,
+  "add cart item": 4,
+  "update cart item": 1,
+  "delete cart item": 1,
+  "create wishlist": 4,
+  "remove wishlist item": 5,
+  "delete product": 3,
+}
+
+
+class StatementCounter:
+  def __init__(self):
+    self.count = 0
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    self.count += 1
+
+
+class Checker:
+  def __init__(self, client: httpx.AsyncClient):
+    self.client = client
+    self.ok = True
+
+  async def call(self, label, method, path, body=None):
+    """Send a request, count its statements against BUDGETS[label], and return the JSON body."""
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+      response = await self.client.request(method, path, json=body)
+    finally:
+      event.remove(engine.sync_engine, "before_cursor_execute", counter)
+    if response.status_code >= 400:
+      raise SystemExit(f"{label}: {method} {path} -> {response.status_code} {response.text}")
+
+    budget = BUDGETS[label]
+    ok = counter.count <= budget
+    self.ok = self.ok and ok
+    print(f"{'ok  ' if ok else 'FAIL'} {label:24} {counter.count} statement(s), budget {budget}")
+    return response.json()
+
+
+def product_body(category_id, name):
+  return {
+    "name": name, "price": 250.0, "originalPrice": None, "stock": 10, "rating": 0.0,
+    "reviewCount": 0, "isSale": False, "isNew": True, "containers": ["glass"],
+    "short_description": None, "description": None, "images": [], "status": "active",
+    "cost_per_item": None, "isFeatured": False, "main_image": None, "category_id": category_id,
+  }
+
+
+async def run(client: httpx.AsyncClient) -> bool:
+  check = Checker(client)
+  tag = uuid.uuid4().hex[:8]
+
+  category = await check.call("create category", "POST", "/category/categories/", {"name": f"write-check {tag}"})
+  await check.call("update category", "PUT", f"/category/categories/{category['id']}", {
+    "name": f"write-check {tag}", "isFeatured": False, "status": "draft", "image": None, "description": None,
+  })
+
+  product = await check.call("create product", "POST", "/products/products/", product_body(category["id"], f"Write check {tag}"))
+  body = product_body(category["id"], f"Write check {tag}")
+  body.update(price=300.0)
+  await check.call("update product", "PUT", f"/products/products/{product['id']}", body)
+
+  user_body = {
+    "firstName": "Write", "lastName": "Check", "supabase_id": f"write-check-{tag}",
+    "email": f"write-check-{tag}@example.com", "phoneNumber": None, "role": "user",
+  }
+  user = await check.call("create user", "POST", "/users/users/", user_body)
+  await check.call("update user", "PUT", f"/users/users/{user['id']}", dict(user_body, lastName="Checked"))
+
+  review_body = {"product_id": product["id"], "user_id": user["id"], "rating": 4, "comment": "ok"}
+  review = await check.call("create review", "POST", "/reviews/reviews/", review_body)
+  await check.call("update review", "PUT", f"/reviews/reviews/{review['id']}", dict(review_body, rating=5))
+  await check.call("delete review", "DELETE", f"/reviews/reviews/{review['id']}")
+
+  item = {"product_id": product["id"], "container": "glass", "name": None, "image": None, "quantity": 100}
+  order = await check.call("create order", "POST", "/orders/orders/", {
+    "user_id": user["id"], "status": "pending", "city": "Nairobi", "area": "CBD", "paid": False,
+    "address": "1 Write St", "phoneNumber": "0700000000", "apartment": "1", "items": [item, dict(item, quantity=200)],
+  })
+  await check.call("update order", "PUT", f"/orders/orders/{order['id']}", {"status": "processing"})
+  await check.call("update order item", "PUT", f"/orders/orders/items/{order['items'][0]['id']}", dict(item, quantity=300))
+  await check.call("delete order item", "DELETE", f"/orders/orders/items/{order['items'][1]['id']}")
+  await check.call("delete order", "DELETE", f"/orders/orders/{order['id']}")
+
+  cart = await check.call("create cart", "POST", "/carts/carts/", {
+    "user_id": user["supabase_id"], "items": [{"product_id": product["id"], "container": "glass", "quantity": 100}],
+  })
+  cart_item = await check.call("add cart item", "POST", f"/carts/carts/{cart['id']}/items",
+                               {"product_id": product["id"], "container": "paper", "quantity": 50})
+  await check.call("update cart item", "PUT", f"/carts/carts/items/{cart_item['id']}",
+                   {"product_id": product["id"], "container": "paper", "quantity": 150})
+  await check.call("delete cart item", "DELETE", f"/carts/carts/{cart['id']}/items/{cart_item['id']}")
+
+  wishlist = await check.call("create wishlist", "POST", "/wishlists/wishlists/", {
+    "user_id": user["supabase_id"], "items": [{"product_id": product["id"]}],
+  })
+  await check.call("remove wishlist item", "DELETE", f"/wishlists/wishlists/{wishlist['id']}/items/{wishlist['items'][0]['id']}")
+
+  # Clean up (not counted): empty the cart, then the user takes its cart and wishlist with it
+  await client.delete(f"/carts/carts/{cart['id']}/items")
+  await client.delete(f"/users/users/{user['id']}")
+  await check.call("delete product", "DELETE", f"/products/products/{product['id']}")
+  await client.delete(f"/category/categories/{category['id']}")
+  return check.ok
+
+
+async def main():
+  transport = httpx.ASGITransport(app=app)
+  try:
+    async with httpx.AsyncClient(transport=transport, base_url="http://write-counts") as client:
+      ok = await run(client)
+  finally:
+    await engine.dispose()
+  sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+  asyncio.run(main())
@@ -0,0 +1,30 @@
+"""orders created_at index
+
+Revision ID: 2d7f5a8c1e94
+Revises: 9c4e1d7a3b62
+Create Date: 2026-10-19 18:02:41.185327
+
+Indexes orders.created_at for the time-series endpoint's date-range scans,
+CONCURRENTLY so order writes aren't blocked while it builds (see
+5b1e9c47d2a8 for recovering from a failed concurrent build).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7f5a8c1e94'
+down_revision: Union[str, None] = '9c4e1d7a3b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_created_at', 'orders', ['created_at'], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_orders_created_at', table_name='orders', postgresql_concurrently=True, if_exists=True)
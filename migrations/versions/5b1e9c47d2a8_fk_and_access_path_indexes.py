@@ -0,0 +1,56 @@
+"""fk and access path indexes
+
+Revision ID: 5b1e9c47d2a8
+Revises: f8a2b719e82e
+Create Date: 2026-10-19 10:12:37.418205
+
+Drops the ix_<table>_id unique indexes, which duplicate the primary keys, and
+indexes the foreign keys the routes filter and join on. Everything runs with
+CONCURRENTLY outside a transaction, so writes aren't blocked while a large
+table is indexed. If a concurrent build fails it leaves an INVALID index
+behind: drop it and rerun (IF [NOT] EXISTS makes each step safe to repeat).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e9c47d2a8'
+down_revision: Union[str, None] = 'f8a2b719e82e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Unique indexes on primary key columns; the *_pkey index already covers them
+REDUNDANT_PK_INDEXES = [
+    'categories', 'users', 'carts', 'cart_items', 'orders', 'order_items', 'products',
+    'product_images', 'reviews', 'shipping_addresses', 'wishlists', 'wishlist_items',
+]
+
+# (index name, table, columns)
+ACCESS_PATH_INDEXES = [
+    ('ix_cart_items_cart_id', 'cart_items', ['cart_id']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_product_id', 'order_items', ['product_id']),
+    ('ix_reviews_product_id', 'reviews', ['product_id']),
+    ('ix_reviews_user_id', 'reviews', ['user_id']),
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at']),
+    ('ix_products_category_id', 'products', ['category_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in ACCESS_PATH_INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for table in REDUNDANT_PK_INDEXES:
+            op.drop_index(f'ix_{table}_id', table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in REDUNDANT_PK_INDEXES:
+            op.create_index(f'ix_{table}_id', table, ['id'], unique=True, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in reversed(ACCESS_PATH_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
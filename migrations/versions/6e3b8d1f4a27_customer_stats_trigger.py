@@ -0,0 +1,50 @@
+"""customer_stats row trigger
+
+Revision ID: 6e3b8d1f4a27
+Revises: 2d7f5a8c1e94
+Create Date: 2026-10-19 21:14:08.532716
+
+Creates each user's customer_stats row in the database (AFTER INSERT on
+users) instead of relying on the API to add it, so users inserted any other
+way still show up in the users list, which inner-joins customer_stats to page
+off its indexes. Backfills the rows of users created since 9c4e1d7a3b62
+without one.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3b8d1f4a27'
+down_revision: Union[str, None] = '2d7f5a8c1e94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION customer_stats_for_new_user() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO customer_stats (user_id) VALUES (NEW.id) ON CONFLICT (user_id) DO NOTHING;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER users_customer_stats AFTER INSERT ON users
+        FOR EACH ROW EXECUTE FUNCTION customer_stats_for_new_user()
+    """)
+    op.execute("""
+        INSERT INTO customer_stats (user_id, order_count, lifetime_spend, last_order_at)
+        SELECT u.id, count(o.id), coalesce(sum(o.total_amount), 0), max(o.created_at)
+        FROM users AS u
+        LEFT JOIN orders AS o ON o.user_id = u.id AND lower(coalesce(o.status, '')) <> 'cancelled'
+        WHERE NOT EXISTS (SELECT 1 FROM customer_stats AS s WHERE s.user_id = u.id)
+        GROUP BY u.id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS users_customer_stats ON users")
+    op.execute("DROP FUNCTION IF EXISTS customer_stats_for_new_user()")